@@ -11,11 +11,17 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 from app.core.config import settings
 from app.db.session import Base
 from app.models import (  # noqa
+    idempotency,
     inventory,
     location,
+    low_stock_alert,
     medication,
     order,
+    order_archive,
+    order_stats,
+    outbox,
     prescription,
+    stock_ledger,
     user,
 )
 
@@ -0,0 +1,74 @@
+"""stock ledger
+
+Revision ID: 0a6e2c9d4b17
+Revises: f1c4a8e6b2d9
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0a6e2c9d4b17"
+down_revision = "f1c4a8e6b2d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_movements",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("medication_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("delta", sa.Integer(), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_stock_movements_id"), "stock_movements", ["id"], unique=False
+    )
+    op.create_index(
+        "ix_stock_movements_location_medication_id",
+        "stock_movements",
+        ["location_id", "medication_id", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_stock_movements_location_created_at",
+        "stock_movements",
+        ["location_id", "created_at"],
+        unique=False,
+    )
+    op.create_table(
+        "stock_snapshots",
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("medication_id", sa.Integer(), nullable=False),
+        sa.Column("movement_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("location_id", "medication_id", "movement_id"),
+    )
+    # The current stock becomes the opening balance of the ledger
+    op.execute(
+        "INSERT INTO stock_snapshots "
+        "(location_id, medication_id, movement_id, quantity, created_at) "
+        "SELECT location_id, medication_id, 0, COALESCE(quantity, 0), CURRENT_TIMESTAMP "
+        "FROM inventory "
+        "WHERE location_id IS NOT NULL AND medication_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stock_snapshots")
+    op.drop_index(
+        "ix_stock_movements_location_created_at", table_name="stock_movements"
+    )
+    op.drop_index(
+        "ix_stock_movements_location_medication_id", table_name="stock_movements"
+    )
+    op.drop_index(op.f("ix_stock_movements_id"), table_name="stock_movements")
+    op.drop_table("stock_movements")
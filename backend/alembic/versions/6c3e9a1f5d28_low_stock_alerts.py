@@ -0,0 +1,48 @@
+"""low stock alerts
+
+Revision ID: 6c3e9a1f5d28
+Revises: 0a6e2c9d4b17
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6c3e9a1f5d28"
+down_revision = "0a6e2c9d4b17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "inventory", sa.Column("low_stock_threshold", sa.Integer(), nullable=True)
+    )
+    op.create_table(
+        "low_stock_alerts",
+        sa.Column("location_id", sa.Integer(), nullable=False),
+        sa.Column("medication_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("notified_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["location_id"], ["locations.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["medication_id"], ["medications.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("location_id", "medication_id"),
+    )
+    op.create_index(
+        op.f("ix_low_stock_alerts_notified_at"),
+        "low_stock_alerts",
+        ["notified_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_low_stock_alerts_notified_at"), table_name="low_stock_alerts"
+    )
+    op.drop_table("low_stock_alerts")
+    op.drop_column("inventory", "low_stock_threshold")
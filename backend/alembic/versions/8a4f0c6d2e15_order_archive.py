@@ -0,0 +1,91 @@
+"""order archive
+
+Revision ID: 8a4f0c6d2e15
+Revises: 5e8d2b91c4a7
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8a4f0c6d2e15"
+down_revision = "5e8d2b91c4a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "orders_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("location_id", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("access_token", sa.String(), nullable=True),
+        sa.Column("total_price", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["location_id"], ["locations.id"], ondelete="SET NULL"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_orders_archive_created_at_id",
+        "orders_archive",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_orders_archive_user_id_created_at_id",
+        "orders_archive",
+        ["user_id", "created_at", "id"],
+        unique=False,
+    )
+    op.create_table(
+        "order_medication_association_archive",
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("medication_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["medication_id"], ["medications.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["order_id"], ["orders_archive.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("order_id", "medication_id"),
+    )
+    op.add_column(
+        "prescriptions", sa.Column("archived_order_id", sa.Integer(), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_prescriptions_archived_order_id"),
+        "prescriptions",
+        ["archived_order_id"],
+        unique=False,
+    )
+    op.create_foreign_key(
+        "prescriptions_archived_order_id_fkey",
+        "prescriptions",
+        "orders_archive",
+        ["archived_order_id"],
+        ["id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "prescriptions_archived_order_id_fkey", "prescriptions", type_="foreignkey"
+    )
+    op.drop_index(
+        op.f("ix_prescriptions_archived_order_id"), table_name="prescriptions"
+    )
+    op.drop_column("prescriptions", "archived_order_id")
+    op.drop_table("order_medication_association_archive")
+    op.drop_index(
+        "ix_orders_archive_user_id_created_at_id", table_name="orders_archive"
+    )
+    op.drop_index("ix_orders_archive_created_at_id", table_name="orders_archive")
+    op.drop_table("orders_archive")
@@ -0,0 +1,54 @@
+"""inventory reservations
+
+Revision ID: b7d13e5f9a20
+Revises: 8a4f0c6d2e15
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7d13e5f9a20"
+down_revision = "8a4f0c6d2e15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "orders",
+        sa.Column(
+            "stock_reserved", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+    )
+
+    # Merge duplicate stock rows before enforcing one row per location and medication
+    op.execute("""
+        UPDATE inventory SET quantity = totals.quantity
+        FROM (
+            SELECT min(id) AS id, sum(quantity) AS quantity
+            FROM inventory
+            GROUP BY location_id, medication_id
+            HAVING count(*) > 1
+        ) AS totals
+        WHERE inventory.id = totals.id
+        """)
+    op.execute("""
+        DELETE FROM inventory
+        USING inventory AS keep
+        WHERE inventory.location_id = keep.location_id
+          AND inventory.medication_id = keep.medication_id
+          AND inventory.id > keep.id
+        """)
+    op.create_unique_constraint(
+        "uq_inventory_location_medication",
+        "inventory",
+        ["location_id", "medication_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_inventory_location_medication", "inventory", type_="unique")
+    op.drop_column("orders", "stock_reserved")
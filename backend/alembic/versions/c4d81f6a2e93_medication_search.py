@@ -0,0 +1,41 @@
+"""medication search
+
+Revision ID: c4d81f6a2e93
+Revises: 6c3e9a1f5d28
+Create Date: 2026-10-16 23:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4d81f6a2e93"
+down_revision = "6c3e9a1f5d28"
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT_SQL = (
+    "lower(name || ' ' || pzn || ' ' || coalesce(manufacturer, '') || ' ' "
+    "|| coalesce(dosage, ''))"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "medications",
+        sa.Column(
+            "search_text", sa.String(), sa.Computed(SEARCH_TEXT_SQL, persisted=True)
+        ),
+    )
+    # Trigram index serving substring (LIKE) and fuzzy (%>) matches of the search
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_medications_search_text_trgm "
+        "ON medications USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_medications_search_text_trgm", table_name="medications")
+    op.drop_column("medications", "search_text")
@@ -0,0 +1,45 @@
+"""order stats
+
+Revision ID: e5b7f3a1c9d8
+Revises: d2a96b4c7e31
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e5b7f3a1c9d8"
+down_revision = "d2a96b4c7e31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_stats",
+        sa.Column("location_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("location_id", "status", "day"),
+    )
+    # Seed the counters from the existing orders
+    op.execute("""
+        INSERT INTO order_stats (location_id, status, day, count)
+        SELECT location_id, status, day, count(*)
+        FROM (
+            SELECT coalesce(location_id, 0) AS location_id, status,
+                   date(created_at) AS day
+            FROM orders WHERE status IS NOT NULL
+            UNION ALL
+            SELECT coalesce(location_id, 0), status, date(created_at)
+            FROM orders_archive WHERE status IS NOT NULL
+        ) AS all_orders
+        GROUP BY location_id, status, day
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table("order_stats")
@@ -0,0 +1,35 @@
+"""pickup sweeper
+
+Revision ID: f1c4a8e6b2d9
+Revises: e5b7f3a1c9d8
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f1c4a8e6b2d9"
+down_revision = "e5b7f3a1c9d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("orders", sa.Column("ready_at", sa.DateTime(), nullable=True))
+    op.add_column("orders", sa.Column("reminder_sent_at", sa.DateTime(), nullable=True))
+    # Orders already waiting for pickup count as ready since their last update
+    op.execute(
+        "UPDATE orders SET ready_at = updated_at "
+        "WHERE status = 'available for pickup'"
+    )
+    op.create_index(
+        "ix_orders_status_ready_at", "orders", ["status", "ready_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_status_ready_at", table_name="orders")
+    op.drop_column("orders", "reminder_sent_at")
+    op.drop_column("orders", "ready_at")
@@ -12,7 +12,7 @@ from app.core.security import ALGORITHM
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.schemas.user import TokenPayload
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
@@ -20,6 +20,9 @@ from sqlalchemy.orm import Session
 
 # OAuth2 scheme for token-based authentication
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False
+)
 
 
 def get_db() -> Generator:
@@ -70,6 +73,42 @@ def get_current_user(
     return user
 
 
+def get_current_stream_user(
+    db: Session = Depends(get_db),
+    header_token: str | None = Depends(optional_oauth2),
+    query_token: str | None = Query(None, alias="token"),
+) -> User:
+    """
+    Dependency to authenticate long-lived streaming requests.
+
+    Browsers cannot set headers on an EventSource, so the JWT may also be passed
+    as the 'token' query parameter. The database session is closed before the
+    stream starts so that open streams do not hold on to database connections.
+
+    Args:
+        db: Database session.
+        header_token: JWT access token from the Authorization header.
+        query_token: JWT access token from the query string.
+
+    Returns:
+        User: The authenticated user instance, detached from the session.
+
+    Raises:
+        HTTPException: If no token is given or get_current_user rejects it.
+    """
+    token = header_token or query_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return get_current_user(db=db, token=token)
+    finally:
+        db.close()
+
+
 def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -14,7 +14,7 @@ from app.core.config import settings
 from app.models.user import User as UserModel
 from app.schemas.user import Token, UserCreate
 from app.schemas.user import User as UserSchema
-from app.services.email import send_verification_email
+from app.services.outbox import enqueue_email
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -89,7 +89,7 @@ def register_user(
     user_in: UserCreate,
 ) -> Any:
     """
-    Register a new user and send a verification email.
+    Register a new user and queue a verification email.
 
     Args:
         db: Database session.
@@ -119,12 +119,13 @@ def register_user(
         accepted_terms=user_in.accepted_terms,
     )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
 
+    # Queue the verification email in the same transaction as the new user
     verification_token = security.generate_verification_token(user_in.email)
-    send_verification_email(email_to=user_in.email, token=verification_token)
+    enqueue_email(db, "verification", email_to=user_in.email, token=verification_token)
 
+    db.commit()
+    db.refresh(db_obj)
     return db_obj
 
 
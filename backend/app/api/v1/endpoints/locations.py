@@ -6,13 +6,45 @@ checking inventory availability at locations, and administrative routes
 for managing location data.
 """
 
+import math
+from datetime import datetime
 from typing import Any, List
 
 from app.api import deps
+from app.models.inventory import Inventory as InventoryModel
 from app.models.location import Location as LocationModel
+from app.models.medication import Medication as MedicationModel
+from app.models.stock_ledger import StockMovement as StockMovementModel
 from app.models.user import User as UserModel
-from app.schemas.location import Location, LocationCreate, LocationUpdate
-from fastapi import APIRouter, Depends, HTTPException
+from app.schemas.inventory import (
+    Inventory,
+    InventoryChange,
+    StockHistory,
+    StockLevel,
+    StockReport,
+    StockThresholds,
+)
+from app.schemas.location import (
+    CartItem,
+    DemandForecast,
+    FulfilmentPlan,
+    FulfilmentStop,
+    Location,
+    LocationCreate,
+    LocationForecast,
+    LocationUpdate,
+    NearbyLocation,
+)
+from app.services.availability import missing_items, parse_cart
+from app.services.forecast import demand_forecaster
+from app.services.fulfilment import plan_fulfilment, stock_matrix
+from app.services.inventory import apply_stock_report
+from app.services.location_index import location_index
+from app.services.low_stock import set_thresholds
+from app.services.order_events import publish_location_key_change
+from app.services.pickup_index import pickup_index
+from app.services.stock_ledger import stock_levels
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -29,41 +61,37 @@ def read_locations(
     """
     Retrieve a list of locations (Pharmacies/Vending Machines).
 
-    If a comma-separated list of medication IDs is provided, the service
-    calculates whether all those items are currently in stock at each location.
+    If a cart is provided as comma-separated medication IDs, optionally with a
+    quantity each ('12:2,15'), every location is checked for whether it stocks
+    the requested number of units of all items. Availability of all returned
+    locations is computed from a single inventory query.
 
     Args:
         db: Database session.
         skip: Number of records to skip for pagination.
         limit: Maximum number of records to return.
-        medication_ids: Optional comma-separated string of Medication IDs to check for availability.
+        medication_ids: Optional cart of 'medication_id[:quantity]' items to check for availability.
         current_user: The currently authenticated user.
 
     Returns:
-        List[Location]: A list of location objects, each with an 'is_available' flag.
+        List[Location]: A list of location objects, each with an 'is_available' flag
+            and the cart items it is missing.
+
+    Raises:
+        HTTPException: If the cart cannot be parsed.
     """
     locations = db.query(LocationModel).offset(skip).limit(limit).all()
 
     if medication_ids:
-        from app.models.inventory import Inventory as InventoryModel
-
-        ids = [int(i) for i in medication_ids.split(",") if i.strip()]
+        try:
+            cart = parse_cart(medication_ids)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid medication_ids")
 
+        missing = missing_items(db, [loc.id for loc in locations], cart)  # type: ignore
         for loc in locations:
-            # Check if all requested medications are in stock (quantity > 0)
-            available_items = (
-                db.query(InventoryModel.medication_id)
-                .filter(
-                    InventoryModel.location_id == loc.id,
-                    InventoryModel.medication_id.in_(ids),
-                    InventoryModel.quantity > 0,
-                )
-                .all()
-            )
-
-            # Convert query result to a set of IDs
-            available_set = {item[0] for item in available_items}
-            loc.is_available = all(mid in available_set for mid in ids)
+            loc.missing_items = missing[loc.id]  # type: ignore
+            loc.is_available = not loc.missing_items
     else:
         for loc in locations:
             loc.is_available = True
@@ -71,6 +99,132 @@ def read_locations(
     return locations
 
 
+@router.get("/nearby", response_model=List[NearbyLocation])
+def read_nearby_locations(
+    db: Session = Depends(deps.get_db),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: float = Query(25.0, gt=0, le=500),
+    limit: int = Query(20, gt=0, le=100),
+    medication_ids: str | None = None,
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Retrieve the locations closest to a position, nearest first.
+
+    Candidates are taken from the in-memory spatial index. If a cart is given
+    (same format as for the location list), only locations that can serve it in
+    full are returned.
+
+    Args:
+        db: Database session.
+        lat: Latitude of the search origin in degrees.
+        lon: Longitude of the search origin in degrees.
+        radius: Search radius in kilometres.
+        limit: Maximum number of locations to return.
+        medication_ids: Optional cart of 'medication_id[:quantity]' items locations must stock.
+        current_user: The currently authenticated user.
+
+    Returns:
+        List[NearbyLocation]: The matching locations with their distance.
+
+    Raises:
+        HTTPException: If the cart cannot be parsed.
+    """
+    cart = {}
+    if medication_ids:
+        try:
+            cart = parse_cart(medication_ids)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid medication_ids")
+
+    distances = dict(location_index.nearest(db, lat, lon, radius))
+    if cart:
+        missing = missing_items(db, distances, cart)
+        distances = {
+            loc_id: distance
+            for loc_id, distance in distances.items()
+            if not missing[loc_id]
+        }
+    distances = dict(list(distances.items())[:limit])
+    if not distances:
+        return []
+
+    locations = (
+        db.query(LocationModel).filter(LocationModel.id.in_(list(distances))).all()
+    )
+    for loc in locations:
+        loc.distance_km = round(distances[loc.id], 3)  # type: ignore
+    return sorted(locations, key=lambda loc: loc.distance_km)
+
+
+@router.get("/plan", response_model=FulfilmentPlan)
+def plan_split_fulfilment(
+    db: Session = Depends(deps.get_db),
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    medication_ids: str = Query(...),
+    radius: float = Query(25.0, gt=0, le=500),
+    max_stops: int = Query(3, gt=0, le=10),
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Propose a small set of nearby locations that together serve a cart.
+
+    Intended for carts no single location can serve. Every item is assigned in
+    full to one location; a cart one location can serve yields a single stop.
+
+    Args:
+        db: Database session.
+        lat: Latitude of the customer in degrees.
+        lon: Longitude of the customer in degrees.
+        medication_ids: Cart of 'medication_id[:quantity]' items.
+        radius: Search radius for candidate locations in kilometres.
+        max_stops: Maximum number of locations in the plan.
+        current_user: The currently authenticated user.
+
+    Returns:
+        FulfilmentPlan: The proposed stops and the items that cannot be served.
+
+    Raises:
+        HTTPException: If the cart cannot be parsed.
+    """
+    try:
+        cart = parse_cart(medication_ids)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid medication_ids")
+    if not cart:
+        return FulfilmentPlan()
+
+    candidates = location_index.nearest(db, lat, lon, radius)
+    stock = stock_matrix.stock(db, [loc_id for loc_id, _ in candidates], list(cart))
+    stops, unservable = plan_fulfilment(stock, candidates, cart, max_stops)
+
+    locations = {
+        loc.id: loc
+        for loc in db.query(LocationModel).filter(
+            LocationModel.id.in_([stop.location_id for stop in stops])
+        )
+    }
+    return FulfilmentPlan(
+        stops=[
+            FulfilmentStop(
+                location=Location.model_validate(locations[stop.location_id]),
+                distance_km=round(stop.distance_km, 3),
+                items=[
+                    CartItem(medication_id=med_id, quantity=quantity)
+                    for med_id, quantity in stop.items.items()
+                ],
+            )
+            for stop in stops
+        ],
+        unavailable_items=[
+            CartItem(medication_id=med_id, quantity=quantity)
+            for med_id, quantity in unservable.items()
+        ],
+    )
+
+
 @router.post("/", response_model=Location)
 def create_location(
     *,
@@ -93,6 +247,8 @@ def create_location(
     db.add(location)
     db.commit()
     db.refresh(location)
+    pickup_index.update_location(location.id, location.validation_key)  # type: ignore
+    location_index.update_location(location)
     return location
 
 
@@ -124,12 +280,20 @@ def update_location(
         raise HTTPException(status_code=404, detail="Location not found")
 
     update_data = location_in.model_dump(exclude_unset=True)
+    if (
+        update_data.get("validation_key", location.validation_key)
+        != location.validation_key
+    ):
+        # Other processes drop the old key from their pickup index
+        publish_location_key_change(db, location.id)  # type: ignore
     for field, value in update_data.items():
         setattr(location, field, value)
 
     db.add(location)
     db.commit()
     db.refresh(location)
+    pickup_index.update_location(location.id, location.validation_key)  # type: ignore
+    location_index.update_location(location)
     return location
 
 
@@ -157,6 +321,285 @@ def delete_location(
     location = db.query(LocationModel).filter(LocationModel.id == id).first()
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
+    publish_location_key_change(db, id)
     db.delete(location)
     db.commit()
+    pickup_index.update_location(id, None)
+    location_index.remove_location(id)
     return location
+
+
+def _get_inventory_location(
+    db: Session, id: int, x_machine_token: str | None, token: str | None
+) -> LocationModel:
+    """
+    Load a location and check access to its inventory.
+
+    The location's own machine (by its validation key) and superusers have access.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        x_machine_token: Authorization token from the machine's header.
+        token: Optional JWT access token of a user.
+
+    Returns:
+        LocationModel: The location.
+
+    Raises:
+        HTTPException: If the location does not exist or access is denied.
+    """
+    location = db.get(LocationModel, id)
+    if not location:
+        raise HTTPException(status_code=404, detail="Location not found")
+    if x_machine_token and location.validation_key == x_machine_token:
+        return location
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Machine authorization failed",
+        )
+    deps.get_current_active_superuser(deps.get_current_user(db=db, token=token))
+    return location
+
+
+@router.get("/{id}/inventory", response_model=List[Inventory])
+def read_location_inventory(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
+    token: str | None = Depends(deps.optional_oauth2),
+) -> Any:
+    """
+    Retrieve the stock of a location. Accessible by its machine and superusers.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        x_machine_token: Authorization token from the machine's header.
+        token: Optional JWT access token of a superuser.
+
+    Returns:
+        List[Inventory]: The location's inventory records, ordered by medication ID.
+
+    Raises:
+        HTTPException: If the location does not exist or access is denied.
+    """
+    _get_inventory_location(db, id, x_machine_token, token)
+    return (
+        db.query(InventoryModel)
+        .filter(InventoryModel.location_id == id)
+        .order_by(InventoryModel.medication_id)
+        .all()
+    )
+
+
+@router.put("/{id}/inventory", response_model=List[InventoryChange])
+def replace_location_inventory(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    report: StockReport,
+    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
+    token: str | None = Depends(deps.optional_oauth2),
+) -> Any:
+    """
+    Apply a machine's full stock report. Accessible by its machine and superusers.
+
+    The report lists the units physically present; medications not listed are out
+    of stock. Units held for orders waiting at the location are subtracted, and
+    all changes are written with a single bulk upsert.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        report: The counted stock per medication.
+        x_machine_token: Authorization token from the machine's header.
+        token: Optional JWT access token of a superuser.
+
+    Returns:
+        List[InventoryChange]: The stock levels changed by the report.
+
+    Raises:
+        HTTPException: If the location does not exist, access is denied or the
+            report lists a medication twice or an unknown medication.
+    """
+    _get_inventory_location(db, id, x_machine_token, token)
+
+    counted = {item.medication_id: item.quantity for item in report.items}
+    if len(counted) != len(report.items):
+        raise HTTPException(status_code=400, detail="Duplicate medication in report")
+    known = {
+        med_id
+        for (med_id,) in db.query(MedicationModel.id).filter(
+            MedicationModel.id.in_(list(counted))
+        )
+    }
+    unknown = sorted(set(counted) - known)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown medications: {unknown}")
+
+    changes = apply_stock_report(db, id, counted)
+    db.commit()
+    stock_matrix.invalidate()
+    return [
+        InventoryChange(medication_id=med_id, old_quantity=old, new_quantity=new)
+        for med_id, old, new in changes
+    ]
+
+
+@router.put("/{id}/inventory/thresholds", response_model=List[Inventory])
+def update_location_stock_thresholds(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    thresholds_in: StockThresholds,
+    current_user: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Set the low-stock thresholds of a location's medications. Accessible only by superusers.
+
+    Alerts of the changed medications are raised or closed immediately.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        thresholds_in: The thresholds per medication.
+        current_user: The authenticated superuser.
+
+    Returns:
+        List[Inventory]: The location's inventory records, ordered by medication ID.
+
+    Raises:
+        HTTPException: If the location does not exist or a medication is listed twice
+            or not stocked at the location.
+    """
+    if not db.get(LocationModel, id):
+        raise HTTPException(status_code=404, detail="Location not found")
+    thresholds = {item.medication_id: item.threshold for item in thresholds_in.items}
+    if len(thresholds) != len(thresholds_in.items):
+        raise HTTPException(status_code=400, detail="Duplicate medication in request")
+
+    missing = set_thresholds(db, id, thresholds)
+    if missing:
+        db.rollback()
+        raise HTTPException(
+            status_code=400, detail=f"Medications not stocked here: {missing}"
+        )
+    db.commit()
+    return (
+        db.query(InventoryModel)
+        .filter(InventoryModel.location_id == id)
+        .order_by(InventoryModel.medication_id)
+        .all()
+    )
+
+
+@router.get("/{id}/inventory/history", response_model=StockHistory)
+def read_location_stock_history(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    medication_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(500, gt=0, le=5000),
+    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
+    token: str | None = Depends(deps.optional_oauth2),
+) -> Any:
+    """
+    Retrieve the stock ledger of a location. Accessible by its machine and superusers.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        medication_id: Only include movements of this medication.
+        since: Only include movements at or after this time.
+        until: Only include movements before this time.
+        limit: Maximum number of movements to return.
+        x_machine_token: Authorization token from the machine's header.
+        token: Optional JWT access token of a superuser.
+
+    Returns:
+        StockHistory: The current ledger levels and the movements in the range.
+
+    Raises:
+        HTTPException: If the location does not exist or access is denied.
+    """
+    _get_inventory_location(db, id, x_machine_token, token)
+
+    query = db.query(StockMovementModel).filter(StockMovementModel.location_id == id)
+    if medication_id is not None:
+        query = query.filter(StockMovementModel.medication_id == medication_id)
+    if since is not None:
+        query = query.filter(StockMovementModel.created_at >= since)
+    if until is not None:
+        query = query.filter(StockMovementModel.created_at < until)
+    movements = query.order_by(StockMovementModel.id).limit(limit).all()
+
+    levels = stock_levels(db, id)
+    return StockHistory(
+        levels=[
+            StockLevel(medication_id=med_id, quantity=quantity)
+            for med_id, quantity in sorted(levels.items())
+            if medication_id is None or med_id == medication_id
+        ],
+        movements=movements,
+    )
+
+
+@router.get("/{id}/forecast", response_model=LocationForecast)
+def read_location_forecast(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    horizon_days: int = Query(7, gt=0, le=60),
+    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
+    token: str | None = Depends(deps.optional_oauth2),
+) -> Any:
+    """
+    Forecast the demand at a location for restock planning. Accessible by its machine
+    and superusers.
+
+    Args:
+        db: Database session.
+        id: The ID of the location.
+        horizon_days: Number of days to forecast, starting today.
+        x_machine_token: Authorization token from the machine's header.
+        token: Optional JWT access token of a superuser.
+
+    Returns:
+        LocationForecast: The expected demand and restock quantity per medication.
+
+    Raises:
+        HTTPException: If the location does not exist or access is denied.
+    """
+    _get_inventory_location(db, id, x_machine_token, token)
+
+    history_until, demand = demand_forecaster.forecast(db, id, horizon_days)
+    stock = dict(
+        db.query(InventoryModel.medication_id, InventoryModel.quantity).filter(
+            InventoryModel.location_id == id
+        )
+    )
+    items = []
+    for medication_id in sorted(set(stock) | set(demand)):
+        rate, expected = demand.get(medication_id, (0.0, 0.0))
+        quantity = stock.get(medication_id) or 0
+        items.append(
+            DemandForecast(
+                medication_id=medication_id,
+                daily_rate=round(rate, 3),
+                expected_demand=round(expected, 2),
+                stock=quantity,
+                days_of_cover=round(quantity / rate, 1) if rate > 0 else None,
+                restock_quantity=max(math.ceil(round(expected, 2)) - quantity, 0),
+            )
+        )
+    return LocationForecast(
+        location_id=id,
+        history_until=history_until,
+        horizon_days=horizon_days,
+        items=items,
+    )
@@ -1,7 +1,7 @@
 """
 Medication catalog endpoints for the MeTIMat API.
 
-This module provides routes for browsing the medication catalog,
+This module provides routes for browsing and searching the medication catalog,
 as well as administrative routes for managing medication entries.
 """
 
@@ -10,8 +10,14 @@ from typing import Any, List
 from app.api import deps
 from app.models.medication import Medication as MedicationModel
 from app.models.user import User as UserModel
-from app.schemas.medication import Medication, MedicationCreate, MedicationUpdate
-from fastapi import APIRouter, Depends, HTTPException
+from app.schemas.medication import (
+    Medication,
+    MedicationCreate,
+    MedicationSearchResult,
+    MedicationUpdate,
+)
+from app.services.medication_search import medication_index, search_medications
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -62,9 +68,90 @@ def create_medication(
     db.add(medication)
     db.commit()
     db.refresh(medication)
+    medication_index.invalidate()
     return medication
 
 
+def _parse_cursor(after: str) -> tuple[int, int]:
+    """
+    Parse a search cursor of the form '<score>,<id>'.
+
+    Args:
+        after: The cursor string as returned in the 'X-Next-Cursor' header.
+
+    Returns:
+        tuple[int, int]: The score and ID of the last seen result.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        score, medication_id = after.split(",")
+        return int(score), int(medication_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor, expected '<score>,<id>'",
+        )
+
+
+@router.get("/search", response_model=List[MedicationSearchResult])
+def search_catalog(
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    q: str = Query(..., min_length=1, max_length=100),
+    category: str | None = None,
+    prescription_required: bool | None = None,
+    is_active: bool | None = None,
+    limit: int = Query(20, gt=0, le=100),
+    after: str | None = None,
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Search the medication catalog by name, PZN, manufacturer and dosage.
+
+    Matches are ranked: an exact PZN first, then name or PZN prefixes, then
+    substrings, each ordered by trigram similarity, so misspelled queries still
+    find close matches. Pass the cursor from the 'X-Next-Cursor' response header as
+    'after' to fetch the next page.
+
+    Args:
+        response: The outgoing response, used to set the 'X-Next-Cursor' header.
+        db: Database session.
+        q: The search query.
+        category: Only include medications of this category.
+        prescription_required: Only include medications with this prescription flag.
+        is_active: Only include medications with this active flag.
+        limit: Maximum number of results to return.
+        after: Optional keyset cursor '<score>,<id>' of the last result already seen.
+        current_user: The currently authenticated user.
+
+    Returns:
+        List[MedicationSearchResult]: The matching medications, best match first.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+    results = search_medications(
+        db,
+        q,
+        limit,
+        after=_parse_cursor(after) if after else None,
+        category=category,
+        prescription_required=prescription_required,
+        is_active=is_active,
+    )
+    if results and len(results) == limit:
+        last, score = results[-1]
+        response.headers["X-Next-Cursor"] = f"{score},{last.id}"
+    return [
+        MedicationSearchResult(
+            **Medication.model_validate(medication).model_dump(), score=score
+        )
+        for medication, score in results
+    ]
+
+
 @router.get("/{id}", response_model=Medication)
 def read_medication(
     *,
@@ -126,6 +213,7 @@ def update_medication(
     db.add(medication)
     db.commit()
     db.refresh(medication)
+    medication_index.invalidate()
     return medication
 
 
@@ -155,4 +243,5 @@ def delete_medication(
         raise HTTPException(status_code=404, detail="Medication not found")
     db.delete(medication)
     db.commit()
+    medication_index.invalidate()
     return medication
@@ -3,77 +3,468 @@ Order management and fulfillment endpoints for the MeTIMat API.
 
 This module provides routes for creating, retrieving, updating, and completing customer orders.
 It also includes specialized endpoints for QR code validation by automated vending machines
-and handles order-related email notifications.
+and queues order-related email notifications in the transactional outbox. Status changes
+are pushed to the order owner over a server-sent event stream.
 """
 
+import asyncio
+import json
 import logging
 import secrets
+from datetime import date, datetime, timedelta
 from typing import Any, List
 
 from app.api import deps
+from app.core.config import settings
+from app.models.location import Location as LocationModel
 from app.models.medication import Medication as MedicationModel
 from app.models.order import Order as OrderModel
 from app.models.order import OrderMedication
+from app.models.order_archive import ArchivedOrder, ArchivedOrderMedication
+from app.models.order_stats import OrderStat
 from app.models.prescription import Prescription as PrescriptionModel
 from app.models.user import User as UserModel
 from app.schemas.order import (
     Order,
+    OrderBulkCreate,
+    OrderBulkItem,
+    OrderBulkResult,
     OrderCreate,
+    OrderStatusBulkResult,
+    OrderStatusBulkUpdate,
+    OrderStatusCount,
+    OrderSummary,
     OrderUpdate,
     QRScanRequest,
     QRValidationResponse,
 )
-from app.services.email import (
-    send_order_confirmation_email,
-    send_pickup_confirmation_email,
-    send_pickup_ready_email,
+from app.services.idempotency import (
+    IdempotencyKeyMismatch,
+    claim_key,
+    request_fingerprint,
 )
-from fastapi import APIRouter, Depends, Header, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from app.services.inventory import (
+    InsufficientStockError,
+    order_quantities,
+    release_order_stock,
+    reserve_stock,
+)
+from app.services.order_events import order_events, publish_status_change
+from app.services.order_stats import (
+    record_created,
+    record_deleted,
+    record_transition,
+)
+from app.services.order_transitions import INITIAL_STATUS, transition_orders
+from app.services.outbox import enqueue_email
+from app.services.pickup_index import PICKUP_STATUS, pickup_index
+from app.services.pickup_tokens import (
+    InvalidPickupToken,
+    check_token,
+    issue_pickup_token,
+)
+from app.services.qr import MEDIA_TYPES, qr_cache_key, render_qr
+from app.services.stock_ledger import order_movements, record_movements
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Flat fee charged per prescription in an order
+PRESCRIPTION_FEE = 5.0
+
+# Order columns and relationships that can be requested via '?fields='
+ORDER_COLUMNS = (
+    "id",
+    "user_id",
+    "location_id",
+    "status",
+    "access_token",
+    "total_price",
+    "created_at",
+    "updated_at",
+)
+ORDER_RELATIONSHIPS = ("location", "prescriptions", "medication_items", "medications")
+
+# Validators for single fields of the Order schema, used for sparse responses
+_FIELD_ADAPTERS = {
+    name: TypeAdapter(field.annotation) for name, field in Order.model_fields.items()
+}
+
+
+# Order item model belonging to the live and the archived order model
+_ITEM_MODELS: dict[type, type] = {
+    OrderModel: OrderMedication,
+    ArchivedOrder: ArchivedOrderMedication,
+}
+
+
+def _order_load_options(model: type = OrderModel) -> list:
+    """
+    Loader options used whenever an order is returned with its relationships.
+
+    The many-to-one location is joined into the main query, while the collections
+    are fetched with one additional batched IN query each. This avoids the cartesian
+    row explosion a chain of joinedloads produces for orders with many items.
+
+    Args:
+        model: The order model being queried (Order or ArchivedOrder).
+
+    Returns:
+        list: SQLAlchemy loader options for the order model.
+    """
+    return [
+        joinedload(model.location),  # type: ignore
+        selectinload(model.prescriptions),  # type: ignore
+        selectinload(model.medication_items).joinedload(  # type: ignore
+            _ITEM_MODELS[model].medication  # type: ignore
+        ),
+    ]
+
+
+def _parse_fields(fields: str | None, view: str) -> list[str] | None:
+    """
+    Resolve the 'fields' and 'view' query parameters to the requested order fields.
+
+    Args:
+        fields: Comma-separated field names, overriding 'view'.
+        view: 'full' or 'summary'.
+
+    Returns:
+        list[str] | None: The requested fields, or None for the full representation.
+
+    Raises:
+        HTTPException: If an unknown field or view is requested.
+    """
+    if fields:
+        names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = set(names) - set(ORDER_COLUMNS) - set(ORDER_RELATIONSHIPS)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        return names
+    if view == "summary":
+        return list(OrderSummary.model_fields)
+    if view != "full":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid view, expected 'full' or 'summary'",
+        )
+    return None
+
+
+def _projection_options(names: list[str] | None, model: type = OrderModel) -> list:
+    """
+    Build loader options that fetch only the columns and relationships in 'names'.
+
+    The ID and creation timestamp are always loaded since keyset pagination needs them.
+
+    Args:
+        names: The requested fields, or None for the full representation.
+        model: The order model being queried (Order or ArchivedOrder).
+
+    Returns:
+        list: Options for Query.options().
+    """
+    if names is None:
+        return _order_load_options(model)
+    columns = {"id", "created_at", "user_id"} | (set(names) & set(ORDER_COLUMNS))
+    options: list = [load_only(*[getattr(model, c) for c in columns])]
+    if "location" in names:
+        options.append(joinedload(model.location))  # type: ignore
+    if "prescriptions" in names:
+        options.append(selectinload(model.prescriptions))  # type: ignore
+    if "medication_items" in names or "medications" in names:
+        options.append(
+            selectinload(model.medication_items).joinedload(  # type: ignore
+                _ITEM_MODELS[model].medication  # type: ignore
+            )
+        )
+    return options
+
+
+def _project(order: OrderModel, names: list[str]) -> dict[str, Any]:
+    """
+    Serialize only the requested fields of an order.
+
+    Args:
+        order: The order loaded with _projection_options(names).
+        names: The requested fields.
+
+    Returns:
+        dict[str, Any]: JSON-compatible field values, validated against the Order schema.
+    """
+    result = {}
+    for name in names:
+        adapter = _FIELD_ADAPTERS[name]
+        value = adapter.validate_python(getattr(order, name), from_attributes=True)
+        result[name] = adapter.dump_python(value, mode="json")
+    return result
+
+
+def _count_ids(ids: List[int] | None) -> dict[int, int]:
+    """
+    Count how often each ID occurs in a list of item IDs.
+
+    Args:
+        ids: Item IDs, where repeated IDs denote a higher quantity.
+
+    Returns:
+        dict[int, int]: Quantity per ID, in order of first occurrence.
+    """
+    counts: dict[int, int] = {}
+    for item_id in ids or []:
+        counts[item_id] = counts.get(item_id, 0) + 1
+    return counts
+
+
+def _confirmation_items(
+    prescriptions: List[PrescriptionModel],
+    medications: List[tuple[MedicationModel, int]],
+) -> list[dict]:
+    """
+    Build the item list of an order confirmation email.
+
+    Prescriptions are grouped by medication name, direct medications are listed
+    with their ordered quantity.
+
+    Args:
+        prescriptions: The prescriptions included in the order.
+        medications: Pairs of directly ordered medication and quantity.
+
+    Returns:
+        list[dict]: Items with name, quantity and price.
+    """
+    items = []
+    prescription_counts: dict[str, int] = {}
+    for p in prescriptions:
+        med_name = (
+            p.medication_name
+            or (p.fhir_data.get("medication_name") if p.fhir_data else None)
+            or "Verschriebenes Medikament"
+        )
+        prescription_counts[med_name] = prescription_counts.get(med_name, 0) + 1  # type: ignore
+
+    for name, count in prescription_counts.items():
+        items.append(
+            {"name": name, "quantity": count, "price": PRESCRIPTION_FEE * count}
+        )
+    for m, qty in medications:
+        items.append({"name": m.name, "quantity": qty, "price": float(m.price) * qty})  # type: ignore
+    return items
+
+
+def _parse_cursor(after: str) -> tuple[datetime, int]:
+    """
+    Parse a keyset pagination cursor of the form '<created_at>,<id>'.
+
+    Args:
+        after: The cursor string as returned in the 'X-Next-Cursor' header.
+
+    Returns:
+        tuple[datetime, int]: The creation timestamp and ID of the last seen order.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        created_at, order_id = after.rsplit(",", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor, expected '<created_at>,<id>'",
+        )
+
 
 @router.get("/", response_model=List[Order])
 def read_orders(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    after: str | None = None,
+    fields: str | None = None,
+    view: str = "full",
+    include_archived: bool = False,
     current_user: UserModel = Depends(deps.get_current_user),
 ) -> Any:
     """
     Retrieve a list of orders.
 
     Normal users see only their own orders, while superusers can see all orders in the system.
+    Orders are returned oldest first. Instead of 'skip', clients can pass the cursor from the
+    'X-Next-Cursor' response header as 'after' to fetch the next page via the
+    (created_at, id) index, which keeps the cost per page constant regardless of depth.
+
+    With 'view=summary' or a comma-separated 'fields' list only the requested columns
+    and relationships are loaded and serialized, e.g. 'fields=id,status,total_price'.
+
+    Archived orders are only included with 'include_archived=true'.
 
     Args:
+        response: The outgoing response, used to set the 'X-Next-Cursor' header.
         db: Database session.
-        skip: Number of records to skip for pagination.
+        skip: Number of records to skip for pagination (ignored when 'after' is set).
         limit: Maximum number of records to return.
+        after: Optional keyset cursor '<created_at>,<id>' of the last order already seen.
+        fields: Optional comma-separated list of order fields to return.
+        view: 'full' (default) or 'summary' (id, status, total, location and timestamps).
+        include_archived: Whether to include orders moved to the archive tables.
         current_user: The currently authenticated user.
 
     Returns:
-        List[Order]: A list of order objects with related data (user, location, medications).
-    """
-    query = db.query(OrderModel)
-    if not current_user.is_superuser:  # type: ignore
-        query = query.filter(OrderModel.user_id == current_user.id)
-
-    orders = (
-        query.options(
-            joinedload(OrderModel.user),
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
+        List[Order]: A list of order objects with related data (location, medications),
+            reduced to the requested fields if 'fields' or 'view' is given.
+
+    Raises:
+        HTTPException: If the cursor, fields or view are invalid.
+    """
+    names = _parse_fields(fields, view)
+    cursor = _parse_cursor(after) if after else None
+
+    def build_query(model: type):
+        query = db.query(model)
+        if not current_user.is_superuser:  # type: ignore
+            query = query.filter(model.user_id == current_user.id)  # type: ignore
+        query = query.options(*_projection_options(names, model)).order_by(
+            model.created_at, model.id  # type: ignore
+        )
+        if cursor:
+            query = query.filter(tuple_(model.created_at, model.id) > cursor)  # type: ignore
+        return query
+
+    if include_archived:
+        # Merge the first pages of both tables; each is read via its keyset index
+        fetch = limit if cursor else skip + limit
+        orders = sorted(
+            build_query(OrderModel).limit(fetch).all()
+            + build_query(ArchivedOrder).limit(fetch).all(),
+            key=lambda o: (o.created_at, o.id),
         )
-        .offset(skip)
-        .limit(limit)
+        orders = orders[:limit] if cursor else orders[skip : skip + limit]
+    elif cursor:
+        orders = build_query(OrderModel).limit(limit).all()
+    else:
+        orders = build_query(OrderModel).offset(skip).limit(limit).all()
+
+    if orders and len(orders) == limit:
+        last = orders[-1]
+        response.headers["X-Next-Cursor"] = f"{last.created_at.isoformat()},{last.id}"
+    if names is not None:
+        return JSONResponse(
+            [_project(order, names) for order in orders],
+            headers=dict(response.headers),
+        )
+    return orders
+
+
+@router.get("/stats", response_model=List[OrderStatusCount])
+def read_order_stats(
+    db: Session = Depends(deps.get_db),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    location_id: int | None = None,
+    current_user: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Retrieve the number of orders per location and status for the admin dashboard.
+    Accessible only by superusers.
+
+    Served from the order_stats counters, so the cost depends on the number of
+    locations and days in the range rather than on the number of orders.
+
+    Args:
+        db: Database session.
+        date_from: Only count orders created on or after this day.
+        date_to: Only count orders created on or before this day.
+        location_id: Only count orders of this location.
+        current_user: The authenticated superuser.
+
+    Returns:
+        List[OrderStatusCount]: Order counts per location and status.
+    """
+    total = func.sum(OrderStat.count)
+    query = db.query(OrderStat.location_id, OrderStat.status, total)
+    if date_from:
+        query = query.filter(OrderStat.day >= date_from)
+    if date_to:
+        query = query.filter(OrderStat.day <= date_to)
+    if location_id is not None:
+        query = query.filter(OrderStat.location_id == location_id)
+    rows = (
+        query.group_by(OrderStat.location_id, OrderStat.status)
+        .having(total > 0)
+        .order_by(OrderStat.location_id, OrderStat.status)
         .all()
     )
-    return orders
+    return [
+        OrderStatusCount(location_id=loc or None, status=st, count=count)
+        for loc, st, count in rows
+    ]
+
+
+@router.get("/stream")
+async def stream_order_events(
+    request: Request,
+    current_user: UserModel = Depends(deps.get_current_stream_user),
+) -> StreamingResponse:
+    """
+    Stream status changes of the current user's orders as server-sent events.
+
+    Each committed status change is sent as an 'order_status' event whose data is
+    a JSON object with order_id, status and timestamp. Idle streams receive a
+    keepalive comment every ORDER_EVENTS_KEEPALIVE_SECONDS. Since events are not
+    replayed, clients should re-read the orders they display after (re)connecting.
+
+    Args:
+        request: The incoming request, used to detect disconnected clients.
+        current_user: The authenticated user (header or 'token' query parameter).
+
+    Returns:
+        StreamingResponse: The 'text/event-stream' response.
+    """
+    user_id = current_user.id
+
+    async def event_stream():
+        queue = order_events.subscribe(user_id)  # type: ignore
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    order_event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.ORDER_EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                data = {k: v for k, v in order_event.items() if k != "user_id"}
+                yield f"event: order_status\ndata: {json.dumps(data)}\n\n"
+        finally:
+            order_events.unsubscribe(user_id, queue)  # type: ignore
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/", response_model=Order)
@@ -81,6 +472,7 @@ def create_order(
     *,
     db: Session = Depends(deps.get_db),
     order_in: OrderCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
     current_user: UserModel = Depends(deps.get_current_user),
 ) -> Any:
     """
@@ -88,148 +480,390 @@ def create_order(
 
     Validates that prescription-only medications are not ordered without a linked prescription.
     Calculates the total price and generates a unique access token for pickup.
-    Sends a confirmation email upon successful creation.
+    Queues a confirmation email in the outbox within the same transaction.
+
+    New orders always start in status 'pending', a status in the payload is
+    ignored; later statuses are set through the status update endpoints, which
+    also start the pickup deadlines and notifications.
+
+    The ordered items are reserved from the location's stock with atomic conditional
+    updates, so concurrent orders can never take the same last unit.
+
+    Medications are fetched once, the order, its items and the outbox entry are written
+    in batched statements, and the response is built from the objects already loaded,
+    so no reload is needed after the commit.
+
+    Retries sent with the same 'Idempotency-Key' header as a successful request are
+    answered with the stored original response (marked with 'Idempotent-Replayed: true')
+    without creating another order.
 
     Args:
         db: Database session.
         order_in: Order creation schema containing location and item IDs.
+        idempotency_key: Optional client-generated key identifying the request.
         current_user: The currently authenticated user.
 
     Returns:
         Order: The newly created order object.
 
     Raises:
-        HTTPException: If prescription-required medications are ordered directly.
+        HTTPException: If prescription-required medications are ordered directly, a
+            prescription was already redeemed, the location does not exist or does not have the items in stock, or the
+            idempotency key was already used for a different request.
     """
+    idempotency_record = None
+    if idempotency_key:
+        try:
+            idempotency_record, replay = claim_key(
+                db,
+                current_user.id,  # type: ignore
+                idempotency_key,
+                request_fingerprint(order_in.model_dump()),
+            )
+        except IdempotencyKeyMismatch:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request",
+            )
+        if replay:
+            return JSONResponse(
+                idempotency_record.response, headers={"Idempotent-Replayed": "true"}
+            )
+
     logger.info(
         f"Creating new order for user {current_user.id} at location {order_in.location_id}"
     )
 
+    # Count occurrences in the list to determine quantities
+    med_counts = _count_ids(order_in.medication_ids)
+
+    # Medications are fetched once, for both the prescription check and pricing
+    meds = (
+        db.query(MedicationModel).filter(MedicationModel.id.in_(med_counts)).all()
+        if med_counts
+        else []
+    )
+
     # Validate that no prescription-only medications are ordered directly
-    if order_in.medication_ids:
-        forbidden_meds = (
-            db.query(MedicationModel)
-            .filter(
-                MedicationModel.id.in_(order_in.medication_ids),
-                MedicationModel.prescription_required,
-            )
-            .all()
+    forbidden_meds = [m for m in meds if m.prescription_required]  # type: ignore
+    if forbidden_meds:
+        names = ", ".join([m.name for m in forbidden_meds])  # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The following medications require a prescription and cannot be ordered directly: {names}",
         )
-        if forbidden_meds:
-            names = ", ".join([m.name for m in forbidden_meds])  # type: ignore
+
+    prescriptions = (
+        db.query(PrescriptionModel)
+        .filter(PrescriptionModel.id.in_(order_in.prescription_ids))
+        .all()
+        if order_in.prescription_ids
+        else []
+    )
+    used = [p.id for p in prescriptions if _prescription_used(p)]
+    if used:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Prescriptions already used: {used}",
+        )
+    for p in prescriptions:
+        # Update FHIR status to completed to invalidate for future use
+        if p.fhir_data:  # type: ignore
+            p.fhir_data = {**p.fhir_data, "status": "completed"}  # type: ignore
+
+    location = None
+    if order_in.location_id is not None:
+        location = db.get(LocationModel, order_in.location_id)
+        if not location:
+            raise HTTPException(status_code=404, detail="Location not found")
+
+    order_meds = [(m, med_counts[m.id]) for m in meds]  # type: ignore
+    total_price = sum(float(m.price) * qty for m, qty in order_meds)  # type: ignore
+    # Add prescription fees (flat fee per prescription)
+    total_price += len(order_in.prescription_ids or []) * PRESCRIPTION_FEE
+
+    # Take the items from the location's stock; the request fails as a whole otherwise
+    quantities = order_quantities(
+        [(m.id, qty) for m, qty in order_meds],
+        [p.medication_id for p in prescriptions],
+    )
+    if location is not None:
+        try:
+            reserve_stock(db, location.id, quantities)  # type: ignore
+        except InsufficientStockError as e:
+            names = {p.medication_id: p.medication_name for p in prescriptions}
+            names.update({m.id: m.name for m in meds})
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"The following medications require a prescription and cannot be ordered directly: {names}",
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Not enough stock at this location: {names.get(e.medication_id) or e.medication_id}",
             )
 
+    # The association objects and prescriptions are written in batches on flush
     db_obj = OrderModel(
         user_id=current_user.id,
-        location_id=order_in.location_id,
-        status=order_in.status,
+        location=location,
+        status=INITIAL_STATUS,
         access_token=secrets.token_urlsafe(32),
-        total_price=0.0,
+        total_price=total_price,
+        stock_reserved=location is not None,
+        prescriptions=prescriptions,
+        medication_items=[
+            OrderMedication(medication=m, quantity=qty) for m, qty in order_meds
+        ],
     )
     db.add(db_obj)
     db.flush()
-
-    if order_in.prescription_ids:
-        prescriptions = (
-            db.query(PrescriptionModel)
-            .filter(PrescriptionModel.id.in_(order_in.prescription_ids))
-            .all()
-        )
-        db_obj.prescriptions = prescriptions
-        for p in prescriptions:
-            # Update FHIR status to completed to invalidate for future use
-            if p.fhir_data:  # type: ignore
-                updated_data = dict(p.fhir_data)  # type: ignore
-                updated_data["status"] = "completed"  # type: ignore
-                p.fhir_data = updated_data  # type: ignore
-
-    # Link direct medications and calculate price using quantities
-    if order_in.medication_ids:
-        # Count occurrences in the list to determine quantity
-        med_counts = {}
-        for m_id in order_in.medication_ids:
-            med_counts[m_id] = med_counts.get(m_id, 0) + 1
-
-        meds = (
-            db.query(MedicationModel)
-            .filter(MedicationModel.id.in_(med_counts.keys()))
-            .all()
+    issue_pickup_token(db_obj, timedelta(hours=settings.PICKUP_TOKEN_TTL_HOURS))
+    record_created(db, [db_obj])
+    if location is not None:
+        record_movements(
+            db,
+            "reserve",
+            order_movements(location.id, quantities, -1, db_obj.id),  # type: ignore
         )
 
-        for m in meds:
-            qty = med_counts[m.id]
-            # Create the association object with the specific quantity
-            assoc = OrderMedication(
-                order_id=db_obj.id, medication_id=m.id, quantity=qty
-            )
-            db.add(assoc)
-            db_obj.total_price += float(m.price) * qty  # type: ignore
-
-    # Add prescription fees (assumed 5.00€ flat fee per prescription)
-    if order_in.prescription_ids:
-        db_obj.total_price += len(order_in.prescription_ids) * 5.0  # type: ignore
+    # Queue the order confirmation email in the same transaction as the order
+    enqueue_email(
+        db,
+        "order_confirmation",
+        email_to=current_user.email,
+        order_id=db_obj.id,
+        items=_confirmation_items(prescriptions, order_meds),
+        total_price=total_price,
+    )
 
+    # Serialize from the objects already in the session instead of reloading them
+    order = Order.model_validate(db_obj)
+    if idempotency_record is not None:
+        idempotency_record.order_id = order.id  # type: ignore
+        idempotency_record.response = order.model_dump(mode="json")  # type: ignore
     db.commit()
 
-    # Reload with all relationships
-    db_obj = (
-        db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
-        )
-        .filter(OrderModel.id == db_obj.id)
-        .first()
+    logger.info(
+        f"Order {order.id} created successfully with access token {order.access_token[:8]}..."  # type: ignore
     )
+    return order
 
-    # Send order confirmation email
-    try:
-        items = []
-        total_price = float(db_obj.total_price)  # type: ignore
 
-        # Add prescriptions to items list (grouped by name)
-        prescription_counts = {}
-        for p in db_obj.prescriptions:  # type: ignore
-            med_name = (
-                p.medication_name
-                or (p.fhir_data.get("medication_name") if p.fhir_data else None)
-                or "Verschriebenes Medikament"
-            )
-            prescription_counts[med_name] = prescription_counts.get(med_name, 0) + 1
+def _prescription_used(prescription: PrescriptionModel) -> bool:
+    """
+    Check whether a prescription was already redeemed by an active or archived order.
+    """
+    return (
+        prescription.order_id is not None or prescription.archived_order_id is not None
+    )
 
-        for name, count in prescription_counts.items():
-            items.append({"name": name, "quantity": count, "price": 5.0 * count})
-
-        # Add OTC medications using the stored quantities
-        for item in db_obj.medication_items:  # type: ignore
-            m = item.medication
-            items.append(
-                {
-                    "name": m.name,
-                    "quantity": item.quantity,
-                    "price": float(m.price) * item.quantity,
-                }
+
+def _bulk_item_error(
+    item: OrderBulkItem,
+    user_id: int,
+    users: dict,
+    known_locations: set[int],
+    meds: dict[int, MedicationModel],
+    prescriptions: dict[int, PrescriptionModel],
+    claimed_prescriptions: set[int],
+) -> str | None:
+    """
+    Validate a single order of a bulk import against the preloaded reference data.
+
+    Returns:
+        str | None: The reason the order is rejected, or None if it is valid.
+    """
+    if user_id not in users:
+        return f"User {user_id} not found"
+    if item.location_id and item.location_id not in known_locations:
+        return f"Location {item.location_id} not found"
+
+    med_ids = list(dict.fromkeys(item.medication_ids or []))
+    missing = [m_id for m_id in med_ids if m_id not in meds]
+    if missing:
+        return f"Medications not found: {missing}"
+    forbidden = [meds[m_id].name for m_id in med_ids if meds[m_id].prescription_required]  # type: ignore
+    if forbidden:
+        names = ", ".join(forbidden)  # type: ignore
+        return f"The following medications require a prescription and cannot be ordered directly: {names}"
+
+    unusable = [
+        p_id
+        for p_id in dict.fromkeys(item.prescription_ids or [])
+        if p_id not in prescriptions
+        or _prescription_used(prescriptions[p_id])
+        or p_id in claimed_prescriptions
+    ]
+    if unusable:
+        return f"Prescriptions not found or already used: {unusable}"
+    return None
+
+
+@router.post("/bulk", response_model=List[OrderBulkResult])
+def create_orders_bulk(
+    *,
+    db: Session = Depends(deps.get_db),
+    bulk_in: OrderBulkCreate,
+    current_user: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Create many orders at once, e.g. for back-office imports from partner pharmacies.
+    Accessible only by superusers.
+
+    All referenced users, locations, medications and prescriptions are loaded with one
+    query per table, and orders, medication items and confirmation emails are inserted in
+    batches within a single transaction. Invalid orders, including orders whose items are
+    not in stock at their location, are reported and skipped without affecting the valid
+    ones. Like single orders, imported orders start in status 'pending'.
+
+    Args:
+        db: Database session.
+        bulk_in: The orders to create.
+        current_user: The authenticated superuser.
+
+    Returns:
+        List[OrderBulkResult]: The outcome for each order, in request order.
+    """
+    items = bulk_in.orders
+    user_ids = {item.user_id or current_user.id for item in items}
+    location_ids = {item.location_id for item in items if item.location_id}
+    medication_ids = {m for item in items for m in item.medication_ids or []}
+    prescription_ids = {p for item in items for p in item.prescription_ids or []}
+
+    users = dict(
+        db.query(UserModel.id, UserModel.email).filter(UserModel.id.in_(user_ids)).all()
+    )
+    known_locations = {
+        row.id
+        for row in db.query(LocationModel.id)
+        .filter(LocationModel.id.in_(location_ids))
+        .all()
+    }
+    meds = {
+        m.id: m
+        for m in db.query(MedicationModel)
+        .filter(MedicationModel.id.in_(medication_ids))
+        .all()
+    }
+    prescriptions = {
+        p.id: p
+        for p in db.query(PrescriptionModel)
+        .filter(PrescriptionModel.id.in_(prescription_ids))
+        .all()
+    }
+
+    results: List[OrderBulkResult] = []
+    # (result, order, [(medication, quantity)], [prescriptions]) for accepted orders
+    accepted = []
+    claimed_prescriptions: set[int] = set()
+    for index, item in enumerate(items):
+        user_id = item.user_id or current_user.id
+        med_counts = _count_ids(item.medication_ids)
+        item_prescription_ids = list(dict.fromkeys(item.prescription_ids or []))
+
+        error = _bulk_item_error(
+            item,
+            user_id,
+            users,
+            known_locations,
+            meds,
+            prescriptions,
+            claimed_prescriptions,
+        )
+
+        if error is None and item.location_id:
+            # Reserve within a savepoint so a shortage only rejects this order
+            savepoint = db.begin_nested()
+            try:
+                reserve_stock(
+                    db,
+                    item.location_id,
+                    order_quantities(
+                        med_counts.items(),
+                        [
+                            prescriptions[p_id].medication_id
+                            for p_id in item_prescription_ids
+                        ],
+                    ),
+                )
+                savepoint.commit()
+            except InsufficientStockError as e:
+                savepoint.rollback()
+                error = f"Not enough stock at location {item.location_id} for medication {e.medication_id}"
+
+        result = OrderBulkResult(index=index, success=error is None, error=error)
+        results.append(result)
+        if error:
+            continue
+
+        claimed_prescriptions.update(item_prescription_ids)
+        order_meds = [(meds[m_id], qty) for m_id, qty in med_counts.items()]
+        order_prescriptions = [prescriptions[p_id] for p_id in item_prescription_ids]
+        order = OrderModel(
+            user_id=user_id,
+            location_id=item.location_id,
+            status=INITIAL_STATUS,
+            access_token=secrets.token_urlsafe(32),
+            total_price=sum(float(m.price) * qty for m, qty in order_meds)  # type: ignore
+            + len(order_prescriptions) * PRESCRIPTION_FEE,
+            stock_reserved=bool(item.location_id),
+        )
+        accepted.append((result, order, order_meds, order_prescriptions))
+
+    if not accepted:
+        return results
+
+    # Inserted as one batched INSERT ... RETURNING to obtain all IDs
+    db.add_all([order for _, order, _, _ in accepted])
+    db.flush()
+    for _, order, _, _ in accepted:
+        issue_pickup_token(order, timedelta(hours=settings.PICKUP_TOKEN_TTL_HOURS))
+    record_created(db, [order for _, order, _, _ in accepted])
+    record_movements(
+        db,
+        "reserve",
+        [
+            movement
+            for _, order, order_meds, order_prescriptions in accepted
+            if order.location_id
+            for movement in order_movements(
+                order.location_id,  # type: ignore
+                order_quantities(
+                    [(m.id, qty) for m, qty in order_meds],
+                    [p.medication_id for p in order_prescriptions],
+                ),
+                -1,
+                order.id,  # type: ignore
             )
+        ],
+    )
 
-        send_order_confirmation_email(
-            email_to=current_user.email,  # type: ignore
-            order_id=db_obj.id,  # type: ignore
-            items=items,
-            total_price=total_price,
+    association_rows = []
+    for result, order, order_meds, order_prescriptions in accepted:
+        result.order_id = order.id  # type: ignore
+        association_rows.extend(
+            {"order_id": order.id, "medication_id": m.id, "quantity": qty}
+            for m, qty in order_meds
         )
-    except Exception as e:
-        logger.error(f"Failed to send order confirmation email: {e}")
+        for p in order_prescriptions:
+            p.order_id = order.id
+            # Update FHIR status to completed to invalidate for future use
+            if p.fhir_data:  # type: ignore
+                p.fhir_data = {**p.fhir_data, "status": "completed"}  # type: ignore
+        enqueue_email(
+            db,
+            "order_confirmation",
+            email_to=users[order.user_id],
+            order_id=order.id,
+            items=_confirmation_items(order_prescriptions, order_meds),
+            total_price=float(order.total_price),  # type: ignore
+        )
+
+    if association_rows:
+        db.execute(insert(OrderMedication), association_rows)
+    db.commit()
 
     logger.info(
-        f"Order {db_obj.id} created successfully with access token {db_obj.access_token[:8]}..."  # type: ignore
+        f"Bulk import created {len(accepted)} of {len(items)} orders "
+        f"for user {current_user.id}"
     )
-    return db_obj
+    return results
 
 
 @router.post("/validate-qr", response_model=QRValidationResponse)
@@ -243,7 +877,11 @@ def validate_qr_order(
     Validate an order's QR code token.
 
     Used by the vending machine hardware to check if a scanned QR code corresponds
-    to a valid order that is ready for pickup at that specific machine.
+    to a valid order that is ready for pickup at that specific machine. Malformed
+    codes and signed tokens that are forged, expired or meant for another machine
+    are rejected before any lookup; other scans are answered from the in-memory
+    pickup index without database access when possible, and fall back to the
+    database otherwise.
 
     Args:
         db: Database session.
@@ -256,15 +894,31 @@ def validate_qr_order(
     Raises:
         HTTPException: If the machine's token does not match the order's location.
     """
+    # Reject garbage, forged, expired and wrong-location codes without database access
+    try:
+        claims = check_token(request.qr_data)
+    except InvalidPickupToken as e:
+        logger.info(f"Rejected QR scan: {e.reason}")
+        return QRValidationResponse(
+            valid=False, message="Order not found or invalid token"
+        )
+    if claims is not None:
+        machine_location = pickup_index.location_for_key(x_machine_token)
+        if machine_location is not None and machine_location != claims.location_id:
+            return QRValidationResponse(
+                valid=False, message="Order is not waiting at this machine"
+            )
+
+    # Common case: the order is in the in-memory pickup index
+    entry = pickup_index.lookup(x_machine_token, request.qr_data)
+    if entry:
+        return QRValidationResponse(
+            valid=True, order=entry.order, message="QR-Code erfolgreich validiert"
+        )
+
     order = (
         db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
-        )
+        .options(*_order_load_options())
         .filter(OrderModel.access_token == request.qr_data)
         .filter(OrderModel.status == "available for pickup")
         .first()
@@ -287,49 +941,35 @@ def validate_qr_order(
             detail="Machine authorization failed",
         )
 
+    # Index orders that became ready in another process so repeated scans hit memory
+    pickup_index.update_order(order)
     return QRValidationResponse(
         valid=True, order=order, message="QR-Code erfolgreich validiert"
     )
 
 
-@router.post("/{order_id}/complete", response_model=Order)
-def complete_order(
-    *,
-    db: Session = Depends(deps.get_db),
-    order_id: int,
-    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
-) -> Any:
+def _complete_order_error(
+    db: Session, order_id: int, x_machine_token: str | None
+) -> HTTPException:
     """
-    Mark an order as completed.
-
-    Used by the vending machine hardware to signal that the items have been dispensed.
-    Triggers a pickup confirmation email to the user.
+    Explain why the guarded completion of an order matched no row.
 
     Args:
         db: Database session.
-        order_id: The ID of the order to complete.
+        order_id: The ID of the order that was to be completed.
         x_machine_token: Authorization token from the machine's header.
 
     Returns:
-        Order: The updated order object.
-
-    Raises:
-        HTTPException: If the order is not found or machine authorization fails.
+        HTTPException: The error to raise.
     """
     order = (
         db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
-        )
+        .options(joinedload(OrderModel.location))
         .filter(OrderModel.id == order_id)
         .first()
     )
     if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+        return HTTPException(status_code=404, detail="Order not found")
 
     # Check if the machine's token matches the location assigned to the order
     if not order.location or order.location.validation_key != x_machine_token:
@@ -338,38 +978,119 @@ def complete_order(
             f"Expected key: {order.location.validation_key if order.location else 'None'}, "
             f"Received: {x_machine_token}"
         )
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Machine authorization failed",
         )
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Order is not available for pickup (status: {order.status})",
+    )
 
-    order.status = "completed"  # type: ignore
-    db.add(order)
-    db.commit()
 
-    # Send pickup confirmation email
-    try:
-        user = db.query(UserModel).filter(UserModel.id == order.user_id).first()
-        if user and user.email:  # type: ignore
-            items = []
-            prescription_counts = {}
-            for p in order.prescriptions:
-                name = p.medication_name or "Verschriebenes Medikament"
-                prescription_counts[name] = prescription_counts.get(name, 0) + 1
-
-            for name, count in prescription_counts.items():
-                items.append({"name": name, "quantity": count})
-            for item in order.medication_items:
-                items.append({"name": item.medication.name, "quantity": item.quantity})
-
-            send_pickup_confirmation_email(
-                email_to=user.email,  # type: ignore
-                order_id=order.id,  # type: ignore
-                items=items,
-            )
-    except Exception as e:
-        logger.error(f"Failed to send pickup confirmation email: {e}")
-    db.refresh(order)
+@router.post("/{order_id}/complete", response_model=Order)
+def complete_order(
+    *,
+    db: Session = Depends(deps.get_db),
+    order_id: int,
+    x_machine_token: str | None = Header(None, alias="X-Machine-Token"),
+) -> Any:
+    """
+    Mark an order as completed.
+
+    Used by the vending machine hardware to signal that the items have been dispensed.
+    The transition is a single guarded UPDATE that only matches an order waiting
+    for pickup at the requesting machine, so an order can never be completed
+    twice, even by two scans racing each other. Queues a pickup confirmation email
+    to the user in the same transaction and publishes the status change to the
+    user's order event streams.
+
+    Args:
+        db: Database session.
+        order_id: The ID of the order to complete.
+        x_machine_token: Authorization token from the machine's header.
+
+    Returns:
+        Order: The updated order object.
+
+    Raises:
+        HTTPException: If the order is not found, machine authorization fails or the
+            order is not available for pickup.
+    """
+    now = datetime.utcnow()
+    machine_location = (
+        select(LocationModel.id)
+        .where(LocationModel.validation_key == x_machine_token)
+        .scalar_subquery()
+    )
+    user_email = (
+        select(UserModel.email)
+        .where(UserModel.id == OrderModel.user_id)
+        .scalar_subquery()
+    )
+    completed = db.execute(
+        update(OrderModel)
+        .where(
+            OrderModel.id == order_id,
+            OrderModel.status == PICKUP_STATUS,
+            OrderModel.location_id == machine_location,
+        )
+        # The reserved units have been dispensed and are no longer held
+        .values(status="completed", stock_reserved=False, updated_at=now)
+        .returning(
+            OrderModel.id,
+            OrderModel.user_id,
+            OrderModel.location_id,
+            OrderModel.status,
+            OrderModel.created_at,
+            OrderModel.access_token,
+            user_email.label("email"),
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    if completed is None:
+        raise _complete_order_error(db, order_id, x_machine_token)
+
+    record_transition(db, completed, PICKUP_STATUS)  # type: ignore
+    publish_status_change(db, completed)  # type: ignore
+
+    # Respond from the pickup index snapshot when the order is indexed
+    entry = pickup_index.get_order(order_id)
+    if entry:
+        order = entry.order.model_copy(
+            update={"status": "completed", "updated_at": now}
+        )
+    else:
+        order = Order.model_validate(
+            db.query(OrderModel)
+            .options(*_order_load_options())
+            .filter(OrderModel.id == order_id)
+            .one()
+        )
+
+    # Queue the pickup confirmation email in the same transaction
+    if completed.email:
+        items = []
+        prescription_counts = {}
+        for p in order.prescriptions:
+            name = p.medication_name or "Verschriebenes Medikament"
+            prescription_counts[name] = prescription_counts.get(name, 0) + 1
+
+        for name, count in prescription_counts.items():
+            items.append({"name": name, "quantity": count})
+        for item in order.medication_items:
+            items.append({"name": item.medication.name, "quantity": item.quantity})
+
+        enqueue_email(
+            db,
+            "pickup_confirmation",
+            email_to=completed.email,
+            order_id=order_id,
+            items=items,
+        )
+
+    db.commit()
+    pickup_index.discard(completed.access_token)
     return order
 
 
@@ -377,43 +1098,185 @@ def complete_order(
 def read_order_by_id(
     order_id: int,
     db: Session = Depends(deps.get_db),
+    fields: str | None = None,
+    view: str = "full",
+    include_archived: bool = False,
     current_user: UserModel = Depends(deps.get_current_user),
 ) -> Any:
     """
     Retrieve a specific order by its ID.
 
-    Users can only retrieve their own orders unless they are superusers.
+    Users can only retrieve their own orders unless they are superusers. Supports the
+    same 'fields' and 'view' projections as the order listing. Archived orders are
+    only looked up with 'include_archived=true'.
 
     Args:
         order_id: The ID of the order to retrieve.
         db: Database session.
+        fields: Optional comma-separated list of order fields to return.
+        view: 'full' (default) or 'summary'.
+        include_archived: Whether to fall back to the archive tables.
         current_user: The currently authenticated user.
 
     Returns:
-        Order: The order object.
+        Order: The order object, reduced to the requested fields if given.
 
     Raises:
-        HTTPException: If the order is not found or the user lacks permission.
+        HTTPException: If the order is not found, the user lacks permission or the
+            fields or view are invalid.
     """
+    names = _parse_fields(fields, view)
     order = (
         db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
-        )
+        .options(*_projection_options(names))
         .filter(OrderModel.id == order_id)
         .first()
     )
+    if not order and include_archived:
+        order = (
+            db.query(ArchivedOrder)
+            .options(*_projection_options(names, ArchivedOrder))
+            .filter(ArchivedOrder.id == order_id)
+            .first()
+        )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id and not current_user.is_superuser:  # type: ignore
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    if names is not None:
+        return JSONResponse(_project(order, names))
     return order
 
 
+@router.get(
+    "/{order_id}/qr",
+    response_class=Response,
+    responses={200: {"content": {media: {} for media in MEDIA_TYPES.values()}}},
+)
+def read_order_qr(
+    order_id: int,
+    format: str = Query("png", pattern="^(png|svg)$"),
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
+    db: Session = Depends(deps.get_db),
+    current_user: UserModel = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Retrieve the pickup QR code image of an order.
+
+    The image only depends on the order's access token and is served from the QR
+    cache with an ETag derived from the token. Signed pickup tokens are re-issued
+    when an order becomes available for pickup, so clients must revalidate their
+    copy on every use rather than keep it as immutable.
+
+    Args:
+        order_id: The ID of the order.
+        format: Image format, 'png' or 'svg'.
+        if_none_match: ETag of a previously fetched image for conditional requests.
+        db: Database session.
+        current_user: The currently authenticated user.
+
+    Returns:
+        Response: The QR code image, or 304 if the client's copy is current.
+
+    Raises:
+        HTTPException: If the order is not found, has no access token or the user lacks permission.
+    """
+    row = (
+        db.query(OrderModel.user_id, OrderModel.access_token)
+        .filter(OrderModel.id == order_id)
+        .first()
+    )
+    if not row or not row.access_token:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if row.user_id != current_user.id and not current_user.is_superuser:  # type: ignore
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "ETag": f'"{qr_cache_key(row.access_token)}-{format}"',
+    }
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=render_qr(row.access_token, format),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@router.patch("/status", response_model=List[OrderStatusBulkResult])
+def update_order_statuses(
+    *,
+    db: Session = Depends(deps.get_db),
+    update_in: OrderStatusBulkUpdate,
+    current_user: UserModel = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Move many orders to the same status in a single request (Superuser only).
+
+    Used by staff after restocking a machine to mark all of its orders as available
+    for pickup at once. The orders are locked and transitioned together, and the
+    resulting notifications are queued in the same transaction.
+
+    Args:
+        db: Database session.
+        update_in: The order IDs and the target status.
+        current_user: The currently authenticated superuser.
+
+    Returns:
+        List[OrderStatusBulkResult]: The outcome for every requested order ID.
+    """
+    order_ids = list(dict.fromkeys(update_in.order_ids))
+    options = [joinedload(OrderModel.location)]
+    if update_in.status == "cancelled":
+        options += [
+            selectinload(OrderModel.medication_items),
+            selectinload(OrderModel.prescriptions),
+        ]
+    orders = {
+        order.id: order
+        for order in db.query(OrderModel)
+        .options(*options)
+        .filter(OrderModel.id.in_(order_ids))
+        .order_by(OrderModel.id)
+        .with_for_update(of=OrderModel)
+        .all()
+    }
+    changed = {
+        order.id
+        for order in transition_orders(db, list(orders.values()), update_in.status)
+    }
+    db.commit()
+
+    # Refresh the pickup index with the committed state of the changed orders
+    if changed and update_in.status == PICKUP_STATUS:
+        for order in (
+            db.query(OrderModel)
+            .options(*_order_load_options())
+            .filter(OrderModel.id.in_(changed))
+        ):
+            pickup_index.update_order(order)
+    else:
+        for order_id in changed:
+            pickup_index.discard_order(order_id)  # type: ignore
+
+    logger.info(
+        f"User {current_user.id} moved {len(changed)} orders to status '{update_in.status}'"
+    )
+    return [
+        (
+            OrderStatusBulkResult(
+                order_id=order_id, success=True, changed=order_id in changed
+            )
+            if order_id in orders
+            else OrderStatusBulkResult(
+                order_id=order_id, success=False, error="Order not found"
+            )
+        )
+        for order_id in order_ids
+    ]
+
+
 @router.patch("/{order_id}", response_model=Order)
 @router.put("/{order_id}", response_model=Order)
 def update_order(
@@ -427,7 +1290,8 @@ def update_order(
     Update an existing order's status or details.
 
     If the status changes to 'available for pickup', an automated email
-    with the pickup QR code is sent to the user.
+    with the pickup QR code is queued for the user. Status changes are published
+    to the user's order event streams, and cancelling an order releases its stock.
 
     Args:
         db: Database session.
@@ -443,13 +1307,7 @@ def update_order(
     """
     order = (
         db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.location),
-            joinedload(OrderModel.prescriptions),
-            joinedload(OrderModel.medication_items).joinedload(
-                OrderMedication.medication
-            ),
-        )
+        .options(*_order_load_options())
         .filter(OrderModel.id == order_id)
         .first()
     )
@@ -458,32 +1316,16 @@ def update_order(
     if order.user_id != current_user.id and not current_user.is_superuser:  # type: ignore
         raise HTTPException(status_code=400, detail="Not enough permissions")
 
-    old_status = order.status
     update_data = order_in.model_dump(exclude_unset=True)
+    new_status = update_data.pop("status", None)
     for field, value in update_data.items():
         setattr(order, field, value)
+    if new_status is not None:
+        transition_orders(db, [order], new_status)
 
-    db.add(order)
     db.commit()
     db.refresh(order)
-
-    # If status transitioned to available for pickup, send email
-    if old_status != "available for pickup" and order.status == "available for pickup":  # type: ignore
-        try:
-            user = db.query(UserModel).filter(UserModel.id == order.user_id).first()
-            if user and user.email:  # type: ignore
-                location_name = (
-                    order.location.name if order.location else "MeTIMat Station"
-                )
-                send_pickup_ready_email(
-                    email_to=user.email,  # type: ignore
-                    order_id=order.id,  # type: ignore
-                    pickup_location=location_name,
-                    pickup_code=order.access_token,  # type: ignore
-                )
-        except Exception as e:
-            logger.error(f"Failed to send pickup ready email: {e}")
-
+    pickup_index.update_order(order)
     return order
 
 
@@ -497,7 +1339,8 @@ def delete_order(
     """
     Delete an order.
 
-    Users can only delete their own orders unless they are superusers.
+    Users can only delete their own orders unless they are superusers. Stock still
+    held for the order is released.
 
     Args:
         db: Database session.
@@ -510,12 +1353,21 @@ def delete_order(
     Raises:
         HTTPException: If the order is not found or the user lacks permission.
     """
-    order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
+    # Relationships are loaded up front, the deleted order is serialized after the commit
+    order = (
+        db.query(OrderModel)
+        .options(*_order_load_options())
+        .filter(OrderModel.id == order_id)
+        .first()
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != current_user.id and not current_user.is_superuser:  # type: ignore
         raise HTTPException(status_code=400, detail="Not enough permissions")
 
+    release_order_stock(db, order)
+    record_deleted(db, order)
     db.delete(order)
     db.commit()
+    pickup_index.discard(order.access_token)  # type: ignore
     return order
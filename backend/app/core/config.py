@@ -64,6 +64,57 @@ class Settings(BaseSettings):
         SMTP_PASSWORD: Password for SMTP server.
         EMAILS_FROM_EMAIL: Sender email address.
         EMAILS_FROM_NAME: Sender name.
+        SMTP_POOL_SIZE: Maximum number of pooled SMTP connections per process.
+        SMTP_CONNECT_TIMEOUT: Timeout in seconds for establishing an SMTP connection.
+        SMTP_SEND_TIMEOUT: Socket timeout in seconds for SMTP commands after connecting.
+        SMTP_POOL_MAX_IDLE_SECONDS: Idle time after which a pooled connection is recycled.
+        SMTP_MAX_MESSAGES_PER_CONNECTION: Messages sent before a connection is recycled.
+        SMTP_CIRCUIT_FAILURE_THRESHOLD: Consecutive failures that open the SMTP circuit breaker.
+        SMTP_CIRCUIT_RESET_SECONDS: Seconds the circuit stays open before a trial send.
+        QR_CACHE_SIZE: Number of rendered QR code images kept in memory per process.
+        QR_CACHE_DIR: Optional directory for the shared on-disk QR code image cache.
+        OUTBOX_BATCH_SIZE: Number of outbox messages delivered per dispatcher batch.
+        OUTBOX_MAX_ATTEMPTS: Failed attempts after which a message is dead-lettered.
+        OUTBOX_RETRY_BACKOFF_SECONDS: Base delay for the exponential retry backoff.
+        OUTBOX_RETENTION_DAYS: Days delivered outbox messages are kept before they are purged.
+        OUTBOX_PURGE_BATCH_SIZE: Number of delivered outbox messages deleted per batch.
+        OUTBOX_PURGE_INTERVAL_SECONDS: Interval between runs of the outbox purge job.
+        WORKER_POLL_INTERVAL_SECONDS: Idle sleep between polls of the background worker.
+        ORDER_EVENTS_KEEPALIVE_SECONDS: Interval of keepalive comments on idle order event streams.
+        ORDER_EVENTS_QUEUE_SIZE: Events buffered per stream before further events are dropped.
+        ORDER_ARCHIVE_AFTER_DAYS: Days after their last update that completed or cancelled
+            orders are moved to the archive tables.
+        ORDER_ARCHIVE_BATCH_SIZE: Number of orders archived per worker batch.
+        ORDER_ARCHIVE_INTERVAL_SECONDS: Interval between runs of the archive job.
+        IDEMPOTENCY_KEY_TTL_HOURS: Hours an idempotency key and its stored response are kept.
+        IDEMPOTENCY_PURGE_BATCH_SIZE: Number of expired idempotency keys deleted per batch.
+        IDEMPOTENCY_PURGE_INTERVAL_SECONDS: Interval between runs of the purge job.
+        PICKUP_REMINDER_AFTER_HOURS: Hours an order waits for pickup before a reminder is sent.
+        PICKUP_EXPIRE_AFTER_HOURS: Hours an order waits for pickup before it is cancelled.
+        PICKUP_SWEEP_BATCH_SIZE: Number of orders reminded or expired per sweeper chunk.
+        PICKUP_SWEEP_INTERVAL_SECONDS: Interval between runs of the pickup sweeper jobs.
+        PICKUP_TOKEN_SIGNING: Issue signed, self-verifying QR tokens instead of random ones.
+        PICKUP_TOKEN_KEYS: Comma-separated 'key_id:secret' pairs accepted for signed QR tokens
+            (defaults to a single key derived from SECRET_KEY).
+        PICKUP_TOKEN_KEY_ID: ID of the key new QR tokens are signed with (defaults to the
+            first key of PICKUP_TOKEN_KEYS).
+        PICKUP_TOKEN_TTL_HOURS: Validity of a signed QR token issued for a pending order.
+        LOCATION_INDEX_REFRESH_SECONDS: Interval after which the in-memory location index is
+            rebuilt from the database, picking up location writes of other processes.
+        STOCK_MATRIX_REFRESH_SECONDS: Maximum age of the in-memory stock matrix used by the
+            fulfilment planner.
+        STOCK_SNAPSHOT_BATCH_SIZE: Number of stock snapshots taken per worker batch.
+        STOCK_SNAPSHOT_INTERVAL_SECONDS: Interval between runs of the stock snapshot job.
+        LOW_STOCK_THRESHOLD: Default stock level below which a low-stock alert is raised.
+        LOW_STOCK_ALERT_EMAILS: Comma-separated recipients of low-stock digests (defaults to
+            all active superusers).
+        LOW_STOCK_DIGEST_BATCH_SIZE: Number of locations a digest is sent for per worker batch.
+        LOW_STOCK_DIGEST_INTERVAL_SECONDS: Interval between runs of the low-stock digest job.
+        FORECAST_HISTORY_DAYS: Days of order history the demand forecast is based on (capped
+            at ORDER_ARCHIVE_AFTER_DAYS).
+        FORECAST_WINDOW_DAYS: Days of the moving average giving the daily run rate.
+        MEDICATION_INDEX_REFRESH_SECONDS: Interval after which the in-memory catalog search
+            index (used on databases without pg_trgm) is rebuilt from the database.
     """
 
     PROJECT_NAME: str = "MeTIMat"
@@ -102,6 +153,113 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str | None = os.getenv("SMTP_PASSWORD")
     EMAILS_FROM_EMAIL: EmailStr | None = os.getenv("EMAILS_FROM_EMAIL")
     EMAILS_FROM_NAME: str | None = os.getenv("EMAILS_FROM_NAME", "MeTIMat")
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    SMTP_CONNECT_TIMEOUT: float = float(os.getenv("SMTP_CONNECT_TIMEOUT", "10"))
+    SMTP_SEND_TIMEOUT: float = float(os.getenv("SMTP_SEND_TIMEOUT", "30"))
+    SMTP_POOL_MAX_IDLE_SECONDS: float = float(
+        os.getenv("SMTP_POOL_MAX_IDLE_SECONDS", "60")
+    )
+    SMTP_MAX_MESSAGES_PER_CONNECTION: int = int(
+        os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+    )
+    SMTP_CIRCUIT_FAILURE_THRESHOLD: int = int(
+        os.getenv("SMTP_CIRCUIT_FAILURE_THRESHOLD", "5")
+    )
+    SMTP_CIRCUIT_RESET_SECONDS: float = float(
+        os.getenv("SMTP_CIRCUIT_RESET_SECONDS", "60")
+    )
+
+    # QR Codes
+    QR_CACHE_SIZE: int = int(os.getenv("QR_CACHE_SIZE", "1024"))
+    QR_CACHE_DIR: str | None = os.getenv("QR_CACHE_DIR")
+
+    # Email Outbox / Background Worker
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+    OUTBOX_RETRY_BACKOFF_SECONDS: int = int(
+        os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", "30")
+    )
+    OUTBOX_RETENTION_DAYS: int = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+    OUTBOX_PURGE_BATCH_SIZE: int = int(os.getenv("OUTBOX_PURGE_BATCH_SIZE", "1000"))
+    OUTBOX_PURGE_INTERVAL_SECONDS: float = float(
+        os.getenv("OUTBOX_PURGE_INTERVAL_SECONDS", "3600")
+    )
+    WORKER_POLL_INTERVAL_SECONDS: float = float(
+        os.getenv("WORKER_POLL_INTERVAL_SECONDS", "5")
+    )
+
+    # Order Event Streams
+    ORDER_EVENTS_KEEPALIVE_SECONDS: float = float(
+        os.getenv("ORDER_EVENTS_KEEPALIVE_SECONDS", "15")
+    )
+    ORDER_EVENTS_QUEUE_SIZE: int = int(os.getenv("ORDER_EVENTS_QUEUE_SIZE", "100"))
+
+    # Order Archive
+    ORDER_ARCHIVE_AFTER_DAYS: int = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "90"))
+    ORDER_ARCHIVE_BATCH_SIZE: int = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "500"))
+    ORDER_ARCHIVE_INTERVAL_SECONDS: float = float(
+        os.getenv("ORDER_ARCHIVE_INTERVAL_SECONDS", "3600")
+    )
+
+    # Idempotency Keys
+    IDEMPOTENCY_KEY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = int(
+        os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "1000")
+    )
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = float(
+        os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "600")
+    )
+
+    # Pickup Sweeper
+    PICKUP_REMINDER_AFTER_HOURS: int = int(
+        os.getenv("PICKUP_REMINDER_AFTER_HOURS", "24")
+    )
+    PICKUP_EXPIRE_AFTER_HOURS: int = int(os.getenv("PICKUP_EXPIRE_AFTER_HOURS", "72"))
+    PICKUP_SWEEP_BATCH_SIZE: int = int(os.getenv("PICKUP_SWEEP_BATCH_SIZE", "100"))
+    PICKUP_SWEEP_INTERVAL_SECONDS: float = float(
+        os.getenv("PICKUP_SWEEP_INTERVAL_SECONDS", "300")
+    )
+
+    # Signed Pickup Tokens
+    PICKUP_TOKEN_SIGNING: bool = (
+        os.getenv("PICKUP_TOKEN_SIGNING", "False").lower() == "true"
+    )
+    PICKUP_TOKEN_KEYS: str | None = os.getenv("PICKUP_TOKEN_KEYS")
+    PICKUP_TOKEN_KEY_ID: str | None = os.getenv("PICKUP_TOKEN_KEY_ID")
+    PICKUP_TOKEN_TTL_HOURS: int = int(os.getenv("PICKUP_TOKEN_TTL_HOURS", "336"))
+
+    # Location Search
+    LOCATION_INDEX_REFRESH_SECONDS: float = float(
+        os.getenv("LOCATION_INDEX_REFRESH_SECONDS", "300")
+    )
+    STOCK_MATRIX_REFRESH_SECONDS: float = float(
+        os.getenv("STOCK_MATRIX_REFRESH_SECONDS", "30")
+    )
+
+    # Stock Ledger
+    STOCK_SNAPSHOT_BATCH_SIZE: int = int(os.getenv("STOCK_SNAPSHOT_BATCH_SIZE", "500"))
+    STOCK_SNAPSHOT_INTERVAL_SECONDS: float = float(
+        os.getenv("STOCK_SNAPSHOT_INTERVAL_SECONDS", "3600")
+    )
+
+    # Low-Stock Alerts
+    LOW_STOCK_THRESHOLD: int = int(os.getenv("LOW_STOCK_THRESHOLD", "3"))
+    LOW_STOCK_ALERT_EMAILS: str | None = os.getenv("LOW_STOCK_ALERT_EMAILS")
+    LOW_STOCK_DIGEST_BATCH_SIZE: int = int(
+        os.getenv("LOW_STOCK_DIGEST_BATCH_SIZE", "50")
+    )
+    LOW_STOCK_DIGEST_INTERVAL_SECONDS: float = float(
+        os.getenv("LOW_STOCK_DIGEST_INTERVAL_SECONDS", "900")
+    )
+
+    # Demand Forecast
+    FORECAST_HISTORY_DAYS: int = int(os.getenv("FORECAST_HISTORY_DAYS", "84"))
+    FORECAST_WINDOW_DAYS: int = int(os.getenv("FORECAST_WINDOW_DAYS", "28"))
+
+    # Medication Search
+    MEDICATION_INDEX_REFRESH_SECONDS: float = float(
+        os.getenv("MEDICATION_INDEX_REFRESH_SECONDS", "300")
+    )
 
     class Config:
         case_sensitive = True
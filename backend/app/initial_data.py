@@ -17,6 +17,7 @@ from app.models.inventory import Inventory
 from app.models.location import Location
 from app.models.medication import Medication
 from app.models.user import User
+from app.services.stock_ledger import record_movements
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError
 
@@ -135,6 +136,16 @@ def init_db() -> None:
                             quantity=10 if loc.location_type == "pharmacy" else 5,  # type: ignore
                         )
                     )
+            # The seeded stock is the first restock of the ledger
+            record_movements(
+                db,
+                "restock",
+                [
+                    (loc.id, med.id, 10 if loc.location_type == "pharmacy" else 5, None)  # type: ignore
+                    for loc in locations
+                    for med in medications
+                ],
+            )
 
         db.commit()
         logger.info("Database initialization check complete")
@@ -2,17 +2,52 @@
 Main entry point for the MeTIMat FastAPI application.
 
 This module initializes the FastAPI application, configures middleware (CORS),
-defines health check routes, and includes the API versioned routers.
+warms in-memory caches at startup, defines health check routes, and includes
+the API versioned routers.
 """
 
+import logging
+from contextlib import asynccontextmanager
+
 from app import models  # noqa
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.services.order_events import order_events
+from app.services.pickup_index import pickup_index
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan handler.
+
+    Warms the in-memory pickup index at startup. Failing to do so is not fatal,
+    QR validation then falls back to the database until the index is populated.
+    Also listens for order events of other processes while the app is running,
+    which keep the pickup index current across processes.
+    """
+    db = SessionLocal()
+    try:
+        count = pickup_index.rebuild(db)
+        logger.info(f"Pickup index built with {count} orders")
+    except Exception as e:
+        logger.warning(f"Could not build pickup index at startup: {e}")
+    finally:
+        db.close()
+    order_events.add_listener(pickup_index.handle_event)
+    order_events.start(engine)
+    yield
+    order_events.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
@@ -6,20 +6,34 @@ with the SQLAlchemy Base and easily accessible for imports elsewhere in the appl
 """
 
 from app.db.session import Base  # noqa
+from app.models.idempotency import IdempotencyKey
 from app.models.inventory import Inventory
 from app.models.location import Location
+from app.models.low_stock_alert import LowStockAlert
 from app.models.medication import Medication
 from app.models.order import Order, OrderMedication
+from app.models.order_archive import ArchivedOrder, ArchivedOrderMedication
+from app.models.order_stats import OrderStat
+from app.models.outbox import OutboxMessage
 from app.models.prescription import Prescription
+from app.models.stock_ledger import StockMovement, StockSnapshot
 from app.models.user import User
 
 __all__ = [
+    "ArchivedOrder",
+    "ArchivedOrderMedication",
     "Base",
+    "IdempotencyKey",
     "Inventory",
     "Location",
+    "LowStockAlert",
     "Medication",
     "Order",
     "OrderMedication",
+    "OrderStat",
+    "OutboxMessage",
     "Prescription",
+    "StockMovement",
+    "StockSnapshot",
     "User",
 ]
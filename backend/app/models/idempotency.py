@@ -0,0 +1,53 @@
+"""
+Idempotency key model for the MeTIMat application.
+
+This module defines the SQLAlchemy model storing the outcome of requests sent
+with an 'Idempotency-Key' header, so that retries of the same request can be
+answered with the original response instead of being executed again.
+"""
+
+from datetime import datetime
+
+from app.db.session import Base
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+    UniqueConstraint,
+)
+
+
+class IdempotencyKey(Base):
+    """
+    SQLAlchemy model representing a processed idempotent request.
+
+    Attributes:
+        id: Unique identifier for the record.
+        user_id: Foreign key to the User who sent the request; keys are scoped per user.
+        key_hash: SHA-256 hex digest of the client-supplied key.
+        request_hash: SHA-256 hex digest of the request payload the key was first used with.
+        order_id: ID of the order created by the request.
+        response: JSON body of the original response.
+        created_at: Timestamp when the request was first processed.
+        expires_at: Timestamp after which the key may be reused and the record purged.
+    """
+
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key_hash", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    key_hash = Column(String(64), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    order_id = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -6,7 +6,7 @@ medications at specific physical locations.
 """
 
 from app.db.session import Base
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 
@@ -19,11 +19,19 @@ class Inventory(Base):
         location_id: Foreign key to the associated Location.
         medication_id: Foreign key to the associated Medication.
         quantity: Current stock level of the medication at this location.
+        low_stock_threshold: Stock level below which a low-stock alert is raised
+            (None for the default LOW_STOCK_THRESHOLD).
         location: Relationship to the Location model.
         medication: Relationship to the Medication model.
     """
 
     __tablename__ = "inventory"
+    __table_args__ = (
+        # One stock row per medication and location, the unit of stock reservations
+        UniqueConstraint(
+            "location_id", "medication_id", name="uq_inventory_location_medication"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     location_id = Column(
@@ -33,6 +41,7 @@ class Inventory(Base):
         Integer, ForeignKey("medications.id", ondelete="CASCADE"), index=True
     )
     quantity = Column(Integer, default=0)
+    low_stock_threshold = Column(Integer, nullable=True)
 
     location = relationship("Location", back_populates="inventory")
     medication = relationship("Medication")
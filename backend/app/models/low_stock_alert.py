@@ -0,0 +1,37 @@
+"""
+Low-stock alert model for the MeTIMat application.
+
+An alert is open while a medication's available stock at a location is below
+its threshold. There is at most one open alert per medication and location, so
+repeated stock changes below the threshold never raise duplicate alerts.
+"""
+
+from datetime import datetime
+
+from app.db.session import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+
+
+class LowStockAlert(Base):
+    """
+    SQLAlchemy model for an open low-stock alert of a medication at a location.
+
+    The alert is deleted as soon as the stock is back at or above the threshold.
+
+    Attributes:
+        location_id: ID of the location.
+        medication_id: ID of the medication.
+        created_at: Timestamp when the stock fell below the threshold.
+        notified_at: Timestamp when the alert was sent in a digest (None while pending).
+    """
+
+    __tablename__ = "low_stock_alerts"
+
+    location_id = Column(
+        Integer, ForeignKey("locations.id", ondelete="CASCADE"), primary_key=True
+    )
+    medication_id = Column(
+        Integer, ForeignKey("medications.id", ondelete="CASCADE"), primary_key=True
+    )
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    notified_at = Column(DateTime, nullable=True, index=True)
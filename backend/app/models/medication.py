@@ -6,7 +6,13 @@ such as PZN, dosage, price, and prescription requirements.
 """
 
 from app.db.session import Base
-from sqlalchemy import Boolean, Column, Float, Integer, String
+from sqlalchemy import Boolean, Column, Computed, Float, Integer, String
+
+# Lowercased text the catalog search matches against, maintained by the database
+SEARCH_TEXT_SQL = (
+    "lower(name || ' ' || pzn || ' ' || coalesce(manufacturer, '') || ' ' "
+    "|| coalesce(dosage, ''))"
+)
 
 
 class Medication(Base):
@@ -26,6 +32,7 @@ class Medication(Base):
         category: Therapeutic or storage category (defaults to "all").
         prescription_required: Whether the medication requires a prescription to dispense.
         is_active: Whether the medication is currently available in the system catalog.
+        search_text: Generated lowercase name, PZN, manufacturer and dosage for searching.
     """
 
     __tablename__ = "medications"
@@ -44,3 +51,4 @@ class Medication(Base):
     category = Column(String, default="all")
     prescription_required = Column(Boolean, default=False)
     is_active = Column(Boolean, default=True)
+    search_text = Column(String, Computed(SEARCH_TEXT_SQL, persisted=True))
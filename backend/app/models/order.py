@@ -8,7 +8,16 @@ many-to-many association with medications, including quantities and status track
 from datetime import datetime
 
 from app.db.session import Base
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 
@@ -50,6 +59,9 @@ class Order(Base):
         status: Current status of the order (e.g., 'pending', 'completed', 'cancelled').
         access_token: Unique token used in QR codes for order validation/pickup.
         total_price: Total cost of the order.
+        stock_reserved: Whether stock at the location is currently held for the order's items.
+        ready_at: Timestamp when the order became available for pickup.
+        reminder_sent_at: Timestamp when the pickup reminder was queued.
         created_at: Timestamp when the order was created.
         updated_at: Timestamp when the order was last updated.
         user: Relationship to the User model.
@@ -59,6 +71,13 @@ class Order(Base):
     """
 
     __tablename__ = "orders"
+    __table_args__ = (
+        # Keyset pagination over (created_at, id), globally and per user
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Range scans of the pickup sweeper over orders waiting for pickup
+        Index("ix_orders_status_ready_at", "status", "ready_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
@@ -70,6 +89,9 @@ class Order(Base):
     # Token used in the QR code to identify/validate the order
     access_token = Column(String, unique=True, index=True, nullable=True)
     total_price = Column(Float, default=0.0)
+    stock_reserved = Column(Boolean, default=False, nullable=False)
+    ready_at = Column(DateTime, nullable=True)
+    reminder_sent_at = Column(DateTime, nullable=True)
 
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
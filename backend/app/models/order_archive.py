@@ -0,0 +1,95 @@
+"""
+Archived order models for the MeTIMat application.
+
+Completed and cancelled orders are moved out of the 'orders' table by the archive
+job once they are old enough, so that the tables queried on every request only
+contain the active working set. The archive tables mirror the columns of the live
+tables and are read only when clients explicitly ask for archived orders.
+"""
+
+from datetime import datetime
+
+from app.db.session import Base
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+
+class ArchivedOrderMedication(Base):
+    """
+    Archived counterpart of OrderMedication.
+
+    Attributes:
+        order_id: Foreign key to the archived Order.
+        medication_id: Foreign key to the associated Medication.
+        quantity: Number of units of this medication in the order.
+        order: Relationship back to the ArchivedOrder model.
+        medication: Relationship to the Medication model.
+    """
+
+    __tablename__ = "order_medication_association_archive"
+
+    order_id = Column(
+        Integer, ForeignKey("orders_archive.id", ondelete="CASCADE"), primary_key=True
+    )
+    medication_id = Column(
+        Integer, ForeignKey("medications.id", ondelete="CASCADE"), primary_key=True
+    )
+    quantity = Column(Integer, default=1, nullable=False)
+
+    order = relationship("ArchivedOrder", back_populates="medication_items")
+    medication = relationship("Medication")
+
+
+class ArchivedOrder(Base):
+    """
+    Archived counterpart of Order, keeping the original order ID.
+
+    Attributes:
+        id: Identifier of the order, as assigned in the live table.
+        user_id: Foreign key to the User who placed the order.
+        location_id: Foreign key to the Location where the order was picked up.
+        status: Final status of the order ('completed' or 'cancelled').
+        access_token: Token that was used in the order's QR code.
+        total_price: Total cost of the order.
+        created_at: Timestamp when the order was created.
+        updated_at: Timestamp when the order was last updated.
+        archived_at: Timestamp when the order was moved to the archive.
+        location: Relationship to the Location model.
+        prescriptions: Relationship to the Prescriptions included in this order.
+        medication_items: Relationship to the ArchivedOrderMedication records.
+    """
+
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        Index("ix_orders_archive_created_at_id", "created_at", "id"),
+        Index("ix_orders_archive_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    location_id = Column(
+        Integer, ForeignKey("locations.id", ondelete="SET NULL"), nullable=True
+    )
+    status = Column(String)
+    access_token = Column(String, nullable=True)
+    total_price = Column(Float, default=0.0)
+
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    location = relationship("Location")
+    prescriptions = relationship("Prescription", back_populates="archived_order")
+    medication_items = relationship(
+        "ArchivedOrderMedication", back_populates="order", cascade="all, delete-orphan"
+    )
+
+    @property
+    def medications(self):
+        """
+        Helper property mirroring Order.medications.
+
+        Returns:
+            list: A list of Medication objects associated with this order.
+        """
+        return [item.medication for item in self.medication_items]
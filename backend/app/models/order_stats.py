@@ -0,0 +1,32 @@
+"""
+Order statistics model for the MeTIMat application.
+
+This module defines the SQLAlchemy model for the incrementally maintained order
+counters shown on the admin dashboard.
+"""
+
+from app.db.session import Base
+from sqlalchemy import Column, Date, Integer, String
+
+
+class OrderStat(Base):
+    """
+    SQLAlchemy model counting orders per location, current status and creation day.
+
+    The counters are adjusted in the same transaction as every order creation,
+    status transition and deletion, and can be recomputed from the order tables
+    with the 'rebuild-stats' worker command.
+
+    Attributes:
+        location_id: ID of the pickup location (0 for orders without a location).
+        status: Current status of the counted orders.
+        day: Creation date of the counted orders.
+        count: Number of orders created on that day at that location currently in that status.
+    """
+
+    __tablename__ = "order_stats"
+
+    location_id = Column(Integer, primary_key=True, autoincrement=False)
+    status = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
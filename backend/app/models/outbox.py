@@ -0,0 +1,46 @@
+"""
+Outbox model for the MeTIMat application.
+
+This module defines the SQLAlchemy model for the transactional email outbox.
+Messages are written in the same transaction as the change that triggers them
+and delivered asynchronously by the background worker.
+"""
+
+from datetime import datetime
+
+from app.db.session import Base
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+
+
+class OutboxMessage(Base):
+    """
+    SQLAlchemy model representing a queued outgoing email.
+
+    Attributes:
+        id: Unique identifier for the message.
+        kind: Name of the email template to render (e.g., 'order_confirmation').
+        payload: JSON keyword arguments passed to the template's send function.
+        status: Delivery state ('pending', 'sent' or 'dead').
+        attempts: Number of failed delivery attempts so far.
+        next_attempt_at: Earliest time the dispatcher may try to deliver the message.
+        last_error: Error message of the most recent failed attempt.
+        created_at: Timestamp when the message was enqueued.
+        sent_at: Timestamp when the message was delivered.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The dispatcher polls for due pending messages
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
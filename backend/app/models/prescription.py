@@ -21,6 +21,7 @@ class Prescription(Base):
         id: Unique identifier for the prescription.
         user_id: Foreign key to the User who owns this prescription.
         order_id: Foreign key to the Order associated with this prescription.
+        archived_order_id: Foreign key to the ArchivedOrder once the order has been archived.
         medication_id: Foreign key to the specific Medication if matched in the catalog.
         medication_name: Name of the medication as specified in the prescription.
         pzn: Pharma-Zentral-Nummer associated with the prescription.
@@ -28,6 +29,7 @@ class Prescription(Base):
         created_at: Timestamp when the record was created.
         updated_at: Timestamp when the record was last updated.
         order: Relationship to the Order model.
+        archived_order: Relationship to the ArchivedOrder model.
         user: Relationship to the User model.
         medication: Relationship to the Medication model.
     """
@@ -37,6 +39,9 @@ class Prescription(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
+    archived_order_id = Column(
+        Integer, ForeignKey("orders_archive.id"), nullable=True, index=True
+    )
     medication_id = Column(
         Integer, ForeignKey("medications.id", ondelete="CASCADE"), nullable=True
     )
@@ -52,5 +57,6 @@ class Prescription(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     order = relationship("Order", back_populates="prescriptions")
+    archived_order = relationship("ArchivedOrder", back_populates="prescriptions")
     user = relationship("User")
     medication = relationship("Medication")
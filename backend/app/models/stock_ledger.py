@@ -0,0 +1,73 @@
+"""
+Stock ledger models for the MeTIMat application.
+
+Every change of a location's available stock is appended to the stock movement
+ledger, and the background worker periodically condenses it into per-location
+snapshots. The ledger is never updated in place: the stock level at any point is
+the latest snapshot before it plus the movements recorded after that snapshot.
+"""
+
+from datetime import datetime
+
+from app.db.session import Base
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+
+class StockMovement(Base):
+    """
+    SQLAlchemy model for one change of the available stock of a medication at a location.
+
+    Movements keep plain IDs instead of foreign keys, so history outlives deleted
+    and archived orders and locations.
+
+    Attributes:
+        id: Sequential identifier, defining the order of movements.
+        location_id: ID of the location.
+        medication_id: ID of the medication.
+        kind: Type of the movement ('restock', 'correction', 'reserve' or 'release').
+        delta: Change of the available units (negative for outgoing stock).
+        order_id: ID of the order that caused a 'reserve' or 'release' movement.
+        created_at: Timestamp of the movement.
+    """
+
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Tail scans after a snapshot and per-medication history
+        Index(
+            "ix_stock_movements_location_medication_id",
+            "location_id",
+            "medication_id",
+            "id",
+        ),
+        # History of a location over a time range
+        Index("ix_stock_movements_location_created_at", "location_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    location_id = Column(Integer, nullable=False)
+    medication_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)
+    delta = Column(Integer, nullable=False)
+    order_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StockSnapshot(Base):
+    """
+    SQLAlchemy model for the stock level of a medication at a location after a movement.
+
+    Attributes:
+        location_id: ID of the location.
+        medication_id: ID of the medication.
+        movement_id: ID of the last movement included in the snapshot (0 for opening balances).
+        quantity: Available units after that movement.
+        created_at: Timestamp when the snapshot was taken.
+    """
+
+    __tablename__ = "stock_snapshots"
+
+    location_id = Column(Integer, primary_key=True, autoincrement=False)
+    medication_id = Column(Integer, primary_key=True, autoincrement=False)
+    movement_id = Column(Integer, primary_key=True, autoincrement=False)
+    quantity = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -6,7 +6,9 @@ serialization, and deserialization of inventory records, which track
 medication stock levels at specific locations.
 """
 
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 
 
 class InventoryBase(BaseModel):
@@ -49,9 +51,125 @@ class Inventory(InventoryBase):
 
     Attributes:
         id: The unique identifier assigned by the database.
+        low_stock_threshold: Stock level below which a low-stock alert is raised
+            (None for the default threshold).
     """
 
     id: int
+    low_stock_threshold: int | None = None
 
     class Config:
         from_attributes = True
+
+
+class StockReportItem(BaseModel):
+    """
+    Schema for the counted stock of one medication in a machine's stock report.
+
+    Attributes:
+        medication_id: ID of the medication.
+        quantity: Number of units physically present at the location.
+    """
+
+    medication_id: int
+    quantity: int = Field(ge=0)
+
+
+class StockReport(BaseModel):
+    """
+    Schema for a machine's full stock report; medications not listed are out of stock.
+
+    Attributes:
+        items: The counted stock per medication.
+    """
+
+    items: list[StockReportItem]
+
+
+class StockThreshold(BaseModel):
+    """
+    Schema for the low-stock threshold of one medication at a location.
+
+    Attributes:
+        medication_id: ID of the medication.
+        threshold: Stock level below which an alert is raised (None for the default).
+    """
+
+    medication_id: int
+    threshold: int | None = Field(default=None, ge=0)
+
+
+class StockThresholds(BaseModel):
+    """
+    Schema for setting low-stock thresholds of a location.
+
+    Attributes:
+        items: The thresholds per medication.
+    """
+
+    items: list[StockThreshold]
+
+
+class InventoryChange(BaseModel):
+    """
+    Schema for a stock level changed by a stock report.
+
+    Attributes:
+        medication_id: ID of the medication.
+        old_quantity: Available units before the report.
+        new_quantity: Available units after the report.
+    """
+
+    medication_id: int
+    old_quantity: int
+    new_quantity: int
+
+
+class StockMovement(BaseModel):
+    """
+    Schema for an entry of the stock ledger.
+
+    Attributes:
+        id: Sequential identifier of the movement.
+        medication_id: ID of the medication.
+        kind: Type of the movement ('restock', 'correction', 'reserve' or 'release').
+        delta: Change of the available units.
+        order_id: ID of the order that caused the movement, if any.
+        created_at: Timestamp of the movement.
+    """
+
+    id: int
+    medication_id: int
+    kind: str
+    delta: int
+    order_id: int | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StockLevel(BaseModel):
+    """
+    Schema for the available stock of a medication according to the ledger.
+
+    Attributes:
+        medication_id: ID of the medication.
+        quantity: Available units.
+    """
+
+    medication_id: int
+    quantity: int
+
+
+class StockHistory(BaseModel):
+    """
+    Schema for the stock history of a location.
+
+    Attributes:
+        levels: Current stock levels according to the ledger.
+        movements: Ledger entries in the requested range, oldest first.
+    """
+
+    levels: list[StockLevel]
+    movements: list[StockMovement]
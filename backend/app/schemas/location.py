@@ -6,6 +6,8 @@ serialization, and deserialization of physical location data, such as
 pharmacies and vending machines, in the API.
 """
 
+from datetime import date
+
 from pydantic import BaseModel
 
 
@@ -73,12 +75,119 @@ class LocationInDBBase(LocationBase):
         from_attributes = True
 
 
+class MissingItem(BaseModel):
+    """
+    Schema for a cart item a location cannot serve in full.
+
+    Attributes:
+        medication_id: ID of the medication.
+        requested: Number of units the cart needs.
+        available: Number of units in stock at the location.
+    """
+
+    medication_id: int
+    requested: int
+    available: int
+
+
 class Location(LocationInDBBase):
     """
     Schema for location data returned to the client via the API.
 
     Attributes:
         is_available: Computed flag or status indicating if the location is currently operational.
+        missing_items: Cart items the location cannot serve in full, if a cart was given.
     """
 
     is_available: bool = True
+    missing_items: list[MissingItem] = []
+
+
+class NearbyLocation(Location):
+    """
+    Schema for a location returned by the nearby search.
+
+    Attributes:
+        distance_km: Great-circle distance from the search origin in kilometres.
+    """
+
+    distance_km: float
+
+
+class CartItem(BaseModel):
+    """
+    Schema for a medication and the number of units of it.
+
+    Attributes:
+        medication_id: ID of the medication.
+        quantity: Number of units.
+    """
+
+    medication_id: int
+    quantity: int
+
+
+class FulfilmentStop(BaseModel):
+    """
+    Schema for a location in a split-fulfilment plan.
+
+    Attributes:
+        location: The location.
+        distance_km: Great-circle distance from the customer in kilometres.
+        items: Cart items to pick up at this location.
+    """
+
+    location: Location
+    distance_km: float
+    items: list[CartItem]
+
+
+class FulfilmentPlan(BaseModel):
+    """
+    Schema for a proposed split of a cart across nearby locations.
+
+    Attributes:
+        stops: Locations that together serve the cart, in pick order.
+        unavailable_items: Cart items none of the nearby locations can serve.
+    """
+
+    stops: list[FulfilmentStop] = []
+    unavailable_items: list[CartItem] = []
+
+
+class DemandForecast(BaseModel):
+    """
+    Schema for the forecast demand of a medication at a location.
+
+    Attributes:
+        medication_id: ID of the medication.
+        daily_rate: Average units ordered per day recently.
+        expected_demand: Units expected to be ordered over the horizon.
+        stock: Units currently available.
+        days_of_cover: Days until the stock runs out at the daily rate (None without demand).
+        restock_quantity: Units to add to cover the expected demand.
+    """
+
+    medication_id: int
+    daily_rate: float
+    expected_demand: float
+    stock: int
+    days_of_cover: float | None = None
+    restock_quantity: int
+
+
+class LocationForecast(BaseModel):
+    """
+    Schema for the demand forecast of a location.
+
+    Attributes:
+        location_id: ID of the location.
+        history_until: Last day of the order history the forecast is based on.
+        horizon_days: Number of forecast days, starting today.
+        items: Forecast per stocked or ordered medication, by medication ID.
+    """
+
+    location_id: int
+    history_until: date
+    horizon_days: int
+    items: list[DemandForecast] = []
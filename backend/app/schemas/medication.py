@@ -87,3 +87,14 @@ class Medication(MedicationInDBBase):
     """
 
     pass
+
+
+class MedicationSearchResult(Medication):
+    """
+    Schema for a medication returned by the catalog search.
+
+    Attributes:
+        score: Rank of the match; higher scores are better matches.
+    """
+
+    score: int
@@ -30,6 +30,8 @@ class OrderCreate(OrderBase):
     """
     Schema for creating a new order via the API.
 
+    The inherited status is ignored, new orders always start as 'pending'.
+
     Attributes:
         location_id: ID of the location where the order will be picked up.
         prescription_ids: List of prescription IDs to include in the order.
@@ -41,6 +43,45 @@ class OrderCreate(OrderBase):
     medication_ids: list[int] | None = None
 
 
+class OrderBulkItem(OrderCreate):
+    """
+    Schema for a single order within a bulk import.
+
+    Attributes:
+        user_id: ID of the customer the order is placed for (defaults to the importing user).
+    """
+
+    user_id: int | None = None
+
+
+class OrderBulkCreate(BaseModel):
+    """
+    Schema for creating many orders in a single request.
+
+    Attributes:
+        orders: The orders to create.
+    """
+
+    orders: list[OrderBulkItem]
+
+
+class OrderBulkResult(BaseModel):
+    """
+    Schema for the outcome of a single order within a bulk import.
+
+    Attributes:
+        index: Position of the order in the request payload.
+        success: Whether the order was created.
+        order_id: ID of the created order, if successful.
+        error: Reason why the order was rejected, if unsuccessful.
+    """
+
+    index: int
+    success: bool
+    order_id: int | None = None
+    error: str | None = None
+
+
 class OrderUpdate(OrderBase):
     """
     Schema for updating an existing order via the API.
@@ -49,6 +90,36 @@ class OrderUpdate(OrderBase):
     status: str | None = None
 
 
+class OrderStatusBulkUpdate(BaseModel):
+    """
+    Schema for moving many orders to the same status in a single request.
+
+    Attributes:
+        order_ids: IDs of the orders to update.
+        status: The target status.
+    """
+
+    order_ids: list[int]
+    status: str
+
+
+class OrderStatusBulkResult(BaseModel):
+    """
+    Schema for the outcome of a single order within a bulk status update.
+
+    Attributes:
+        order_id: ID of the order.
+        success: Whether the order is now in the target status.
+        changed: Whether the order's status was changed by this request.
+        error: Reason why the order was not updated, if unsuccessful.
+    """
+
+    order_id: int
+    success: bool
+    changed: bool = False
+    error: str | None = None
+
+
 class OrderInDBBase(OrderBase):
     """
     Base schema for order data as stored in the database.
@@ -108,6 +179,45 @@ class Order(OrderInDBBase):
     location: Location | None = None
 
 
+class OrderSummary(BaseModel):
+    """
+    Lightweight order representation for listings such as the order history.
+
+    Attributes:
+        id: Unique identifier of the order.
+        status: Current status of the order.
+        total_price: Calculated total price of the order.
+        location_id: ID of the pickup location.
+        created_at: Timestamp of order creation.
+        updated_at: Timestamp of last update.
+    """
+
+    id: int
+    status: str | None = None
+    total_price: float = 0.0
+    location_id: int | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class OrderStatusCount(BaseModel):
+    """
+    Schema for the number of orders in a status at a location, for the admin dashboard.
+
+    Attributes:
+        location_id: ID of the pickup location (None for orders without a location).
+        status: The order status.
+        count: Number of orders currently in that status.
+    """
+
+    location_id: int | None = None
+    status: str
+    count: int
+
+
 class QRScanRequest(BaseModel):
     """
     Schema for a QR code scan request from the vending machine hardware.
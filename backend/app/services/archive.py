@@ -0,0 +1,105 @@
+"""
+Order archival for the MeTIMat application.
+
+Completed and cancelled orders that have not changed for ORDER_ARCHIVE_AFTER_DAYS
+days are moved from the live order tables into the archive tables by the
+background worker. Each batch copies the orders and their items with
+INSERT ... SELECT, re-links their prescriptions and deletes the originals in a
+single transaction, so an order is always in exactly one of the two tables.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+from app.models.order import OrderMedication
+from app.models.order_archive import ArchivedOrder, ArchivedOrderMedication
+from app.models.prescription import Prescription
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Final order statuses; orders in these states are never modified again
+ARCHIVABLE_STATUSES = ("completed", "cancelled")
+
+# Columns copied from the live order table
+_ORDER_COLUMNS = (
+    "id",
+    "user_id",
+    "location_id",
+    "status",
+    "access_token",
+    "total_price",
+    "created_at",
+    "updated_at",
+)
+
+
+def archive_orders(db: Session, batch_size: int | None = None) -> int:
+    """
+    Move one batch of old completed or cancelled orders to the archive tables.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of orders to archive (defaults to ORDER_ARCHIVE_BATCH_SIZE).
+
+    Returns:
+        int: The number of archived orders.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    order_ids = [
+        order_id
+        for (order_id,) in db.query(OrderModel.id)
+        .filter(
+            OrderModel.status.in_(ARCHIVABLE_STATUSES),
+            OrderModel.updated_at < cutoff,
+        )
+        .order_by(OrderModel.id)
+        .limit(batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    ]
+    if not order_ids:
+        return 0
+
+    now = datetime.utcnow()
+    db.execute(
+        insert(ArchivedOrder).from_select(
+            [*_ORDER_COLUMNS, "archived_at"],
+            select(
+                *[getattr(OrderModel, c) for c in _ORDER_COLUMNS], literal(now)
+            ).where(OrderModel.id.in_(order_ids)),
+        )
+    )
+    db.execute(
+        insert(ArchivedOrderMedication).from_select(
+            ["order_id", "medication_id", "quantity"],
+            select(
+                OrderMedication.order_id,
+                OrderMedication.medication_id,
+                OrderMedication.quantity,
+            ).where(OrderMedication.order_id.in_(order_ids)),
+        )
+    )
+    db.execute(
+        update(Prescription)
+        .where(Prescription.order_id.in_(order_ids))
+        .values(archived_order_id=Prescription.order_id, order_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(OrderMedication)
+        .where(OrderMedication.order_id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(OrderModel)
+        .where(OrderModel.id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    logger.info(f"Archived {len(order_ids)} orders")
+    return len(order_ids)
@@ -0,0 +1,84 @@
+"""
+Stock availability checks for the MeTIMat application.
+
+The map and location picker ask for every listed machine whether it can serve
+the current cart. Availability is computed for all requested locations from a
+single inventory query, comparing the stocked quantity of each cart item with
+the number of units the cart needs.
+"""
+
+from typing import Dict, Iterable, List
+
+from app.models.inventory import Inventory
+from app.schemas.location import MissingItem
+from sqlalchemy.orm import Session
+
+
+def parse_cart(value: str) -> Dict[int, int]:
+    """
+    Parse a cart given as comma-separated 'medication_id' or 'medication_id:quantity' items.
+
+    Items without a quantity count as one unit; repeated medication IDs are summed.
+
+    Args:
+        value: The cart string, e.g. '12:2,15'.
+
+    Returns:
+        Dict[int, int]: Mapping of medication ID to number of units.
+
+    Raises:
+        ValueError: If an item is not a valid ID or quantity.
+    """
+    cart: Dict[int, int] = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        medication_id, _, quantity = item.partition(":")
+        units = int(quantity) if quantity.strip() else 1
+        if units < 1:
+            raise ValueError(f"Invalid quantity for medication {medication_id}")
+        cart[int(medication_id)] = cart.get(int(medication_id), 0) + units
+    return cart
+
+
+def missing_items(
+    db: Session, location_ids: Iterable[int], cart: Dict[int, int]
+) -> Dict[int, List[MissingItem]]:
+    """
+    Determine which cart items each location cannot serve in full.
+
+    Args:
+        db: Database session.
+        location_ids: IDs of the locations to check.
+        cart: Mapping of medication ID to number of units.
+
+    Returns:
+        Dict[int, List[MissingItem]]: The missing items per location ID; locations
+            that can serve the whole cart map to an empty list.
+    """
+    location_ids = list(location_ids)
+    stock: Dict[int, Dict[int, int]] = {location_id: {} for location_id in location_ids}
+    if location_ids and cart:
+        rows = (
+            db.query(Inventory.location_id, Inventory.medication_id, Inventory.quantity)
+            .filter(
+                Inventory.location_id.in_(location_ids),
+                Inventory.medication_id.in_(list(cart)),
+            )
+            .all()
+        )
+        for location_id, medication_id, quantity in rows:
+            stock[location_id][medication_id] = quantity or 0
+
+    return {
+        location_id: [
+            MissingItem(
+                medication_id=medication_id,
+                requested=units,
+                available=stocked.get(medication_id, 0),
+            )
+            for medication_id, units in cart.items()
+            if stocked.get(medication_id, 0) < units
+        ]
+        for location_id, stocked in stock.items()
+    }
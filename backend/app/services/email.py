@@ -7,18 +7,17 @@ confirmation, pickup readiness (with QR code generation), and pickup confirmatio
 """
 
 import base64
-import io
-import smtplib
 from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import formataddr, formatdate, make_msgid
 from typing import Any, Dict, List
 
-import qrcode
 from app.core.config import settings
 
 from .logo import LOGO_SVG_BASE64_DATA
+from .qr import qr_data_uri
+from .smtp import get_smtp_pool
 
 
 def get_base_template(content: str) -> str:
@@ -78,14 +77,20 @@ def send_email(
     html_content: str = "",
 ) -> None:
     """
-    Low-level utility to send an email using the configured SMTP server.
+    Low-level utility to send an email using the pooled SMTP connections.
 
     If SMTP settings are missing, it prints the email content to stdout for debugging.
+    Delivery errors are propagated so that the outbox dispatcher can retry the message.
 
     Args:
         email_to: Recipient email address.
         subject: Subject line of the email.
         html_content: Full HTML body of the email.
+
+    Raises:
+        ValueError: If the SMTP port is not configured.
+        CircuitOpenError: If the mail server has been failing and is not contacted.
+        OSError: If the mail server is unreachable or rejects the delivery.
     """
     if not settings.SMTP_HOST or not settings.EMAILS_FROM_EMAIL:
         print(
@@ -127,17 +132,8 @@ def send_email(
     except Exception as e:
         print(f"ERROR: Could not attach logo to email: {e}")
 
-    try:
-        if settings.SMTP_PORT is None:
-            raise ValueError("SMTP_PORT is not set!")
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            if settings.SMTP_TLS:
-                server.starttls()
-            if settings.SMTP_USER and settings.SMTP_PASSWORD:
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(message)
-    except Exception as e:
-        print(f"ERROR: Failed to send email to {email_to}: {e}")
+    # Reuses an already authenticated connection from the pool where possible
+    get_smtp_pool().send(message)
 
 
 def send_verification_email(email_to: str, token: str) -> None:
@@ -212,7 +208,7 @@ def send_pickup_ready_email(
 ) -> None:
     """
     Sends an email notifying the user that their order is ready for pickup.
-    Includes a generated QR code for the vending machine.
+    Includes the (cached) QR code for the vending machine.
 
     Args:
         email_to: Recipient email address.
@@ -222,16 +218,8 @@ def send_pickup_ready_email(
     """
     subject = f"{settings.PROJECT_NAME} - Bereit zur Abholung #{order_id}"
 
-    # Generate QR Code
-    qr = qrcode.QRCode(version=1, box_size=10, border=4)
-    qr.add_data(pickup_code)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
-    qr_base64 = base64.b64encode(buffered.getvalue()).decode()
-    qr_data_uri = f"data:image/png;base64,{qr_base64}"
+    # Reuses the cached QR code image if it was rendered before (e.g. on re-sends)
+    qr_image_uri = qr_data_uri(pickup_code)
 
     content = f"""
         <h2>Ihre Medikamente sind abholbereit!</h2>
@@ -242,7 +230,7 @@ def send_pickup_ready_email(
             <p>Bitte scannen Sie den folgenden QR-Code am Terminal des Automaten, um das Fach zu öffnen:</p>
 
             <div style="text-align: center; margin: 25px 0;">
-                <img src="{qr_data_uri}" alt="Abhol QR-Code" style="width: 200px; height: 200px; border: 1px solid #eee; padding: 10px; background: white; border-radius: 8px;">
+                <img src="{qr_image_uri}" alt="Abhol QR-Code" style="width: 200px; height: 200px; border: 1px solid #eee; padding: 10px; background: white; border-radius: 8px;">
             </div>
 
             <p style="font-size: 14px; color: #666;">Alternativ können Sie den QR-Code auch in der <strong>MeTIMat App</strong> unter "Bestelldetails" abrufen.</p>
@@ -284,3 +272,95 @@ def send_pickup_confirmation_email(
         <p>Gute Besserung wünscht Ihr MeTIMat Team!</p>
     """
     send_email(email_to, subject, get_base_template(content))
+
+
+def send_pickup_reminder_email(
+    email_to: str,
+    order_id: int,
+    pickup_location: str,
+    pickup_code: str,
+    expires_at: str,
+) -> None:
+    """
+    Sends a reminder for an order that has been waiting for pickup for a while.
+    Includes the (cached) QR code for the vending machine.
+
+    Args:
+        email_to: Recipient email address.
+        order_id: The ID of the order.
+        pickup_location: The name/address of the pickup location.
+        pickup_code: The access token to be encoded in the QR code.
+        expires_at: Formatted date and time after which the order is cancelled.
+    """
+    subject = f"{settings.PROJECT_NAME} - Erinnerung: Abholung #{order_id}"
+
+    qr_image_uri = qr_data_uri(pickup_code)
+
+    content = f"""
+        <h2>Ihre Medikamente warten auf Sie</h2>
+        <p>Ihre Bestellung #{order_id} liegt weiterhin zur Abholung bereit.</p>
+        <div class="order-details">
+            <p style="margin-top:0;"><strong>Standort:</strong><br>{pickup_location}</p>
+            <p>Bitte holen Sie Ihre Bestellung bis <strong>{expires_at}</strong> ab. Danach wird sie storniert und das Fach freigegeben.</p>
+
+            <div style="text-align: center; margin: 25px 0;">
+                <img src="{qr_image_uri}" alt="Abhol QR-Code" style="width: 200px; height: 200px; border: 1px solid #eee; padding: 10px; background: white; border-radius: 8px;">
+            </div>
+        </div>
+        <p>Wir freuen uns auf Ihren Besuch!</p>
+    """
+    send_email(email_to, subject, get_base_template(content))
+
+
+def send_pickup_expired_email(email_to: str, order_id: int) -> None:
+    """
+    Sends an email informing the user that their order was cancelled because it
+    was not picked up in time.
+
+    Args:
+        email_to: Recipient email address.
+        order_id: The ID of the order.
+    """
+    subject = f"{settings.PROJECT_NAME} - Bestellung storniert #{order_id}"
+
+    content = f"""
+        <h2>Ihre Bestellung wurde storniert</h2>
+        <p>Ihre Bestellung #{order_id} wurde nicht innerhalb der Abholfrist abgeholt und daher storniert.</p>
+        <div class="order-details">
+            <p style="margin-top:0;">Das Fach am Automaten wurde wieder freigegeben. Sie können Ihre Medikamente jederzeit erneut in der <strong>MeTIMat App</strong> bestellen.</p>
+        </div>
+        <p>Ihr MeTIMat Team</p>
+    """
+    send_email(email_to, subject, get_base_template(content))
+
+
+def send_low_stock_digest_email(
+    email_to: str, location_name: str, items: List[Dict[str, Any]]
+) -> None:
+    """
+    Sends a digest of the medications running low at a location to the staff.
+
+    Args:
+        email_to: Recipient email address.
+        location_name: The name of the location.
+        items: Low medications with their 'name', current 'quantity', 'threshold'
+            and whether the alert is 'new' since the last digest.
+    """
+    subject = f"{settings.PROJECT_NAME} - Niedriger Bestand: {location_name}"
+
+    items_html = "".join(f"""
+        <div class="item-row">
+            <span>{item['name']}{' <strong>(neu)</strong>' if item['new'] else ''}</span>
+            <span>{item['quantity']} / {item['threshold']}</span>
+        </div>
+        """ for item in items)
+
+    content = f"""
+        <h2>Niedriger Bestand</h2>
+        <p>Am Standort <strong>{location_name}</strong> unterschreiten folgende Medikamente ihren Mindestbestand (Bestand / Mindestbestand):</p>
+        <div class="order-details">
+            {items_html}
+        </div>
+        <p>Bitte planen Sie eine Nachfüllung ein.</p>
+    """
+    send_email(email_to, subject, get_base_template(content))
@@ -0,0 +1,241 @@
+"""
+Demand forecasting for restock planning in the MeTIMat application.
+
+Every placed order counts as demand for its medications at its location,
+including orders that are cancelled later: a customer wanted the medication at
+that machine. The daily demand of the whole fleet is kept in memory as a
+(location, medication) x day matrix covering the last FORECAST_HISTORY_DAYS
+complete days, loaded with two aggregate queries and converted to columnar
+arrays without building ORM objects.
+
+The matrix is refreshed incrementally: once a day has passed, only the orders
+of the days not yet loaded are queried and the matrix is shifted by the number
+of elapsed days. Run rates (moving average over FORECAST_WINDOW_DAYS) and
+weekday seasonality indexes are then recomputed for all series at once with
+numpy, so a forecast only has to look up the series of one location.
+
+History never reaches further back than ORDER_ARCHIVE_AFTER_DAYS, so all of it
+is still in the live order tables.
+"""
+
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+from app.models.order import OrderMedication
+from app.models.prescription import Prescription
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+# (location_id, medication_id)
+Series = Tuple[int, int]
+
+
+def _today() -> np.datetime64:
+    return np.datetime64(datetime.utcnow().date(), "D")
+
+
+def _weekdays(days: np.ndarray) -> np.ndarray:
+    # Day 0 of datetime64, 1970-01-01, was a Thursday; Monday is 0
+    return (days.astype(np.int64) + 3) % 7
+
+
+def _as_datetime(day: np.datetime64) -> datetime:
+    return day.astype("datetime64[s]").astype(datetime)
+
+
+def _load_demand(
+    db: Session, first_day: np.datetime64, last_day: np.datetime64
+) -> Tuple[List[Series], np.ndarray, np.ndarray]:
+    """
+    Sum up the units ordered per (location, medication) and day.
+
+    Args:
+        db: Database session.
+        first_day: First day to load.
+        last_day: Last day to load (inclusive).
+
+    Returns:
+        Tuple[List[Series], np.ndarray, np.ndarray]: The series, days and units of
+            every (location, medication, day) with demand, as parallel columns.
+    """
+    since, until = _as_datetime(first_day), _as_datetime(last_day + 1)
+    day = func.date(OrderModel.created_at)
+    rows = (
+        db.query(
+            OrderModel.location_id,
+            OrderMedication.medication_id,
+            day,
+            func.sum(OrderMedication.quantity),
+        )
+        .join(OrderModel, OrderModel.id == OrderMedication.order_id)
+        .filter(OrderModel.created_at >= since, OrderModel.created_at < until)
+        .group_by(OrderModel.location_id, OrderMedication.medication_id, day)
+        .all()
+    )
+    rows += (
+        db.query(
+            OrderModel.location_id,
+            Prescription.medication_id,
+            day,
+            func.count(),
+        )
+        .join(OrderModel, OrderModel.id == Prescription.order_id)
+        .filter(
+            OrderModel.created_at >= since,
+            OrderModel.created_at < until,
+            Prescription.medication_id.isnot(None),
+        )
+        .group_by(OrderModel.location_id, Prescription.medication_id, day)
+        .all()
+    )
+    if not rows:
+        return [], np.empty(0, dtype="datetime64[D]"), np.empty(0)
+
+    location_ids, medication_ids, days, units = zip(*rows)
+    return (
+        list(zip(location_ids, medication_ids)),
+        # SQLite returns the day as a string, PostgreSQL as a date
+        np.array([str(d) for d in days], dtype="datetime64[D]"),
+        np.array(units, dtype=np.float64),
+    )
+
+
+class DemandForecaster:
+    """
+    Thread-safe, incrementally refreshed demand history of the whole fleet.
+    """
+
+    def __init__(self) -> None:
+        self._demand = np.zeros((0, 0))
+        self._first_day: np.datetime64 | None = None
+        # (location_id, medication_id) -> row, location_id -> (rows, medication IDs)
+        self._series: Dict[Series, int] = {}
+        self._rows_of_location: Dict[int, Tuple[np.ndarray, List[int]]] = {}
+        self._rates = np.zeros(0)
+        self._weekday_index = np.ones((0, 7))
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session) -> int:
+        """
+        Bring the demand history up to the last complete day.
+
+        Only the days that are not loaded yet are queried; a changed history
+        length triggers a full reload.
+
+        Args:
+            db: Database session.
+
+        Returns:
+            int: The number of days loaded from the database.
+        """
+        history_days = min(
+            settings.FORECAST_HISTORY_DAYS, settings.ORDER_ARCHIVE_AFTER_DAYS
+        )
+        last_day = _today() - 1
+        first_day = last_day - history_days + 1
+        with self._lock:
+            demand, cached_first = self._demand, self._first_day
+            series = dict(self._series)
+
+        if cached_first == first_day and demand.shape[1] == history_days:
+            return 0
+        shift = (
+            int((first_day - cached_first).astype(np.int64))
+            if cached_first is not None
+            else -1
+        )
+        if 0 < shift < history_days and demand.shape[1] == history_days:
+            demand = np.concatenate(
+                [demand[:, shift:], np.zeros((len(series), shift))], axis=1
+            )
+            load_from = last_day - shift + 1
+        else:
+            demand, series = np.zeros((0, history_days)), {}
+            load_from = first_day
+
+        keys, days, units = _load_demand(db, load_from, last_day)
+        for key in keys:
+            series.setdefault(key, len(series))
+        if len(series) > demand.shape[0]:
+            demand = np.concatenate(
+                [demand, np.zeros((len(series) - demand.shape[0], history_days))]
+            )
+        if keys:
+            np.add.at(
+                demand,
+                (
+                    np.array([series[key] for key in keys]),
+                    (days - first_day).astype(np.int64),
+                ),
+                units,
+            )
+
+        # Run rate over the recent window, seasonality over the whole history
+        window = min(settings.FORECAST_WINDOW_DAYS, history_days)
+        rates = demand[:, -window:].mean(axis=1)
+        weekdays = _weekdays(first_day + np.arange(history_days))
+        occurrences = np.bincount(weekdays, minlength=7)
+        profile = (demand @ (weekdays[:, None] == np.arange(7))) / np.maximum(
+            occurrences, 1
+        )
+        means = demand.mean(axis=1, keepdims=True)
+        weekday_index = np.divide(
+            profile,
+            means,
+            out=np.ones_like(profile),
+            where=(means > 0) & (occurrences > 0),
+        )
+
+        rows_of_location: Dict[int, Tuple[List[int], List[int]]] = {}
+        for (location_id, medication_id), row in series.items():
+            rows, medication_ids = rows_of_location.setdefault(location_id, ([], []))
+            rows.append(row)
+            medication_ids.append(medication_id)
+        with self._lock:
+            self._demand = demand
+            self._first_day = first_day
+            self._series = series
+            self._rows_of_location = {
+                location_id: (np.array(rows), medication_ids)
+                for location_id, (rows, medication_ids) in rows_of_location.items()
+            }
+            self._rates = rates
+            self._weekday_index = weekday_index
+        return int((last_day - load_from).astype(np.int64)) + 1
+
+    def forecast(
+        self, db: Session, location_id: int, horizon_days: int
+    ) -> Tuple[date, Dict[int, Tuple[float, float]]]:
+        """
+        Forecast the demand at a location, starting today.
+
+        Args:
+            db: Database session, used to refresh the history when a day has passed.
+            location_id: ID of the location.
+            horizon_days: Number of days to forecast.
+
+        Returns:
+            Tuple[date, Dict[int, Tuple[float, float]]]: The last day of the history,
+                and per medication ID the daily run rate and the expected units
+                over the horizon.
+        """
+        self.refresh(db)
+        today = _today()
+        horizon = _weekdays(today + np.arange(horizon_days))
+        with self._lock:
+            if location_id not in self._rows_of_location:
+                return (today - 1).astype(date), {}
+            rows, medication_ids = self._rows_of_location[location_id]
+            rates = self._rates[rows]
+            expected = rates * self._weekday_index[rows][:, horizon].sum(axis=1)
+        return (today - 1).astype(date), {
+            medication_id: (float(rate), float(units))
+            for medication_id, rate, units in zip(medication_ids, rates, expected)
+        }
+
+
+demand_forecaster = DemandForecaster()
@@ -0,0 +1,188 @@
+"""
+Split-fulfilment planning for the MeTIMat application.
+
+When no single location stocks the whole cart, the planner proposes a small set
+of nearby locations that together cover it. Stock is read from an in-memory
+matrix of quantities (locations x medications) that is rebuilt from a single
+inventory query every STOCK_MATRIX_REFRESH_SECONDS, or earlier after inventory
+writes of this process. Planning works on boolean "can serve this item in full"
+rows per candidate location and picks locations greedily (greedy set cover):
+each step takes the location serving the most still uncovered items, the
+nearest one on ties.
+
+Plans are proposals. Stock is only taken when the resulting orders are placed,
+each of which reserves its items atomically.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.models.inventory import Inventory
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class PlannedStop:
+    """
+    A location in a fulfilment plan.
+
+    Attributes:
+        location_id: ID of the location.
+        distance_km: Distance from the customer in kilometres.
+        items: Mapping of medication ID to units to pick up at this location.
+    """
+
+    location_id: int
+    distance_km: float
+    items: Dict[int, int] = field(default_factory=dict)
+
+
+class StockMatrix:
+    """
+    Thread-safe, periodically rebuilt matrix of stock quantities.
+    """
+
+    def __init__(self) -> None:
+        self._quantities = np.zeros((0, 0), dtype=np.int32)
+        # location_id -> row, medication_id -> column
+        self._rows: Dict[int, int] = {}
+        self._columns: Dict[int, int] = {}
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Replace the matrix with the current stock in the database.
+
+        Args:
+            db: Database session.
+
+        Returns:
+            int: The number of inventory rows loaded.
+        """
+        rows = (
+            db.query(Inventory.location_id, Inventory.medication_id, Inventory.quantity)
+            .filter(Inventory.quantity > 0)
+            .all()
+        )
+        location_ids = sorted({loc_id for loc_id, _, _ in rows})
+        medication_ids = sorted({med_id for _, med_id, _ in rows})
+        row_of = {loc_id: i for i, loc_id in enumerate(location_ids)}
+        column_of = {med_id: i for i, med_id in enumerate(medication_ids)}
+        quantities = np.zeros((len(location_ids), len(medication_ids)), dtype=np.int32)
+        for loc_id, med_id, quantity in rows:
+            quantities[row_of[loc_id], column_of[med_id]] = quantity
+        with self._lock:
+            self._quantities = quantities
+            self._rows = row_of
+            self._columns = column_of
+            self._loaded_at = time.monotonic()
+        return len(rows)
+
+    def invalidate(self) -> None:
+        """
+        Force a rebuild on next use, e.g. after stock was written.
+        """
+        with self._lock:
+            self._loaded_at = None
+
+    def stock(
+        self, db: Session, location_ids: List[int], medication_ids: List[int]
+    ) -> np.ndarray:
+        """
+        Get the stocked quantities of the given medications at the given locations.
+
+        Args:
+            db: Database session, used to rebuild the matrix when it is outdated.
+            location_ids: Row order of the result.
+            medication_ids: Column order of the result.
+
+        Returns:
+            np.ndarray: Quantities, shape (len(location_ids), len(medication_ids)).
+        """
+        loaded_at = self._loaded_at
+        if (
+            loaded_at is None
+            or time.monotonic() - loaded_at > settings.STOCK_MATRIX_REFRESH_SECONDS
+        ):
+            self.rebuild(db)
+
+        with self._lock:
+            result = np.zeros((len(location_ids), len(medication_ids)), dtype=np.int32)
+            rows = [
+                (i, self._rows[loc])
+                for i, loc in enumerate(location_ids)
+                if loc in self._rows
+            ]
+            columns = [
+                (j, self._columns[med])
+                for j, med in enumerate(medication_ids)
+                if med in self._columns
+            ]
+            if rows and columns:
+                (ri, rs), (cj, cs) = zip(*rows), zip(*columns)
+                result[np.ix_(ri, cj)] = self._quantities[np.ix_(rs, cs)]
+        return result
+
+
+def plan_fulfilment(
+    stock: np.ndarray,
+    candidates: List[Tuple[int, float]],
+    cart: Dict[int, int],
+    max_stops: int,
+) -> Tuple[List[PlannedStop], Dict[int, int]]:
+    """
+    Cover a cart with as few locations as possible, preferring near ones.
+
+    Every item is picked up in full at a single location.
+
+    Args:
+        stock: Quantities of the cart's medications (columns in cart order) at the
+            candidate locations (rows in candidate order).
+        candidates: (location ID, distance in km) pairs, nearest first.
+        cart: Mapping of medication ID to number of units.
+        max_stops: Maximum number of locations in the plan.
+
+    Returns:
+        Tuple[List[PlannedStop], Dict[int, int]]: The planned stops in pick order,
+            and the cart items no combination of candidates can serve.
+    """
+    medication_ids = list(cart)
+    needed = np.array([cart[m] for m in medication_ids], dtype=np.int32)
+    serves = stock >= needed  # candidate x item
+    uncovered = serves.any(axis=0)
+    unservable = {
+        medication_ids[j]: cart[medication_ids[j]] for j in np.flatnonzero(~uncovered)
+    }
+
+    stops: List[PlannedStop] = []
+    while uncovered.any() and len(stops) < max_stops:
+        gains = (serves & uncovered).sum(axis=1)
+        # argmax returns the first maximum, i.e. the nearest of equal candidates
+        best = int(np.argmax(gains))
+        if gains[best] == 0:
+            break
+        taken = serves[best] & uncovered
+        location_id, distance = candidates[best]
+        stops.append(
+            PlannedStop(
+                location_id=location_id,
+                distance_km=distance,
+                items={
+                    medication_ids[j]: cart[medication_ids[j]]
+                    for j in np.flatnonzero(taken)
+                },
+            )
+        )
+        uncovered &= ~taken
+
+    for j in np.flatnonzero(uncovered):
+        unservable[medication_ids[j]] = cart[medication_ids[j]]
+    return stops, unservable
+
+
+stock_matrix = StockMatrix()
@@ -0,0 +1,134 @@
+"""
+Idempotency key handling for the MeTIMat application.
+
+Clients may send an 'Idempotency-Key' header with requests that create data.
+The first request with a key claims it by inserting a record in the same
+transaction as its write, and stores its response there before committing. A
+retry with the same key then only needs a single indexed lookup to replay that
+response. Concurrent requests with the same key are serialized by the unique
+index: the second insert waits for the first transaction and then replays its
+outcome. Records expire after IDEMPOTENCY_KEY_TTL_HOURS and are purged by the
+background worker.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any
+
+from app.core.config import settings
+from app.models.idempotency import IdempotencyKey
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+
+class IdempotencyKeyMismatch(Exception):
+    """
+    Raised when a key is reused with a different request payload.
+    """
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def request_fingerprint(payload: Any) -> str:
+    """
+    Hash a JSON-serializable request payload independently of key order.
+
+    Args:
+        payload: The request payload, e.g. the output of model_dump().
+
+    Returns:
+        str: Hex digest identifying the payload.
+    """
+    return _sha256(json.dumps(payload, sort_keys=True, default=str))
+
+
+def claim_key(
+    db: Session, user_id: int, key: str, fingerprint: str
+) -> tuple[IdempotencyKey, bool]:
+    """
+    Look up an idempotency key or claim it for the current request.
+
+    A newly claimed record is flushed but not committed; the caller stores the
+    response on it and commits it together with its own changes.
+
+    Args:
+        db: Database session of the request.
+        user_id: ID of the authenticated user.
+        key: The client-supplied idempotency key.
+        fingerprint: request_fingerprint() of the request payload.
+
+    Returns:
+        tuple[IdempotencyKey, bool]: The record and whether it holds a response to
+            replay (False if the key was claimed by this request).
+
+    Raises:
+        IdempotencyKeyMismatch: If the key was used with a different payload.
+    """
+    key_hash = _sha256(key)
+    now = datetime.utcnow()
+    record = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key_hash == key_hash)
+        .first()
+    )
+    if record is not None and record.expires_at <= now:  # type: ignore
+        db.delete(record)
+        db.flush()
+        record = None
+
+    if record is None:
+        record = IdempotencyKey(
+            user_id=user_id,
+            key_hash=key_hash,
+            request_hash=fingerprint,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+        try:
+            with db.begin_nested():
+                db.add(record)
+                db.flush()
+            return record, False
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            record = (
+                db.query(IdempotencyKey)
+                .filter(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key_hash == key_hash,
+                )
+                .one()
+            )
+
+    if record.request_hash != fingerprint:
+        raise IdempotencyKeyMismatch()
+    return record, True
+
+
+def purge_expired_keys(db: Session, batch_size: int | None = None) -> int:
+    """
+    Delete one batch of expired idempotency records.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of records to delete (defaults to IDEMPOTENCY_PURGE_BATCH_SIZE).
+
+    Returns:
+        int: The number of deleted records.
+    """
+    expired_ids = (
+        select(IdempotencyKey.id)
+        .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        .limit(batch_size or settings.IDEMPOTENCY_PURGE_BATCH_SIZE)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        delete(IdempotencyKey)
+        .where(IdempotencyKey.id.in_(expired_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount  # type: ignore
@@ -0,0 +1,245 @@
+"""
+Inventory reservation service for the MeTIMat application.
+
+Stock is reserved when an order is placed and released again when a pending
+order is cancelled or deleted. Every change is a single conditional UPDATE of
+the (location_id, medication_id) inventory row, so the database's row lock is
+the only synchronization: there is no read-modify-write window in which two
+orders could take the same last unit, and orders at different locations never
+wait for each other. Rows are always updated in ascending medication ID order,
+so two orders touching the same rows cannot deadlock.
+
+Every change is also appended to the stock ledger (see stock_ledger).
+
+Machines report their physically counted stock after every restock. A report is
+applied as one bulk upsert; units still held for orders waiting at the machine
+are subtracted, so the stored quantity stays the number of units available for
+new orders.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from app.models.inventory import Inventory
+from app.models.order import Order as OrderModel
+from app.models.order import OrderMedication
+from app.models.prescription import Prescription
+from app.services.stock_ledger import order_movements, record_movements
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when a location does not have enough units of a medication in stock.
+
+    Attributes:
+        medication_id: ID of the medication that is out of stock.
+    """
+
+    def __init__(self, medication_id: int) -> None:
+        super().__init__(f"Insufficient stock for medication {medication_id}")
+        self.medication_id = medication_id
+
+
+def order_quantities(
+    medication_ids: Iterable[tuple[int, int]], prescription_medication_ids: Iterable
+) -> Dict[int, int]:
+    """
+    Sum up the units per medication an order takes from a location's stock.
+
+    Args:
+        medication_ids: (medication_id, quantity) pairs of the ordered medications.
+        prescription_medication_ids: Catalog medication IDs of the order's prescriptions
+            (None for prescriptions that are not matched to the catalog).
+
+    Returns:
+        Dict[int, int]: Mapping of medication ID to number of units.
+    """
+    quantities: Dict[int, int] = {}
+    for medication_id, quantity in medication_ids:
+        quantities[medication_id] = quantities.get(medication_id, 0) + quantity
+    for medication_id in prescription_medication_ids:
+        if medication_id is not None:
+            quantities[medication_id] = quantities.get(medication_id, 0) + 1
+    return quantities
+
+
+def reserve_stock(db: Session, location_id: int, quantities: Dict[int, int]) -> None:
+    """
+    Atomically take the given quantities from a location's stock.
+
+    The caller must roll back the transaction (or a savepoint around this call) if
+    an InsufficientStockError is raised, since earlier rows may already have been
+    decremented.
+
+    Args:
+        db: Database session of the order transaction.
+        location_id: ID of the pickup location.
+        quantities: Mapping of medication ID to number of units.
+
+    Raises:
+        InsufficientStockError: If a medication is not stocked in sufficient quantity.
+    """
+    for medication_id in sorted(quantities):
+        quantity = quantities[medication_id]
+        result = db.execute(
+            update(Inventory)
+            .where(
+                Inventory.location_id == location_id,
+                Inventory.medication_id == medication_id,
+                Inventory.quantity >= quantity,
+            )
+            .values(quantity=Inventory.quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:  # type: ignore
+            raise InsufficientStockError(medication_id)
+
+
+def release_stock(db: Session, location_id: int, quantities: Dict[int, int]) -> None:
+    """
+    Return previously reserved quantities to a location's stock.
+
+    Args:
+        db: Database session.
+        location_id: ID of the pickup location.
+        quantities: Mapping of medication ID to number of units.
+    """
+    for medication_id in sorted(quantities):
+        db.execute(
+            update(Inventory)
+            .where(
+                Inventory.location_id == location_id,
+                Inventory.medication_id == medication_id,
+            )
+            .values(quantity=Inventory.quantity + quantities[medication_id])
+            .execution_options(synchronize_session=False)
+        )
+
+
+def release_order_stock(db: Session, order: OrderModel) -> None:
+    """
+    Release the stock reserved for an order that will not be picked up.
+
+    Does nothing if no stock is reserved for the order, so it is safe to call on
+    every cancellation or deletion.
+
+    Args:
+        db: Database session.
+        order: The order with its medication items and prescriptions accessible.
+    """
+    if not order.stock_reserved or order.location_id is None:  # type: ignore
+        return
+    quantities = order_quantities(
+        [(item.medication_id, item.quantity) for item in order.medication_items],
+        [p.medication_id for p in order.prescriptions],
+    )
+    release_stock(db, order.location_id, quantities)  # type: ignore
+    record_movements(
+        db,
+        "release",
+        order_movements(order.location_id, quantities, 1, order.id),  # type: ignore
+    )
+    order.stock_reserved = False  # type: ignore
+
+
+def reserved_quantities(db: Session, location_id: int) -> Dict[int, int]:
+    """
+    Sum up the units held at a location for orders that still reserve stock.
+
+    Args:
+        db: Database session.
+        location_id: ID of the location.
+
+    Returns:
+        Dict[int, int]: Mapping of medication ID to number of reserved units.
+    """
+    reserved = dict(
+        db.query(OrderMedication.medication_id, func.sum(OrderMedication.quantity))
+        .join(OrderModel, OrderModel.id == OrderMedication.order_id)
+        .filter(OrderModel.location_id == location_id, OrderModel.stock_reserved)
+        .group_by(OrderMedication.medication_id)
+        .all()
+    )
+    for medication_id, count in (
+        db.query(Prescription.medication_id, func.count())
+        .join(OrderModel, OrderModel.id == Prescription.order_id)
+        .filter(
+            OrderModel.location_id == location_id,
+            OrderModel.stock_reserved,
+            Prescription.medication_id.isnot(None),
+        )
+        .group_by(Prescription.medication_id)
+    ):
+        reserved[medication_id] = reserved.get(medication_id, 0) + count
+    return reserved
+
+
+def apply_stock_report(
+    db: Session, location_id: int, counted: Dict[int, int]
+) -> List[Tuple[int, int, int]]:
+    """
+    Replace a location's stock with a machine's full stock report.
+
+    Medications missing from the report are set to zero. The location's inventory
+    rows are locked while the report is applied, so concurrent reservations
+    either complete before it or see its result. All changed rows are written with
+    a single upsert on (location_id, medication_id).
+
+    Args:
+        db: Database session.
+        location_id: ID of the reporting location.
+        counted: Mapping of medication ID to units physically present.
+
+    Returns:
+        List[Tuple[int, int, int]]: (medication_id, old quantity, new quantity) for
+            every changed row, ordered by medication ID.
+    """
+    current = dict(
+        db.query(Inventory.medication_id, Inventory.quantity)
+        .filter(Inventory.location_id == location_id)
+        .with_for_update()
+        .all()
+    )
+    reserved = reserved_quantities(db, location_id)
+
+    changes = []
+    for medication_id in sorted(set(current) | set(counted)):
+        old = current.get(medication_id) or 0
+        new = max(counted.get(medication_id, 0) - reserved.get(medication_id, 0), 0)
+        if medication_id not in current or old != new:
+            changes.append((medication_id, old, new))
+    if not changes:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(Inventory).values(
+        [
+            {
+                "location_id": location_id,
+                "medication_id": medication_id,
+                "quantity": new,
+            }
+            for medication_id, _, new in changes
+        ]
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["location_id", "medication_id"],
+            set_={"quantity": stmt.excluded.quantity},
+        )
+    )
+    changes = [change for change in changes if change[1] != change[2]]
+    for kind, sign in (("restock", 1), ("correction", -1)):
+        record_movements(
+            db,
+            kind,
+            [
+                (location_id, medication_id, new - old, None)
+                for medication_id, old, new in changes
+                if (new - old) * sign > 0
+            ],
+        )
+    return changes
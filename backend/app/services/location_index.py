@@ -0,0 +1,201 @@
+"""
+In-process spatial index of locations for nearest-machine searches.
+
+The coordinates of all locations are kept in numpy arrays, bucketed into a grid
+of GRID_DEGREES x GRID_DEGREES cells. A radius search only looks at the cells
+overlapping the radius' bounding box and ranks the candidates with a vectorized
+haversine distance, so the cost of a search depends on the number of machines
+around the user rather than on the size of the fleet. Grid columns wrap around
+at the antimeridian, so searches near ±180° longitude see both sides of it.
+
+The index is built on first use, updated by the location endpoints of this
+process and rebuilt from the database every LOCATION_INDEX_REFRESH_SECONDS, so
+writes made by other processes are picked up as well.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.models.location import Location as LocationModel
+from sqlalchemy.orm import Session
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Cell size of the grid; 0.1 degrees of latitude are about 11 km
+GRID_DEGREES = 0.1
+
+# Number of grid columns around the globe; column indices wrap at the antimeridian
+GRID_COLUMNS = round(360 / GRID_DEGREES)
+
+
+def haversine_km(
+    lat: float, lon: float, lats: np.ndarray, lons: np.ndarray
+) -> np.ndarray:
+    """
+    Compute the great-circle distances from one point to many points.
+
+    Args:
+        lat: Latitude of the origin in degrees.
+        lon: Longitude of the origin in degrees.
+        lats: Latitudes of the targets in degrees.
+        lons: Longitudes of the targets in degrees.
+
+    Returns:
+        np.ndarray: The distances in kilometres.
+    """
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return math.floor(lat / GRID_DEGREES), math.floor(lon / GRID_DEGREES) % GRID_COLUMNS
+
+
+class LocationIndex:
+    """
+    Thread-safe grid index over the coordinates of all locations.
+    """
+
+    def __init__(self) -> None:
+        # location_id -> (latitude, longitude), the source of truth of the index
+        self._coordinates: Dict[int, Tuple[float, float]] = {}
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lats = np.empty(0)
+        self._lons = np.empty(0)
+        # grid cell -> positions in the arrays
+        self._grid: Dict[Tuple[int, int], np.ndarray] = {}
+        self._dirty = False
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Replace the index contents with the current state of the database.
+
+        Args:
+            db: Database session.
+
+        Returns:
+            int: The number of indexed locations.
+        """
+        rows = db.query(
+            LocationModel.id, LocationModel.latitude, LocationModel.longitude
+        ).all()
+        with self._lock:
+            self._coordinates = {
+                loc_id: (lat, lon)
+                for loc_id, lat, lon in rows
+                if lat is not None and lon is not None
+            }
+            self._dirty = True
+            self._loaded_at = time.monotonic()
+        return len(rows)
+
+    def update_location(self, location: LocationModel) -> None:
+        """
+        Add or move a location after it was written.
+
+        Args:
+            location: The location.
+        """
+        with self._lock:
+            self._coordinates[location.id] = (  # type: ignore
+                location.latitude,
+                location.longitude,
+            )
+            self._dirty = True
+
+    def remove_location(self, location_id: int) -> None:
+        """
+        Remove a deleted location.
+
+        Args:
+            location_id: ID of the location.
+        """
+        with self._lock:
+            self._coordinates.pop(location_id, None)
+            self._dirty = True
+
+    def _build_grid(self) -> None:
+        items = sorted(self._coordinates.items())
+        self._ids = np.array([loc_id for loc_id, _ in items], dtype=np.int64)
+        self._lats = np.array([lat for _, (lat, _) in items], dtype=float)
+        self._lons = np.array([lon for _, (_, lon) in items], dtype=float)
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for position, (lat, lon) in enumerate(zip(self._lats, self._lons)):
+            cells.setdefault(_cell(lat, lon), []).append(position)
+        self._grid = {cell: np.array(p) for cell, p in cells.items()}
+        self._dirty = False
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+        min_lat, max_lat = max(lat - lat_delta, -90.0), min(lat + lat_delta, 90.0)
+        # Longitude degrees shrink towards the poles; fall back to a full scan there
+        cos_lat = min(math.cos(math.radians(min_lat)), math.cos(math.radians(max_lat)))
+        if cos_lat < 0.01:
+            return np.arange(len(self._ids))
+        lon_delta = lat_delta / cos_lat
+        min_row, max_row = _cell(min_lat, lon)[0], _cell(max_lat, lon)[0]
+        # Unwrapped column range; boxes crossing the antimeridian wrap around below
+        min_col = math.floor((lon - lon_delta) / GRID_DEGREES)
+        max_col = math.floor((lon + lon_delta) / GRID_DEGREES)
+        cells = (max_row - min_row + 1) * (max_col - min_col + 1)
+        if max_col - min_col + 1 >= GRID_COLUMNS or cells > len(self._grid):
+            return np.arange(len(self._ids))
+        positions = [
+            self._grid[(row, col % GRID_COLUMNS)]
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+            if (row, col % GRID_COLUMNS) in self._grid
+        ]
+        return np.concatenate(positions) if positions else np.empty(0, dtype=int)
+
+    def nearest(
+        self, db: Session, lat: float, lon: float, radius_km: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Find all locations within a radius, nearest first.
+
+        Args:
+            db: Database session, used to (re)build the index when needed.
+            lat: Latitude of the search origin in degrees.
+            lon: Longitude of the search origin in degrees.
+            radius_km: Search radius in kilometres.
+
+        Returns:
+            List[Tuple[int, float]]: (location ID, distance in km) pairs, sorted by distance.
+        """
+        loaded_at = self._loaded_at
+        if (
+            loaded_at is None
+            or time.monotonic() - loaded_at > settings.LOCATION_INDEX_REFRESH_SECONDS
+        ):
+            self.rebuild(db)
+
+        with self._lock:
+            if self._dirty:
+                self._build_grid()
+            positions = self._candidates(lat, lon, radius_km)
+            ids, lats, lons = (
+                self._ids[positions],
+                self._lats[positions],
+                self._lons[positions],
+            )
+
+        distances = haversine_km(lat, lon, lats, lons)
+        within = distances <= radius_km
+        ids, distances = ids[within], distances[within]
+        order = np.argsort(distances, kind="stable")
+        return [(int(ids[i]), float(distances[i])) for i in order]
+
+
+location_index = LocationIndex()
@@ -0,0 +1,275 @@
+"""
+Low-stock detection for the MeTIMat application.
+
+Every stock change is checked against the threshold of the changed
+(location, medication) rows only, as part of the transaction that records it:
+a decrease opens an alert if the stock is now below the threshold, an increase
+closes the alert once the stock is back at or above it. Each check is a single
+set-based statement, and there is at most one open alert per row, so repeated
+sales below the threshold never raise duplicates and no periodic full scan is
+needed.
+
+The digest job sends one email per location listing its open alerts whenever
+new ones were raised, so a machine running low on several medications at once
+leads to a single message for the restock tour.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.core.config import settings
+from app.models.inventory import Inventory
+from app.models.location import Location as LocationModel
+from app.models.low_stock_alert import LowStockAlert
+from app.models.medication import Medication as MedicationModel
+from app.models.user import User as UserModel
+from app.services.outbox import enqueue_email
+from sqlalchemy import DateTime, delete, func, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def _threshold():
+    return func.coalesce(Inventory.low_stock_threshold, settings.LOW_STOCK_THRESHOLD)
+
+
+def _rows(pairs: List[Tuple[int, int]] | None) -> Any:
+    key = tuple_(Inventory.location_id, Inventory.medication_id)
+    return key.in_(pairs) if pairs is not None else True
+
+
+def raise_alerts(db: Session, pairs: List[Tuple[int, int]] | None = None) -> None:
+    """
+    Open alerts for the given inventory rows that are below their threshold.
+
+    Rows that already have an open alert keep it unchanged.
+
+    Args:
+        db: Database session of the stock change.
+        pairs: (location_id, medication_id) pairs to check (None checks all rows).
+    """
+    dialect = db.get_bind().dialect.name
+    stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(
+        LowStockAlert
+    ).from_select(
+        ["location_id", "medication_id", "created_at"],
+        select(
+            Inventory.location_id,
+            Inventory.medication_id,
+            literal(datetime.utcnow(), DateTime),
+        ).where(_rows(pairs), Inventory.quantity < _threshold()),
+    )
+    db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["location_id", "medication_id"])
+    )
+
+
+def resolve_alerts(db: Session, pairs: List[Tuple[int, int]] | None = None) -> None:
+    """
+    Close the alerts of the given inventory rows that are back at or above their threshold.
+
+    Args:
+        db: Database session of the stock change.
+        pairs: (location_id, medication_id) pairs to check (None checks all rows).
+    """
+    db.execute(
+        delete(LowStockAlert)
+        .where(
+            tuple_(LowStockAlert.location_id, LowStockAlert.medication_id).in_(
+                select(Inventory.location_id, Inventory.medication_id).where(
+                    _rows(pairs), Inventory.quantity >= _threshold()
+                )
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def check_low_stock(db: Session, changes: Iterable[Tuple[int, int, int]]) -> None:
+    """
+    Update the alerts of the inventory rows touched by a stock change.
+
+    Args:
+        db: Database session of the stock change.
+        changes: (location_id, medication_id, delta) of every changed row.
+    """
+    fell, rose = [], []
+    for location_id, medication_id, delta in changes:
+        (fell if delta < 0 else rose).append((location_id, medication_id))
+    if fell:
+        raise_alerts(db, fell)
+    if rose:
+        resolve_alerts(db, rose)
+
+
+def set_thresholds(
+    db: Session, location_id: int, thresholds: Dict[int, int | None]
+) -> List[int]:
+    """
+    Set the low-stock thresholds of a location's medications and update their alerts.
+
+    Args:
+        db: Database session.
+        location_id: ID of the location.
+        thresholds: Mapping of medication ID to threshold (None for the default).
+
+    Returns:
+        List[int]: IDs of the medications that are not stocked at the location and
+            were left unchanged.
+    """
+    missing = []
+    for medication_id in sorted(thresholds):
+        result = db.execute(
+            update(Inventory)
+            .where(
+                Inventory.location_id == location_id,
+                Inventory.medication_id == medication_id,
+            )
+            .values(low_stock_threshold=thresholds[medication_id])
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:  # type: ignore
+            missing.append(medication_id)
+    pairs = [
+        (location_id, medication_id)
+        for medication_id in thresholds
+        if medication_id not in missing
+    ]
+    if pairs:
+        raise_alerts(db, pairs)
+        resolve_alerts(db, pairs)
+    return missing
+
+
+def check_all_stock(db: Session) -> int:
+    """
+    Bring the alerts of all inventory rows up to date in one pass.
+
+    Only needed after LOW_STOCK_THRESHOLD was changed or to backfill alerts for
+    stock that was already low when alerts were introduced.
+
+    Args:
+        db: Database session.
+
+    Returns:
+        int: The number of open alerts afterwards.
+    """
+    raise_alerts(db)
+    resolve_alerts(db)
+    db.commit()
+    return db.query(LowStockAlert).count()
+
+
+def _recipients(db: Session) -> List[str]:
+    if settings.LOW_STOCK_ALERT_EMAILS:
+        return [
+            email.strip()
+            for email in settings.LOW_STOCK_ALERT_EMAILS.split(",")
+            if email.strip()
+        ]
+    return [
+        email
+        for (email,) in db.query(UserModel.email).filter(
+            UserModel.is_superuser, UserModel.is_active
+        )
+    ]
+
+
+def send_low_stock_digests(db: Session, batch_size: int | None = None) -> int:
+    """
+    Queue one digest email per location with newly raised low-stock alerts.
+
+    A digest lists all open alerts of the location, marking the new ones, and
+    marks the new alerts as notified, so every alert is sent exactly once. While
+    no recipients are configured the alerts are left pending.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of locations (defaults to LOW_STOCK_DIGEST_BATCH_SIZE).
+
+    Returns:
+        int: The number of locations a digest was queued for.
+    """
+    recipients = _recipients(db)
+    if not recipients:
+        # Keep the alerts for a later run instead of marking them as notified
+        logger.warning("No recipients for low-stock digests configured")
+        return 0
+
+    location_ids = [
+        location_id
+        for (location_id,) in db.query(LowStockAlert.location_id)
+        .filter(LowStockAlert.notified_at.is_(None))
+        .distinct()
+        .order_by(LowStockAlert.location_id)
+        .limit(batch_size or settings.LOW_STOCK_DIGEST_BATCH_SIZE)
+    ]
+    if not location_ids:
+        return 0
+
+    pending = (
+        db.query(LowStockAlert)
+        .filter(
+            LowStockAlert.location_id.in_(location_ids),
+            LowStockAlert.notified_at.is_(None),
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    rows = (
+        db.query(
+            LowStockAlert,
+            LocationModel.name,
+            MedicationModel.name,
+            Inventory.quantity,
+            _threshold(),
+        )
+        .join(LocationModel, LocationModel.id == LowStockAlert.location_id)
+        .join(MedicationModel, MedicationModel.id == LowStockAlert.medication_id)
+        .join(
+            Inventory,
+            (Inventory.location_id == LowStockAlert.location_id)
+            & (Inventory.medication_id == LowStockAlert.medication_id),
+        )
+        .filter(
+            LowStockAlert.location_id.in_(
+                {alert.location_id for alert in pending}  # type: ignore
+            )
+        )
+        .order_by(LowStockAlert.location_id, MedicationModel.name)
+        .all()
+    )
+
+    digests: Dict[int, Tuple[str, List[Dict[str, Any]]]] = {}
+    for alert, location_name, medication_name, quantity, threshold in rows:
+        _, items = digests.setdefault(alert.location_id, (location_name, []))
+        items.append(
+            {
+                "name": medication_name,
+                "quantity": quantity or 0,
+                "threshold": threshold,
+                "new": alert.notified_at is None,
+            }
+        )
+
+    for location_name, items in digests.values():
+        for email in recipients:
+            enqueue_email(
+                db,
+                "low_stock_digest",
+                email_to=email,
+                location_name=location_name,
+                items=items,
+            )
+
+    now = datetime.utcnow()
+    for alert in pending:
+        alert.notified_at = now  # type: ignore
+    db.commit()
+
+    logger.info(f"Queued low-stock digests for {len(digests)} locations")
+    return len({alert.location_id for alert in pending})
@@ -0,0 +1,329 @@
+"""
+Medication catalog search for the MeTIMat application.
+
+Queries are matched against the generated search_text column of a medication
+(lowercased name, PZN, manufacturer and dosage). A medication matches if the
+query occurs in it or if the query's trigrams are similar enough to one of its
+words, and results are ranked by a score from exact PZN, prefix, substring and
+trigram similarity matches. Pages are fetched by keyset on (score, id), so deep
+pages cost the same as the first one.
+
+On PostgreSQL the search runs in the database against a pg_trgm GIN index. Other
+databases use an in-process index over the trigrams of every word of the
+catalog: posting lists per trigram are counted with numpy to get the similarity
+of the query to every word in one pass, and a medication's similarity is that of
+its best matching word. This equals pg_trgm's word_similarity for single-word
+queries; pg_trgm also matches a multi-word query against runs of adjacent words,
+so misspelled multi-word queries find fewer fuzzy matches here. The index is
+built on first use, invalidated by the medication endpoints of this process and
+rebuilt every MEDICATION_INDEX_REFRESH_SECONDS.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+from app.core.config import settings
+from app.models.medication import Medication as MedicationModel
+from sqlalchemy import Integer, and_, case, cast, func, or_
+from sqlalchemy.orm import Session
+
+# Score components of a match; the trigram similarity adds up to 1000
+EXACT_SCORE = 3000  # the PZN equals the query
+PREFIX_SCORE = 2000  # the name or PZN starts with the query
+SUBSTRING_SCORE = 1000  # the query occurs anywhere in the search text
+
+# Minimum word similarity of fuzzy matches, pg_trgm's default word_similarity_threshold
+FUZZY_THRESHOLD = 0.6
+
+# (score, id) of the last result already seen
+Cursor = Tuple[int, int]
+
+
+def normalize_query(q: str) -> str:
+    """
+    Lowercase a search query and collapse its whitespace.
+
+    Args:
+        q: The query as entered.
+
+    Returns:
+        str: The normalized query.
+    """
+    return " ".join(q.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Split a text into the word trigrams pg_trgm uses.
+
+    Every alphanumeric word is padded with two spaces in front and one behind.
+
+    Args:
+        text: The text.
+
+    Returns:
+        Set[str]: The trigrams.
+    """
+    result: Set[str] = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class MedicationSearchIndex:
+    """
+    Thread-safe in-process trigram index over the medication catalog.
+    """
+
+    def __init__(self) -> None:
+        self._ids = np.empty(0, dtype=np.int64)
+        self._names: List[str] = []
+        self._pzns: List[str] = []
+        self._texts: List[str] = []
+        self._categories = np.empty(0, dtype=object)
+        self._prescription_required = np.empty(0, dtype=bool)
+        self._is_active = np.empty(0, dtype=bool)
+        # trigram -> words containing it; word -> position of its medication
+        self._postings: Dict[str, np.ndarray] = {}
+        self._word_owners = np.empty(0, dtype=np.int64)
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Replace the index contents with the current catalog.
+
+        Args:
+            db: Database session.
+
+        Returns:
+            int: The number of indexed medications.
+        """
+        rows = (
+            db.query(
+                MedicationModel.id,
+                MedicationModel.name,
+                MedicationModel.pzn,
+                MedicationModel.search_text,
+                MedicationModel.category,
+                MedicationModel.prescription_required,
+                MedicationModel.is_active,
+            )
+            .order_by(MedicationModel.id)
+            .all()
+        )
+        postings: Dict[str, List[int]] = {}
+        word_owners: List[int] = []
+        for position, row in enumerate(rows):
+            for word in re.findall(r"[^\W_]+", row.search_text or ""):
+                for trigram in trigrams(word):
+                    postings.setdefault(trigram, []).append(len(word_owners))
+                word_owners.append(position)
+
+        with self._lock:
+            self._ids = np.array([row.id for row in rows], dtype=np.int64)
+            self._names = [row.name.lower() for row in rows]
+            self._pzns = [row.pzn for row in rows]
+            self._texts = [row.search_text or "" for row in rows]
+            self._categories = np.array([row.category for row in rows], dtype=object)
+            self._prescription_required = np.array(
+                [bool(row.prescription_required) for row in rows], dtype=bool
+            )
+            self._is_active = np.array(
+                [row.is_active is not False for row in rows], dtype=bool
+            )
+            self._postings = {
+                trigram: np.array(positions, dtype=np.int64)
+                for trigram, positions in postings.items()
+            }
+            self._word_owners = np.array(word_owners, dtype=np.int64)
+            self._loaded_at = time.monotonic()
+        return len(rows)
+
+    def invalidate(self) -> None:
+        """
+        Force a rebuild on next use, e.g. after a medication was written.
+        """
+        with self._lock:
+            self._loaded_at = None
+
+    def search(
+        self,
+        db: Session,
+        term: str,
+        limit: int,
+        after: Cursor | None = None,
+        category: str | None = None,
+        prescription_required: bool | None = None,
+        is_active: bool | None = None,
+    ) -> List[Tuple[int, int]]:
+        """
+        Find the best matching medications for a normalized query.
+
+        Args:
+            db: Database session, used to rebuild the index when it is outdated.
+            term: The normalized query.
+            limit: Maximum number of results.
+            after: Keyset cursor of the last result already seen.
+            category: Only include medications of this category.
+            prescription_required: Only include medications with this prescription flag.
+            is_active: Only include medications with this active flag.
+
+        Returns:
+            List[Tuple[int, int]]: (medication ID, score) pairs, best first.
+        """
+        loaded_at = self._loaded_at
+        if (
+            loaded_at is None
+            or time.monotonic() - loaded_at > settings.MEDICATION_INDEX_REFRESH_SECONDS
+        ):
+            self.rebuild(db)
+
+        query_trigrams = trigrams(term)
+        with self._lock:
+            ids, count = self._ids, len(self._ids)
+            mask = np.ones(count, dtype=bool)
+            if category is not None:
+                mask &= self._categories == category
+            if prescription_required is not None:
+                mask &= self._prescription_required == prescription_required
+            if is_active is not None:
+                mask &= self._is_active == is_active
+            postings = [
+                self._postings[t] for t in query_trigrams if t in self._postings
+            ]
+            word_owners = self._word_owners
+            candidates = np.flatnonzero(mask)
+            names = [self._names[p] for p in candidates]
+            pzns = [self._pzns[p] for p in candidates]
+            texts = [self._texts[p] for p in candidates]
+
+        # Similarity of the query to every word, then the best word per medication
+        similarity = np.zeros(count)
+        if postings:
+            shared = np.bincount(np.concatenate(postings), minlength=len(word_owners))
+            np.maximum.at(similarity, word_owners, shared / max(len(query_trigrams), 1))
+        similarity = similarity[candidates]
+        size = len(candidates)
+        exact = np.fromiter((pzn == term for pzn in pzns), bool, size)
+        prefix = np.fromiter(
+            (n.startswith(term) or p.startswith(term) for n, p in zip(names, pzns)),
+            bool,
+            size,
+        )
+        substring = np.fromiter((term in text for text in texts), bool, size)
+        scores = (
+            EXACT_SCORE * exact
+            + PREFIX_SCORE * prefix
+            + SUBSTRING_SCORE * substring
+            + np.rint(similarity * 1000).astype(np.int64)
+        )
+
+        matches = substring | (similarity >= FUZZY_THRESHOLD)
+        candidate_ids = ids[candidates]
+        if after is not None:
+            score, medication_id = after
+            matches &= (scores < score) | (
+                (scores == score) & (candidate_ids > medication_id)
+            )
+        found = np.flatnonzero(matches)
+        order = found[np.lexsort((candidate_ids[found], -scores[found]))][:limit]
+        return [(int(candidate_ids[i]), int(scores[i])) for i in order]
+
+
+medication_index = MedicationSearchIndex()
+
+
+def _search_postgres(
+    db: Session,
+    term: str,
+    limit: int,
+    after: Cursor | None,
+    category: str | None,
+    prescription_required: bool | None,
+    is_active: bool | None,
+) -> List[Tuple[MedicationModel, int]]:
+    text = MedicationModel.search_text
+    substring = text.contains(term, autoescape=True)
+    prefix = or_(
+        func.lower(MedicationModel.name).startswith(term, autoescape=True),
+        MedicationModel.pzn.startswith(term, autoescape=True),
+    )
+    score = (
+        case((MedicationModel.pzn == term, EXACT_SCORE), else_=0)
+        + case((prefix, PREFIX_SCORE), else_=0)
+        + case((substring, SUBSTRING_SCORE), else_=0)
+        + cast(func.word_similarity(term, text) * 1000, Integer)
+    )
+    # Both conditions are served by the trigram index
+    query = db.query(MedicationModel, score).filter(or_(substring, text.op("%>")(term)))
+    if category is not None:
+        query = query.filter(MedicationModel.category == category)
+    if prescription_required is not None:
+        query = query.filter(
+            MedicationModel.prescription_required == prescription_required
+        )
+    if is_active is not None:
+        query = query.filter(MedicationModel.is_active == is_active)
+    if after is not None:
+        query = query.filter(
+            or_(
+                score < after[0],
+                and_(score == after[0], MedicationModel.id > after[1]),
+            )
+        )
+    return [
+        (medication, int(rank))
+        for medication, rank in query.order_by(score.desc(), MedicationModel.id)
+        .limit(limit)
+        .all()
+    ]
+
+
+def search_medications(
+    db: Session,
+    q: str,
+    limit: int,
+    after: Cursor | None = None,
+    category: str | None = None,
+    prescription_required: bool | None = None,
+    is_active: bool | None = None,
+) -> List[Tuple[MedicationModel, int]]:
+    """
+    Search the medication catalog, best matches first.
+
+    Args:
+        db: Database session.
+        q: The query as entered.
+        limit: Maximum number of results.
+        after: Keyset cursor (score, id) of the last result already seen.
+        category: Only include medications of this category.
+        prescription_required: Only include medications with this prescription flag.
+        is_active: Only include medications with this active flag.
+
+    Returns:
+        List[Tuple[MedicationModel, int]]: The matching medications with their scores.
+    """
+    term = normalize_query(q)
+    if not term:
+        return []
+    filters = (category, prescription_required, is_active)
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, term, limit, after, *filters)
+
+    ranked = medication_index.search(db, term, limit, after, *filters)
+    medications = {
+        medication.id: medication
+        for medication in db.query(MedicationModel).filter(
+            MedicationModel.id.in_([medication_id for medication_id, _ in ranked])
+        )
+    }
+    return [
+        (medications[medication_id], score)
+        for medication_id, score in ranked
+        if medication_id in medications
+    ]
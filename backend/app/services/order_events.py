@@ -0,0 +1,256 @@
+"""
+Order status events for the MeTIMat application.
+
+Endpoints that change an order's status publish an event as part of their
+transaction. Events are delivered to the order owner's open server-sent event
+streams only once the transaction has been committed.
+
+On PostgreSQL events are sent through NOTIFY on the 'order_events' channel, which
+the database delivers on commit to every API process listening on it, so a client
+receives the event regardless of which process handled the change. Other
+databases (SQLite in development and tests) fall back to dispatching the event
+within the committing process after the commit.
+
+The same channel carries location key events, published when a machine's
+validation key is changed or revoked, so every process can drop the key from its
+pickup index. They carry a location_id instead of an order_id and user_id, and
+are therefore never sent to the order streams.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL NOTIFY channel shared by all API processes
+CHANNEL = "order_events"
+
+# Key in Session.info under which events wait for the commit
+_PENDING_KEY = "pending_order_events"
+
+
+class OrderEventBroker:
+    """
+    Fans out order events to the streams subscribed in this process.
+
+    Subscribers are asyncio queues bound to their event loop; events may be
+    dispatched from any thread. In-process caches can additionally register plain
+    callbacks with add_listener().
+    """
+
+    def __init__(self) -> None:
+        # user_id -> {(loop, queue)}
+        self._subscribers: Dict[
+            int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = {}
+        self._callbacks: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._listener: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        """
+        Register a stream for the events of a user's orders.
+
+        Must be called from within the event loop that consumes the queue.
+
+        Args:
+            user_id: ID of the user whose order events are wanted.
+
+        Returns:
+            asyncio.Queue: Queue receiving the event dictionaries.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ORDER_EVENTS_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        """
+        Remove a stream registered with subscribe().
+
+        Args:
+            user_id: ID of the user the queue was registered for.
+            queue: The queue returned by subscribe().
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({s for s in subscribers if s[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Register a callback invoked with every event, in the dispatching thread.
+
+        Registering the same callback again has no effect.
+
+        Args:
+            callback: Function receiving the event dictionary; it must not block.
+        """
+        with self._lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+
+    def dispatch(self, order_event: Dict[str, Any]) -> None:
+        """
+        Deliver an event to the registered callbacks and the local streams of the
+        order's owner.
+
+        Args:
+            order_event: The event as published by publish_status_change().
+        """
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(order_event)
+            except Exception as e:
+                logger.error(f"Order event listener failed: {e}")
+        with self._lock:
+            targets = list(self._subscribers.get(order_event.get("user_id"), ()))  # type: ignore
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, order_event)
+            except RuntimeError:
+                # The stream's event loop has already been closed
+                pass
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, order_event: Dict[str, Any]) -> None:
+        try:
+            queue.put_nowait(order_event)
+        except asyncio.QueueFull:
+            logger.warning(
+                f"Dropping event for order {order_event.get('order_id')}, stream is not keeping up"
+            )
+
+    def start(self, engine: Engine) -> None:
+        """
+        Start listening for events of other processes if the database supports it.
+
+        Args:
+            engine: The application's database engine.
+        """
+        if engine.dialect.name != "postgresql" or self._listener is not None:
+            return
+        dsn = engine.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self._stop.clear()
+        self._listener = threading.Thread(
+            target=self._listen, args=(dsn,), name="order-events", daemon=True
+        )
+        self._listener.start()
+
+    def stop(self) -> None:
+        """
+        Stop the listener thread started by start().
+        """
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout=10)
+            self._listener = None
+
+    def _listen(self, dsn: str) -> None:
+        """
+        Receive NOTIFY payloads on a dedicated connection, reconnecting on errors.
+        """
+        import psycopg2
+        import psycopg2.extensions
+
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.dispatch(json.loads(notify.payload))
+                        except ValueError:
+                            logger.warning(
+                                f"Ignoring malformed order event: {notify.payload}"
+                            )
+            except Exception as e:
+                logger.warning(f"Order event listener disconnected: {e}")
+                self._stop.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+order_events = OrderEventBroker()
+
+
+def publish_status_change(db: Session, order: OrderModel) -> None:
+    """
+    Publish an order's new status as part of the caller's transaction.
+
+    The event reaches subscribers only if the transaction is committed.
+
+    Args:
+        db: Database session of the status change.
+        order: The order with its new status set.
+    """
+    order_event = {
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "status": order.status,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+    _publish(db, order_event)
+
+
+def publish_location_key_change(db: Session, location_id: int) -> None:
+    """
+    Publish that a location's validation key changed, as part of the caller's transaction.
+
+    The new key itself is not part of the event; processes drop the old key from
+    their pickup index and learn the new one from the database on the next scan.
+
+    Args:
+        db: Database session of the change.
+        location_id: ID of the location whose key was changed or revoked.
+    """
+    _publish(
+        db, {"location_id": location_id, "timestamp": datetime.utcnow().isoformat()}
+    )
+
+
+def _publish(db: Session, payload: Dict[str, Any]) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(sql_select(func.pg_notify(CHANNEL, json.dumps(payload))))
+    else:
+        db.info.setdefault(_PENDING_KEY, []).append(payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session: Session) -> None:
+    for order_event in session.info.pop(_PENDING_KEY, []):
+        order_events.dispatch(order_event)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,145 @@
+"""
+Order dashboard counters for the MeTIMat application.
+
+Instead of aggregating the orders table on every dashboard request, order
+counts per (location, status, creation day) are kept in the order_stats table.
+Endpoints report every creation, status transition and deletion as deltas that
+are applied with a single upsert in the same transaction as the order change,
+so the counters are exactly as consistent as the orders themselves.
+"""
+
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable
+
+from app.models.order import Order as OrderModel
+from app.models.order_archive import ArchivedOrder
+from app.models.order_stats import OrderStat
+from sqlalchemy import delete, func, insert, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+# Counter key: (location_id or 0, status, creation day)
+StatKey = tuple[int, str, date]
+
+
+def stat_key(order: OrderModel, status: str | None = None) -> StatKey:
+    """
+    Build the counter key of an order.
+
+    Args:
+        order: The order.
+        status: Status to count the order under (defaults to its current status).
+
+    Returns:
+        StatKey: The counter key.
+    """
+    created_at = order.created_at or datetime.utcnow()
+    return (
+        order.location_id or 0,  # type: ignore
+        status if status is not None else order.status,  # type: ignore
+        created_at.date(),  # type: ignore
+    )
+
+
+def apply_deltas(db: Session, deltas: Counter | dict) -> None:
+    """
+    Add the given deltas to the counters with a single upsert.
+
+    Args:
+        db: Database session of the order change.
+        deltas: Mapping of counter key to the change in count.
+    """
+    rows = [
+        {"location_id": loc, "status": st, "day": day, "count": delta}
+        for (loc, st, day), delta in deltas.items()
+        if delta and st
+    ]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    stmt = (pg_insert if dialect == "postgresql" else sqlite_insert)(OrderStat).values(
+        rows
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["location_id", "status", "day"],
+            set_={"count": OrderStat.count + stmt.excluded.count},
+        )
+    )
+
+
+def record_created(db: Session, orders: Iterable[OrderModel]) -> None:
+    """
+    Count newly created orders.
+
+    Args:
+        db: Database session of the order creation.
+        orders: The created orders.
+    """
+    apply_deltas(db, Counter(stat_key(order) for order in orders))
+
+
+def record_transition(db: Session, order: OrderModel, old_status: str | None) -> None:
+    """
+    Move an order from its old status counter to the one of its current status.
+
+    Args:
+        db: Database session of the status change.
+        order: The order with its new status set.
+        old_status: The status before the change.
+    """
+    if old_status == order.status:
+        return
+    apply_deltas(db, {stat_key(order, old_status): -1, stat_key(order): 1})
+
+
+def record_deleted(db: Session, order: OrderModel) -> None:
+    """
+    Remove a deleted order from the counters.
+
+    Args:
+        db: Database session of the deletion.
+        order: The deleted order.
+    """
+    apply_deltas(db, {stat_key(order): -1})
+
+
+def rebuild_order_stats(db: Session) -> int:
+    """
+    Recompute all counters from the live and archived order tables.
+
+    On PostgreSQL the counter table is locked for the duration of the rebuild, so
+    order changes committed concurrently are neither lost nor counted twice.
+
+    Args:
+        db: Database session.
+
+    Returns:
+        int: The number of counter rows written.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE order_stats IN EXCLUSIVE MODE"))
+
+    orders = union_all(
+        *[
+            select(
+                func.coalesce(model.location_id, 0).label("location_id"),
+                model.status.label("status"),
+                func.date(model.created_at).label("day"),
+            ).where(model.status.isnot(None))
+            for model in (OrderModel, ArchivedOrder)
+        ]
+    ).subquery()
+    db.execute(delete(OrderStat))
+    result = db.execute(
+        insert(OrderStat).from_select(
+            ["location_id", "status", "day", "count"],
+            select(
+                orders.c.location_id, orders.c.status, orders.c.day, func.count()
+            ).group_by(orders.c.location_id, orders.c.status, orders.c.day),
+        )
+    )
+    db.commit()
+    return result.rowcount  # type: ignore
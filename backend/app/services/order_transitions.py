@@ -0,0 +1,144 @@
+"""
+Order status transitions for the MeTIMat application.
+
+All staff-driven status changes go through transition_orders, whether they
+concern a single order (PATCH /orders/{id}) or a whole machine restock
+(PATCH /orders/status). The status columns of all changed orders are written
+with one UPDATE, stock of cancelled orders is released with one UPDATE per
+location and medication and one ledger INSERT, the dashboard counters are adjusted with one upsert,
+and the pickup notifications are queued in the same transaction, so the cost of
+a transition hardly depends on the number of orders.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+from app.models.user import User as UserModel
+from app.services.inventory import order_quantities, release_stock
+from app.services.order_events import publish_status_change
+from app.services.order_stats import apply_deltas, stat_key
+from app.services.outbox import enqueue_email
+from app.services.pickup_index import PICKUP_STATUS
+from app.services.pickup_tokens import issue_pickup_token
+from app.services.stock_ledger import Movement, order_movements, record_movements
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+# Status every new order starts in; all later statuses are reached through transition_orders
+INITIAL_STATUS = "pending"
+
+# Statuses after which an order no longer holds stock at its location
+TERMINAL_STATUSES = ("completed", "cancelled")
+
+
+def owner_emails(db: Session, orders: List[OrderModel]) -> Dict[int, str]:
+    """
+    Load the email addresses of the owners of the given orders in one query.
+
+    Args:
+        db: Database session.
+        orders: The orders.
+
+    Returns:
+        Dict[int, str]: Mapping of user ID to email address.
+    """
+    user_ids = {order.user_id for order in orders}
+    return dict(
+        db.query(UserModel.id, UserModel.email).filter(UserModel.id.in_(user_ids)).all()
+    )
+
+
+def _release_cancelled_stock(db: Session, orders: List[OrderModel]) -> None:
+    per_location: Dict[int, Counter] = {}
+    movements: list[Movement] = []
+    for order in orders:
+        if order.stock_reserved and order.location_id is not None:  # type: ignore
+            quantities = order_quantities(
+                [
+                    (item.medication_id, item.quantity)
+                    for item in order.medication_items
+                ],
+                [p.medication_id for p in order.prescriptions],
+            )
+            per_location.setdefault(order.location_id, Counter()).update(quantities)  # type: ignore
+            movements += order_movements(order.location_id, quantities, 1, order.id)  # type: ignore
+    for location_id in sorted(per_location):
+        release_stock(db, location_id, dict(per_location[location_id]))
+    record_movements(db, "release", movements)
+
+
+def transition_orders(
+    db: Session, orders: List[OrderModel], new_status: str
+) -> List[OrderModel]:
+    """
+    Move orders to a new status as part of the caller's transaction.
+
+    Orders already in the target status are left untouched. For orders becoming
+    available for pickup the pickup deadlines are restarted, signed pickup tokens
+    are re-issued and a pickup email is queued; cancelled orders release their
+    reserved stock, and no order in a terminal status holds stock any longer. Every change is counted in the dashboard counters and
+    published to the owners' order event streams.
+
+    Args:
+        db: Database session.
+        orders: The orders, locked by the caller. Cancelling requires their
+            medication items and prescriptions, queueing pickup emails their location.
+        new_status: The target status.
+
+    Returns:
+        List[OrderModel]: The orders whose status changed.
+    """
+    changed = [order for order in orders if order.status != new_status]
+    if not changed:
+        return []
+
+    now = datetime.utcnow()
+    values: dict = {"status": new_status, "updated_at": now}
+    if new_status == PICKUP_STATUS:
+        # Starts the reminder and expiry deadlines of the pickup sweeper
+        values.update(ready_at=now, reminder_sent_at=None)
+    if new_status == "cancelled":
+        _release_cancelled_stock(db, changed)
+    if new_status in TERMINAL_STATUSES:
+        # Cancelled orders returned their units, completed ones handed them out
+        values["stock_reserved"] = False
+
+    deltas: Counter = Counter()
+    for order in changed:
+        deltas[stat_key(order)] -= 1
+        deltas[stat_key(order, new_status)] += 1
+
+    # Also updates the loaded orders in place
+    db.execute(
+        update(OrderModel)
+        .where(OrderModel.id.in_([order.id for order in changed]))
+        .values(**values)
+        .execution_options(synchronize_session="evaluate")
+    )
+    apply_deltas(db, deltas)
+
+    for order in changed:
+        publish_status_change(db, order)
+
+    if new_status == PICKUP_STATUS:
+        emails = owner_emails(db, changed)
+        for order in changed:
+            # A signed token expires together with the pickup window
+            issue_pickup_token(
+                order, timedelta(hours=settings.PICKUP_EXPIRE_AFTER_HOURS)
+            )
+            if emails.get(order.user_id):  # type: ignore
+                enqueue_email(
+                    db,
+                    "pickup_ready",
+                    email_to=emails[order.user_id],  # type: ignore
+                    order_id=order.id,
+                    pickup_location=(
+                        order.location.name if order.location else "MeTIMat Station"
+                    ),
+                    pickup_code=order.access_token,
+                )
+    return changed
@@ -0,0 +1,159 @@
+"""
+Transactional email outbox for the MeTIMat application.
+
+Request handlers never talk to the mail server directly. Instead they enqueue an
+OutboxMessage in the same database transaction as the change that triggers the
+email, so the message is persisted if and only if the change is committed. The
+background worker drains the outbox in batches, retrying failed deliveries with
+exponential backoff and dead-lettering messages that keep failing. Delivered
+messages are purged after OUTBOX_RETENTION_DAYS, so the table only grows with
+the backlog; dead-lettered messages are kept for inspection.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+from app.models.outbox import OutboxMessage
+from app.services.email import (
+    send_low_stock_digest_email,
+    send_order_confirmation_email,
+    send_pickup_confirmation_email,
+    send_pickup_expired_email,
+    send_pickup_ready_email,
+    send_pickup_reminder_email,
+    send_verification_email,
+)
+from app.services.smtp import CircuitOpenError
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Maps the outbox message kind to the function rendering and sending the email
+EMAIL_SENDERS: Dict[str, Callable[..., None]] = {
+    "verification": send_verification_email,
+    "order_confirmation": send_order_confirmation_email,
+    "pickup_ready": send_pickup_ready_email,
+    "pickup_confirmation": send_pickup_confirmation_email,
+    "pickup_reminder": send_pickup_reminder_email,
+    "pickup_expired": send_pickup_expired_email,
+    "low_stock_digest": send_low_stock_digest_email,
+}
+
+
+def enqueue_email(db: Session, kind: str, **payload: Any) -> OutboxMessage:
+    """
+    Add an email to the outbox as part of the caller's transaction.
+
+    The message is not committed here; it becomes visible to the dispatcher
+    together with the rest of the caller's changes.
+
+    Args:
+        db: Database session of the triggering change.
+        kind: Email template name, one of the keys of EMAIL_SENDERS.
+        **payload: JSON-serializable keyword arguments for the send function.
+
+    Returns:
+        OutboxMessage: The pending outbox message.
+
+    Raises:
+        ValueError: If the email kind is unknown.
+    """
+    if kind not in EMAIL_SENDERS:
+        raise ValueError(f"Unknown email kind: {kind}")
+    message = OutboxMessage(kind=kind, payload=payload, status="pending")
+    db.add(message)
+    return message
+
+
+def dispatch_pending(db: Session, batch_size: int | None = None) -> int:
+    """
+    Deliver one batch of due outbox messages.
+
+    Rows are locked with SKIP LOCKED so that several dispatchers can drain the
+    outbox concurrently without delivering a message twice. Failed messages are
+    rescheduled with exponential backoff and marked 'dead' after
+    OUTBOX_MAX_ATTEMPTS attempts. While the SMTP circuit breaker is open the batch
+    stops early without counting an attempt against the remaining messages.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of messages to process (defaults to OUTBOX_BATCH_SIZE).
+
+    Returns:
+        int: The number of messages delivered or rescheduled in this batch.
+    """
+    now = datetime.utcnow()
+    messages = (
+        db.query(OutboxMessage)
+        .filter(
+            OutboxMessage.status == "pending",
+            OutboxMessage.next_attempt_at <= now,
+        )
+        .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+        .limit(batch_size or settings.OUTBOX_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    processed = 0
+    for message in messages:
+        try:
+            EMAIL_SENDERS[message.kind](**message.payload)  # type: ignore
+            message.status = "sent"  # type: ignore
+            message.sent_at = datetime.utcnow()  # type: ignore
+        except CircuitOpenError:
+            # The relay is down; leave the rest untouched instead of burning attempts
+            logger.warning("SMTP circuit open, pausing outbox delivery")
+            break
+        except Exception as e:
+            message.attempts += 1  # type: ignore
+            message.last_error = str(e)[:1000]  # type: ignore
+            if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:  # type: ignore
+                message.status = "dead"  # type: ignore
+                logger.error(
+                    f"Outbox message {message.id} ({message.kind}) dead-lettered "
+                    f"after {message.attempts} attempts: {e}"
+                )
+            else:
+                delay = settings.OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (
+                    message.attempts - 1  # type: ignore
+                )
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)  # type: ignore
+                logger.warning(
+                    f"Outbox message {message.id} ({message.kind}) failed, "
+                    f"retrying in {delay}s: {e}"
+                )
+        processed += 1
+
+    db.commit()
+    return processed
+
+
+def purge_sent_messages(db: Session, batch_size: int | None = None) -> int:
+    """
+    Delete one batch of messages delivered more than OUTBOX_RETENTION_DAYS ago.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of messages to delete (defaults to OUTBOX_PURGE_BATCH_SIZE).
+
+    Returns:
+        int: The number of deleted messages.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    expired_ids = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == "sent", OutboxMessage.sent_at <= cutoff)
+        .limit(batch_size or settings.OUTBOX_PURGE_BATCH_SIZE)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        delete(OutboxMessage)
+        .where(OutboxMessage.id.in_(expired_ids))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount  # type: ignore
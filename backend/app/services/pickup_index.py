@@ -0,0 +1,248 @@
+"""
+In-process lookup index for orders that are ready for pickup.
+
+Vending machines validate every scanned QR code against the API, so this lookup
+is on the critical path of every pickup. The index keeps all orders with status
+'available for pickup' in memory, keyed by location and access token, together
+with a serialized snapshot of the order and the machines' validation keys. A
+scan that hits the index is answered without touching the database.
+
+The index is rebuilt at startup and kept current by the endpoints that change an
+order's status or a location's validation key, and by the order status and
+location key events of other processes (e.g. orders expired by the background
+worker, keys rotated through another API process). Keys changed directly in the
+database bypass these events and are only picked up on the next restart. The
+index is an accelerator only: a miss always falls back to the database, and the
+completion endpoint remains the authoritative guard against dispensing an order
+twice.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict
+
+from app.models.location import Location as LocationModel
+from app.models.order import Order as OrderModel
+from app.models.order import OrderMedication
+from app.schemas.order import Order
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+PICKUP_STATUS = "available for pickup"
+
+
+@dataclass
+class PickupEntry:
+    """
+    A pickup-ready order in the index.
+
+    Attributes:
+        order_id: ID of the order.
+        location_id: ID of the location the order is waiting at.
+        order: Serialized order returned to the machine on a successful scan.
+    """
+
+    order_id: int
+    location_id: int | None
+    order: Order
+
+
+class PickupIndex:
+    """
+    Thread-safe index of pickup-ready orders, scoped per location.
+    """
+
+    def __init__(self) -> None:
+        # location_id -> access_token -> entry
+        self._orders: Dict[int | None, Dict[str, PickupEntry]] = {}
+        # access_token -> location_id, to remove entries by token alone
+        self._token_locations: Dict[str, int | None] = {}
+        # order_id -> access_token, to remove entries by order ID alone
+        self._order_tokens: Dict[int, str] = {}
+        # validation_key -> location_id
+        self._location_keys: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Replace the index contents with the current state of the database.
+
+        Args:
+            db: Database session.
+
+        Returns:
+            int: The number of indexed orders.
+        """
+        orders = (
+            db.query(OrderModel)
+            .options(
+                joinedload(OrderModel.location),
+                selectinload(OrderModel.prescriptions),
+                selectinload(OrderModel.medication_items).joinedload(
+                    OrderMedication.medication
+                ),
+            )
+            .filter(OrderModel.status == PICKUP_STATUS)
+            .all()
+        )
+        locations = (
+            db.query(LocationModel.id, LocationModel.validation_key)
+            .filter(LocationModel.validation_key.isnot(None))
+            .all()
+        )
+
+        entries = [self._entry(order) for order in orders]
+        with self._lock:
+            self._orders = {}
+            self._token_locations = {}
+            self._order_tokens = {}
+            for token, entry in entries:
+                self._add(token, entry)
+            self._location_keys = {key: loc_id for loc_id, key in locations}
+        return len(entries)
+
+    @staticmethod
+    def _entry(order: OrderModel) -> tuple[str, PickupEntry]:
+        return order.access_token, PickupEntry(  # type: ignore
+            order_id=order.id,  # type: ignore
+            location_id=order.location_id,  # type: ignore
+            order=Order.model_validate(order),
+        )
+
+    def update_order(self, order: OrderModel) -> None:
+        """
+        Add, refresh or remove an order according to its current status.
+
+        Must be called after every committed status change of an order. The key of
+        the order's location is indexed along with it.
+
+        Args:
+            order: The order with its relationships accessible.
+        """
+        if order.status != PICKUP_STATUS or not order.access_token:  # type: ignore
+            self.discard(order.access_token)  # type: ignore
+            return
+        token, entry = self._entry(order)
+        with self._lock:
+            self._remove(token)
+            self._add(token, entry)
+            if entry.order.location and entry.order.location.validation_key:
+                self._location_keys[entry.order.location.validation_key] = (
+                    entry.order.location.id
+                )
+
+    def discard(self, token: str | None) -> None:
+        """
+        Remove an order from the index by its access token, if present.
+
+        Args:
+            token: The order's access token.
+        """
+        if token:
+            with self._lock:
+                self._remove(token)
+
+    def discard_order(self, order_id: int) -> None:
+        """
+        Remove an order from the index by its ID, if present.
+
+        Args:
+            order_id: ID of the order.
+        """
+        with self._lock:
+            token = self._order_tokens.get(order_id)
+            if token:
+                self._remove(token)
+
+    def handle_event(self, order_event: dict) -> None:
+        """
+        Drop orders that left the pickup status and keys that were changed, as
+        reported by an order status or location key event.
+
+        Orders that became ready and keys that were set in another process are not
+        added here; they are indexed on their first scan, which falls back to the
+        database.
+
+        Args:
+            order_event: The order status or location key event.
+        """
+        if "order_id" not in order_event:
+            self.update_location(order_event["location_id"], None)
+        elif order_event.get("status") != PICKUP_STATUS:
+            self.discard_order(order_event["order_id"])
+
+    def _add(self, token: str, entry: PickupEntry) -> None:
+        self._orders.setdefault(entry.location_id, {})[token] = entry
+        self._token_locations[token] = entry.location_id
+        self._order_tokens[entry.order_id] = token
+
+    def _remove(self, token: str) -> None:
+        if token in self._token_locations:
+            location_id = self._token_locations.pop(token)
+            entry = self._orders.get(location_id, {}).pop(token, None)
+            if entry is not None:
+                self._order_tokens.pop(entry.order_id, None)
+
+    def update_location(self, location_id: int, validation_key: str | None) -> None:
+        """
+        Track a location's current validation key (None removes the location).
+
+        Args:
+            location_id: ID of the location.
+            validation_key: The machine's current key.
+        """
+        with self._lock:
+            self._location_keys = {
+                key: loc_id
+                for key, loc_id in self._location_keys.items()
+                if loc_id != location_id
+            }
+            if validation_key:
+                self._location_keys[validation_key] = location_id
+
+    def location_for_key(self, machine_key: str | None) -> int | None:
+        """
+        Find the location of the machine with the given key.
+
+        Args:
+            machine_key: The validation key sent by the machine.
+
+        Returns:
+            int | None: The location ID, or None if the key is not indexed.
+        """
+        with self._lock:
+            return self._location_keys.get(machine_key or "")
+
+    def get_order(self, order_id: int) -> PickupEntry | None:
+        """
+        Find an indexed order by its ID.
+
+        Args:
+            order_id: ID of the order.
+
+        Returns:
+            PickupEntry | None: The indexed order, if present.
+        """
+        with self._lock:
+            token = self._order_tokens.get(order_id)
+            location_id = self._token_locations.get(token) if token else None
+            return self._orders.get(location_id, {}).get(token) if token else None
+
+    def lookup(self, machine_key: str | None, token: str) -> PickupEntry | None:
+        """
+        Find a pickup-ready order for a scan at the machine with the given key.
+
+        Args:
+            machine_key: The validation key sent by the machine.
+            token: The scanned access token.
+
+        Returns:
+            PickupEntry | None: The indexed order if it is waiting at that machine.
+        """
+        with self._lock:
+            location_id = self._location_keys.get(machine_key or "")
+            if location_id is None:
+                return None
+            return self._orders.get(location_id, {}).get(token)
+
+
+pickup_index = PickupIndex()
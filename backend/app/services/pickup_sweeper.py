@@ -0,0 +1,128 @@
+"""
+Pickup sweeper for the MeTIMat application.
+
+Orders that are available for pickup but not collected get a reminder email
+after PICKUP_REMINDER_AFTER_HOURS and are cancelled after
+PICKUP_EXPIRE_AFTER_HOURS, which returns their stock and frees the compartment.
+Both jobs scan the (status, ready_at) index in bounded chunks, oldest first, and
+commit after every chunk, so no run holds a long transaction or locks many
+rows. Rows locked by a concurrent request are skipped and retried on the next
+run.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+from app.services.order_transitions import owner_emails, transition_orders
+from app.services.outbox import enqueue_email
+from app.services.pickup_index import PICKUP_STATUS, pickup_index
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+logger = logging.getLogger(__name__)
+
+
+def send_pickup_reminders(db: Session, batch_size: int | None = None) -> int:
+    """
+    Queue reminder emails for one chunk of orders waiting too long for pickup.
+
+    Args:
+        db: Database session used for the chunk.
+        batch_size: Maximum number of orders to process (defaults to PICKUP_SWEEP_BATCH_SIZE).
+
+    Returns:
+        int: The number of reminded orders.
+    """
+    now = datetime.utcnow()
+    orders = (
+        db.query(OrderModel)
+        .options(joinedload(OrderModel.location))
+        .filter(
+            OrderModel.status == PICKUP_STATUS,
+            OrderModel.ready_at
+            <= now - timedelta(hours=settings.PICKUP_REMINDER_AFTER_HOURS),
+            OrderModel.reminder_sent_at.is_(None),
+        )
+        .order_by(OrderModel.ready_at, OrderModel.id)
+        .limit(batch_size or settings.PICKUP_SWEEP_BATCH_SIZE)
+        .with_for_update(skip_locked=True, of=OrderModel)
+        .all()
+    )
+    if not orders:
+        return 0
+
+    emails = owner_emails(db, orders)
+    for order in orders:
+        order.reminder_sent_at = now  # type: ignore
+        if emails.get(order.user_id):  # type: ignore
+            expires_at = order.ready_at + timedelta(  # type: ignore
+                hours=settings.PICKUP_EXPIRE_AFTER_HOURS
+            )
+            enqueue_email(
+                db,
+                "pickup_reminder",
+                email_to=emails[order.user_id],  # type: ignore
+                order_id=order.id,
+                pickup_location=(
+                    order.location.name if order.location else "MeTIMat Station"
+                ),
+                pickup_code=order.access_token,
+                expires_at=expires_at.strftime("%d.%m.%Y %H:%M"),
+            )
+    db.commit()
+
+    logger.info(f"Queued pickup reminders for {len(orders)} orders")
+    return len(orders)
+
+
+def expire_pickups(db: Session, batch_size: int | None = None) -> int:
+    """
+    Cancel one chunk of orders whose pickup deadline has passed.
+
+    Their reserved stock is released, the owners are notified and the orders are
+    removed from the pickup index.
+
+    Args:
+        db: Database session used for the chunk.
+        batch_size: Maximum number of orders to process (defaults to PICKUP_SWEEP_BATCH_SIZE).
+
+    Returns:
+        int: The number of expired orders.
+    """
+    now = datetime.utcnow()
+    orders = (
+        db.query(OrderModel)
+        .options(
+            selectinload(OrderModel.medication_items),
+            selectinload(OrderModel.prescriptions),
+        )
+        .filter(
+            OrderModel.status == PICKUP_STATUS,
+            OrderModel.ready_at
+            <= now - timedelta(hours=settings.PICKUP_EXPIRE_AFTER_HOURS),
+        )
+        .order_by(OrderModel.ready_at, OrderModel.id)
+        .limit(batch_size or settings.PICKUP_SWEEP_BATCH_SIZE)
+        .with_for_update(skip_locked=True, of=OrderModel)
+        .all()
+    )
+    if not orders:
+        return 0
+
+    emails = owner_emails(db, orders)
+    transition_orders(db, orders, "cancelled")
+    for order in orders:
+        if emails.get(order.user_id):  # type: ignore
+            enqueue_email(
+                db,
+                "pickup_expired",
+                email_to=emails[order.user_id],  # type: ignore
+                order_id=order.id,
+            )
+    db.commit()
+
+    for order in orders:
+        pickup_index.discard_order(order.id)  # type: ignore
+    logger.info(f"Expired {len(orders)} orders that were not picked up")
+    return len(orders)
@@ -0,0 +1,188 @@
+"""
+Signed pickup tokens for the MeTIMat application.
+
+By default an order's QR code carries a random access token that can only be
+checked by looking it up in the database. With PICKUP_TOKEN_SIGNING enabled,
+orders get a self-verifying token instead:
+
+    mt1.<key_id>.<order_id>.<location_id>.<expires>.<signature>
+
+The signature is an HMAC-SHA256 over everything before it, so the API (or a
+machine holding the keys) can reject forged, expired and wrong-location codes
+with a CPU-only check before any database access. Tokens name the key they were
+signed with, so keys can be rotated by adding a new key, switching
+PICKUP_TOKEN_KEY_ID to it and removing the old key once its tokens have expired.
+
+A valid signature only proves the token was issued by us; whether the order is
+still waiting for pickup is decided by the database as before.
+"""
+
+import base64
+import hashlib
+import hmac
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict
+
+from app.core.config import settings
+from app.models.order import Order as OrderModel
+
+TOKEN_PREFIX = "mt1"
+
+# Shape of the random tokens issued by secrets.token_urlsafe(32)
+_RANDOM_TOKEN = re.compile(r"[A-Za-z0-9_-]{43}")
+_KEY_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class InvalidPickupToken(Exception):
+    """
+    Raised when a scanned code is not a valid pickup token.
+
+    Attributes:
+        reason: Short description of why the token was rejected.
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class PickupClaims:
+    """
+    The verified contents of a signed pickup token.
+
+    Attributes:
+        order_id: ID of the order.
+        location_id: ID of the location the order is to be picked up at (0 if none).
+        expires: Unix timestamp after which the token is no longer accepted.
+        key_id: ID of the key the token was signed with.
+    """
+
+    order_id: int
+    location_id: int
+    expires: int
+    key_id: str
+
+
+@lru_cache(maxsize=4)
+def _parse_keys(keys: str | None, secret_key: str) -> Dict[str, bytes]:
+    if not keys:
+        derived = hmac.new(secret_key.encode(), b"pickup-token", hashlib.sha256)
+        return {"k0": derived.digest()}
+    parsed: Dict[str, bytes] = {}
+    for pair in keys.split(","):
+        key_id, _, secret = pair.strip().partition(":")
+        if not _KEY_ID.fullmatch(key_id) or not secret:
+            raise ValueError(f"Invalid PICKUP_TOKEN_KEYS entry: {key_id!r}")
+        parsed[key_id] = secret.encode()
+    return parsed
+
+
+def signing_keys() -> Dict[str, bytes]:
+    """
+    Get the keys accepted for signed pickup tokens.
+
+    Returns:
+        Dict[str, bytes]: Mapping of key ID to secret, in configuration order.
+    """
+    return _parse_keys(settings.PICKUP_TOKEN_KEYS, settings.SECRET_KEY)
+
+
+def _signature(key: bytes, message: str) -> str:
+    digest = hmac.new(key, message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_token(order_id: int, location_id: int | None, expires_at: datetime) -> str:
+    """
+    Create a signed pickup token with the active key.
+
+    Args:
+        order_id: ID of the order.
+        location_id: ID of the pickup location, if any.
+        expires_at: UTC time after which the token is no longer accepted.
+
+    Returns:
+        str: The signed token.
+    """
+    keys = signing_keys()
+    key_id = settings.PICKUP_TOKEN_KEY_ID or next(iter(keys))
+    expires = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+    message = f"{TOKEN_PREFIX}.{key_id}.{order_id}.{location_id or 0}.{expires}"
+    return f"{message}.{_signature(keys[key_id], message)}"
+
+
+def verify_token(token: str, now: float | None = None) -> PickupClaims:
+    """
+    Check a signed pickup token's signature and expiry without database access.
+
+    Args:
+        token: The scanned token.
+        now: Current Unix time (defaults to the system clock).
+
+    Returns:
+        PickupClaims: The verified contents of the token.
+
+    Raises:
+        InvalidPickupToken: If the token is malformed, forged or expired.
+    """
+    parts = token.split(".")
+    if len(parts) != 6 or parts[0] != TOKEN_PREFIX:
+        raise InvalidPickupToken("malformed")
+    key = signing_keys().get(parts[1])
+    if key is None:
+        raise InvalidPickupToken("unknown key")
+    message, signature = token.rsplit(".", 1)
+    if not hmac.compare_digest(_signature(key, message), signature):
+        raise InvalidPickupToken("bad signature")
+    try:
+        order_id, location_id, expires = (int(p) for p in parts[2:5])
+    except ValueError:
+        raise InvalidPickupToken("malformed")
+    if expires < (now if now is not None else time.time()):
+        raise InvalidPickupToken("expired")
+    return PickupClaims(order_id, location_id, expires, parts[1])
+
+
+def check_token(token: str) -> PickupClaims | None:
+    """
+    Pre-check a scanned code before it is looked up in the database.
+
+    Random tokens are accepted by shape only, so orders created before signing
+    was enabled can still be picked up.
+
+    Args:
+        token: The scanned code.
+
+    Returns:
+        PickupClaims | None: The verified claims of a signed token, or None for a
+            well-formed random token.
+
+    Raises:
+        InvalidPickupToken: If the code cannot be a valid pickup token.
+    """
+    if token.startswith(TOKEN_PREFIX + "."):
+        return verify_token(token)
+    if _RANDOM_TOKEN.fullmatch(token):
+        return None
+    raise InvalidPickupToken("malformed")
+
+
+def issue_pickup_token(order: OrderModel, valid_for: timedelta) -> None:
+    """
+    Replace an order's access token with a signed one, if signing is enabled.
+
+    The order must have been flushed so its ID is known.
+
+    Args:
+        order: The order.
+        valid_for: How long the new token is accepted.
+    """
+    if settings.PICKUP_TOKEN_SIGNING:
+        order.access_token = sign_token(  # type: ignore
+            order.id, order.location_id, datetime.utcnow() + valid_for  # type: ignore
+        )
@@ -0,0 +1,126 @@
+"""
+QR code rendering service for the MeTIMat application.
+
+Pickup QR codes only depend on the order's access token, so each image is
+rasterized once and then served from an in-process LRU cache, optionally backed
+by a disk cache shared between processes. Cache entries are keyed by a hash of
+the token so the token itself never appears in file names.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import qrcode
+import qrcode.image.svg
+from app.core.config import settings
+
+# Supported output formats and their media types
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def qr_cache_key(token: str) -> str:
+    """
+    Derive the cache key (and ETag) for a token.
+
+    Args:
+        token: The pickup access token encoded in the QR code.
+
+    Returns:
+        str: Hex digest identifying the token's QR images.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _rasterize(token: str, fmt: str) -> bytes:
+    """
+    Render the QR code image for a token without any caching.
+    """
+    qr = qrcode.QRCode(version=1, box_size=10, border=4)
+    qr.add_data(token)
+    qr.make(fit=True)
+
+    buffered = io.BytesIO()
+    if fmt == "svg":
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffered)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(
+            buffered, format="PNG"
+        )
+    return buffered.getvalue()
+
+
+def render_qr(token: str, fmt: str = "png") -> bytes:
+    """
+    Return the QR code image for a token, rendering it only on a cache miss.
+
+    Lookups go through the in-memory LRU cache first, then through the disk cache
+    in QR_CACHE_DIR if configured.
+
+    Args:
+        token: The pickup access token to encode.
+        fmt: Output format, 'png' or 'svg'.
+
+    Returns:
+        bytes: The encoded image.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported QR format: {fmt}")
+
+    key = (qr_cache_key(token), fmt)
+    with _cache_lock:
+        image = _cache.get(key)
+        if image is not None:
+            _cache.move_to_end(key)
+            return image
+
+    path = None
+    image = None
+    if settings.QR_CACHE_DIR:
+        path = os.path.join(settings.QR_CACHE_DIR, f"{key[0]}.{fmt}")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                image = f.read()
+
+    if image is None:
+        image = _rasterize(token, fmt)
+        if path is not None:
+            os.makedirs(settings.QR_CACHE_DIR, exist_ok=True)  # type: ignore
+            # Write atomically so concurrent readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+
+    with _cache_lock:
+        _cache[key] = image
+        _cache.move_to_end(key)
+        while len(_cache) > settings.QR_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return image
+
+
+def qr_data_uri(token: str) -> str:
+    """
+    Return the PNG QR code for a token as a base64 data URI for HTML emails.
+
+    Args:
+        token: The pickup access token to encode.
+
+    Returns:
+        str: A 'data:image/png;base64,...' URI.
+    """
+    return f"data:image/png;base64,{base64.b64encode(render_qr(token)).decode()}"
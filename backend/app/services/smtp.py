@@ -0,0 +1,291 @@
+"""
+SMTP connection pooling for the MeTIMat application.
+
+Opening an SMTP connection costs a TCP handshake, STARTTLS and LOGIN, which
+dominates the time needed to deliver a single message. This module keeps
+authenticated connections alive and reuses them for subsequent messages, enforces
+connect and send timeouts, and guards the relay with a circuit breaker that
+fast-fails while the mail server is unreachable.
+"""
+
+import atexit
+import logging
+import smtplib
+import threading
+import time
+from email.message import Message
+from typing import Callable, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors caused by the message itself; the connection remains usable afterwards
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of contacting the mail server while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Minimal thread-safe circuit breaker.
+
+    After 'failure_threshold' consecutive failures the circuit opens and every call
+    fails immediately for 'reset_timeout' seconds. Afterwards a single trial call is
+    let through (half-open); its outcome closes or re-opens the circuit.
+
+    Attributes:
+        failure_threshold: Consecutive failures that open the circuit.
+        reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may proceed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if (
+                self._trial_running
+                or time.monotonic() - self._opened_at < self.reset_timeout
+            ):
+                raise CircuitOpenError("SMTP relay circuit is open")
+            # Half-open: let exactly one trial call through
+            self._trial_running = True
+
+    def record_success(self) -> None:
+        """
+        Close the circuit after a successful call.
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """
+        Count a failed call and open the circuit once the threshold is reached.
+        """
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(
+                        f"SMTP circuit opened after {self._failures} consecutive failures"
+                    )
+                self._opened_at = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP connections.
+
+    Idle connections are reused in LIFO order so a burst of messages is sent over
+    as few connections as possible. Connections that were idle for longer than
+    'max_idle' seconds or that have sent 'max_messages' messages are recycled.
+
+    Attributes:
+        size: Maximum number of simultaneously open connections.
+        breaker: Circuit breaker protecting the relay.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        use_tls: bool = True,
+        user: str | None = None,
+        password: str | None = None,
+        size: int = 4,
+        connect_timeout: float = 10.0,
+        send_timeout: float = 30.0,
+        max_idle: float = 60.0,
+        max_messages: int = 100,
+        breaker: CircuitBreaker | None = None,
+        factory: Callable[..., smtplib.SMTP] = smtplib.SMTP,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.user = user
+        self.password = password
+        self.size = size
+        self.connect_timeout = connect_timeout
+        self.send_timeout = send_timeout
+        self.max_idle = max_idle
+        self.max_messages = max_messages
+        self.breaker = breaker or CircuitBreaker(5, 60.0)
+        self._factory = factory
+        # Idle connections as (connection, last used, messages sent)
+        self._idle: List[Tuple[smtplib.SMTP, float, int]] = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Open, secure and authenticate a new connection.
+        """
+        server = self._factory(timeout=self.connect_timeout)
+        try:
+            server.connect(self.host, self.port)
+            if server.sock is not None:
+                # The connect timeout only covers the handshake, use the send timeout from here on
+                server.sock.settimeout(self.send_timeout)
+            if self.use_tls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except Exception:
+            # Do not leak the socket of a half-opened connection while the relay fails
+            server.close()
+            raise
+        return server
+
+    def _acquire(self) -> Tuple[smtplib.SMTP, int, bool]:
+        """
+        Take an idle connection or open a new one.
+
+        Returns:
+            tuple: The connection, its message count and whether it was reused.
+        """
+        with self._lock:
+            while self._idle:
+                server, last_used, sent = self._idle.pop()
+                if time.monotonic() - last_used <= self.max_idle:
+                    return server, sent, True
+                self._close(server)
+        return self._connect(), 0, False
+
+    def _release(self, server: smtplib.SMTP, sent: int) -> None:
+        """
+        Return a healthy connection to the pool or close it when it is worn out.
+        """
+        if sent >= self.max_messages:
+            self._close(server)
+            return
+        with self._lock:
+            self._idle.append((server, time.monotonic(), sent))
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def send(self, message: Message) -> None:
+        """
+        Send a message over a pooled connection.
+
+        A reused connection that turns out to be closed by the server is replaced
+        once transparently. Connection-level failures count against the circuit
+        breaker, errors caused by the message itself do not.
+
+        Args:
+            message: The fully built email message.
+
+        Raises:
+            CircuitOpenError: If the relay is considered down.
+            TimeoutError: If no connection slot becomes free in time.
+            OSError: If the message could not be delivered.
+        """
+        if not self._slots.acquire(timeout=self.send_timeout):
+            raise TimeoutError("No SMTP connection available")
+        try:
+            self.breaker.before_call()
+            server = None
+            try:
+                server, sent, reused = self._acquire()
+                try:
+                    server.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    if not reused:
+                        raise
+                    # The server dropped the idle connection, retry on a fresh one
+                    self._close(server)
+                    server, sent = None, 0
+                    server = self._connect()
+                    server.send_message(message)
+            except MESSAGE_ERRORS:
+                self.breaker.record_success()
+                self._release(server, sent + 1)  # type: ignore
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                if server is not None:
+                    self._close(server)
+                raise
+            self.breaker.record_success()
+            self._release(server, sent + 1)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _, _ in idle:
+            self._close(server)
+
+
+_pool: SMTPConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """
+    Return the process-wide SMTP connection pool, creating it on first use.
+
+    Returns:
+        SMTPConnectionPool: The pool configured from the SMTP settings.
+
+    Raises:
+        ValueError: If the SMTP host or port is not configured.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if not settings.SMTP_HOST or settings.SMTP_PORT is None:
+                raise ValueError("SMTP_HOST and SMTP_PORT must be set!")
+            _pool = SMTPConnectionPool(
+                settings.SMTP_HOST,
+                settings.SMTP_PORT,
+                use_tls=settings.SMTP_TLS,
+                user=settings.SMTP_USER,
+                password=settings.SMTP_PASSWORD,
+                size=settings.SMTP_POOL_SIZE,
+                connect_timeout=settings.SMTP_CONNECT_TIMEOUT,
+                send_timeout=settings.SMTP_SEND_TIMEOUT,
+                max_idle=settings.SMTP_POOL_MAX_IDLE_SECONDS,
+                max_messages=settings.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                breaker=CircuitBreaker(
+                    settings.SMTP_CIRCUIT_FAILURE_THRESHOLD,
+                    settings.SMTP_CIRCUIT_RESET_SECONDS,
+                ),
+            )
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,267 @@
+"""
+Stock ledger for the MeTIMat application.
+
+Next to the inventory rows that reservations update atomically, every change of
+a location's available stock is appended to the stock_movements ledger:
+'restock' and 'correction' movements from machine stock reports, 'reserve'
+movements when an order takes stock and 'release' movements when a cancelled or
+deleted order gives it back. Dispensing an order does not change the available
+stock (its units were taken when it was reserved), so it is not a movement.
+
+Recording is a plain INSERT in the caller's transaction, so concurrent writers
+never wait for each other. The snapshot job condenses the ledger into
+per-location snapshots, making the current level the latest snapshot plus a
+short tail of movements, and history queries range scans over the ledger.
+
+Since every stock change passes through here, recording movements also checks
+the changed rows against their low-stock thresholds (see low_stock).
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from app.core.config import settings
+from app.models.inventory import Inventory
+from app.models.stock_ledger import StockMovement, StockSnapshot
+from app.services.low_stock import check_low_stock
+from sqlalchemy import and_, func, insert, select, tuple_
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MOVEMENT_KINDS = ("restock", "correction", "reserve", "release")
+
+# (location_id, medication_id, delta, order_id)
+Movement = Tuple[int, int, int, int | None]
+
+
+def order_movements(
+    location_id: int, quantities: Dict[int, int], sign: int, order_id: int | None
+) -> list[Movement]:
+    """
+    Build the movements of an order's units taken from or returned to a location.
+
+    Args:
+        location_id: ID of the location.
+        quantities: Mapping of medication ID to number of units.
+        sign: -1 for units taken, 1 for units returned.
+        order_id: ID of the order.
+
+    Returns:
+        list[Movement]: The movements.
+    """
+    return [
+        (location_id, medication_id, sign * quantity, order_id)
+        for medication_id, quantity in quantities.items()
+    ]
+
+
+def record_movements(db: Session, kind: str, movements: Iterable[Movement]) -> None:
+    """
+    Append movements to the ledger as part of the caller's transaction.
+
+    The caller must have written the changed inventory rows first: their row
+    locks keep the snapshot job away until the movements are committed, and
+    their new quantities are checked against the low-stock thresholds here.
+
+    Args:
+        db: Database session of the stock change.
+        kind: Type of the movements, one of MOVEMENT_KINDS.
+        movements: The movements; those without a change are skipped.
+
+    Raises:
+        ValueError: If the movement kind is unknown.
+    """
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Unknown stock movement kind: {kind}")
+    now = datetime.utcnow()
+    rows = [
+        {
+            "location_id": location_id,
+            "medication_id": medication_id,
+            "kind": kind,
+            "delta": delta,
+            "order_id": order_id,
+            "created_at": now,
+        }
+        for location_id, medication_id, delta, order_id in movements
+        if delta
+    ]
+    if rows:
+        db.execute(insert(StockMovement), rows)
+        check_low_stock(
+            db, [(r["location_id"], r["medication_id"], r["delta"]) for r in rows]
+        )
+
+
+def _latest_snapshots():
+    return (
+        select(
+            StockSnapshot.location_id,
+            StockSnapshot.medication_id,
+            func.max(StockSnapshot.movement_id).label("movement_id"),
+        )
+        .group_by(StockSnapshot.location_id, StockSnapshot.medication_id)
+        .subquery()
+    )
+
+
+def take_snapshots(db: Session, batch_size: int | None = None) -> int:
+    """
+    Condense the ledger tails of one batch of (location, medication) pairs into snapshots.
+
+    Movement IDs are assigned at insert, not at commit, so a transaction that is
+    still running may hold a lower ID than movements that are already visible.
+    Every writer updates the pair's inventory row before recording its movements
+    and holds that row lock until it commits. The snapshot therefore locks the
+    inventory rows first, skipping rows locked by running transactions, and only
+    then reads the tails of the locked pairs: all movements of a locked pair are
+    committed, and later ones get higher IDs. Skipped pairs are retried on the
+    next run; pairs whose inventory row was deleted are not snapshotted.
+
+    Args:
+        db: Database session used for the batch.
+        batch_size: Maximum number of snapshots to take (defaults to STOCK_SNAPSHOT_BATCH_SIZE).
+
+    Returns:
+        int: The number of snapshots taken.
+    """
+    latest = _latest_snapshots()
+
+    def tails():
+        return (
+            db.query(
+                StockMovement.location_id,
+                StockMovement.medication_id,
+                func.coalesce(latest.c.movement_id, 0),
+                func.max(StockMovement.id),
+                func.sum(StockMovement.delta),
+            )
+            .outerjoin(
+                latest,
+                and_(
+                    latest.c.location_id == StockMovement.location_id,
+                    latest.c.medication_id == StockMovement.medication_id,
+                ),
+            )
+            .filter(StockMovement.id > func.coalesce(latest.c.movement_id, 0))
+            .group_by(
+                StockMovement.location_id,
+                StockMovement.medication_id,
+                latest.c.movement_id,
+            )
+        )
+
+    candidates = [
+        (loc_id, med_id)
+        for loc_id, med_id, _, _, _ in tails()
+        .join(
+            Inventory,
+            and_(
+                Inventory.location_id == StockMovement.location_id,
+                Inventory.medication_id == StockMovement.medication_id,
+            ),
+        )
+        .order_by(StockMovement.location_id, StockMovement.medication_id)
+        .limit(batch_size or settings.STOCK_SNAPSHOT_BATCH_SIZE)
+    ]
+    if not candidates:
+        return 0
+    locked = [
+        (loc_id, med_id)
+        for loc_id, med_id in db.query(Inventory.location_id, Inventory.medication_id)
+        .filter(tuple_(Inventory.location_id, Inventory.medication_id).in_(candidates))
+        .order_by(Inventory.location_id, Inventory.medication_id)
+        .with_for_update(skip_locked=True)
+    ]
+    batch = (
+        tails()
+        .filter(
+            tuple_(StockMovement.location_id, StockMovement.medication_id).in_(locked)
+        )
+        .all()
+        if locked
+        else []
+    )
+    if not batch:
+        db.rollback()
+        return 0
+
+    previous = {
+        (loc_id, med_id): quantity
+        for loc_id, med_id, quantity in db.query(
+            StockSnapshot.location_id,
+            StockSnapshot.medication_id,
+            StockSnapshot.quantity,
+        ).filter(
+            tuple_(
+                StockSnapshot.location_id,
+                StockSnapshot.medication_id,
+                StockSnapshot.movement_id,
+            ).in_([(loc_id, med_id, last) for loc_id, med_id, last, _, _ in batch])
+        )
+    }
+    now = datetime.utcnow()
+    db.execute(
+        insert(StockSnapshot),
+        [
+            {
+                "location_id": loc_id,
+                "medication_id": med_id,
+                "movement_id": movement_id,
+                "quantity": previous.get((loc_id, med_id), 0) + delta,
+                "created_at": now,
+            }
+            for loc_id, med_id, _, movement_id, delta in batch
+        ],
+    )
+    db.commit()
+
+    logger.info(f"Took {len(batch)} stock snapshots")
+    return len(batch)
+
+
+def stock_levels(db: Session, location_id: int) -> Dict[int, int]:
+    """
+    Compute a location's available stock from the ledger.
+
+    Args:
+        db: Database session.
+        location_id: ID of the location.
+
+    Returns:
+        Dict[int, int]: Mapping of medication ID to available units.
+    """
+    latest = _latest_snapshots()
+    levels: Dict[int, int] = dict(
+        db.query(StockSnapshot.medication_id, StockSnapshot.quantity)
+        .join(
+            latest,
+            and_(
+                latest.c.location_id == StockSnapshot.location_id,
+                latest.c.medication_id == StockSnapshot.medication_id,
+                latest.c.movement_id == StockSnapshot.movement_id,
+            ),
+        )
+        .filter(StockSnapshot.location_id == location_id)
+        .all()
+    )
+    tail = (
+        db.query(StockMovement.medication_id, func.sum(StockMovement.delta))
+        .outerjoin(
+            latest,
+            and_(
+                latest.c.location_id == StockMovement.location_id,
+                latest.c.medication_id == StockMovement.medication_id,
+            ),
+        )
+        .filter(
+            StockMovement.location_id == location_id,
+            StockMovement.id > func.coalesce(latest.c.movement_id, 0),
+        )
+        .group_by(StockMovement.medication_id)
+    )
+    for medication_id, delta in tail:
+        levels[medication_id] = levels.get(medication_id, 0) + delta
+    return levels
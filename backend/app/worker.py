@@ -0,0 +1,124 @@
+"""
+Background worker process for the MeTIMat application.
+
+This module runs periodic jobs outside of the API request path, such as draining
+the transactional email outbox and purging its delivered messages, reminding customers of and expiring uncollected
+pickups, archiving old orders, purging expired idempotency keys, taking stock
+ledger snapshots and sending low-stock digests. Each job processes one bounded
+batch per call in its own database session; a job that did work is run again
+immediately, otherwise it waits for its interval before polling again. Maintenance commands, such as
+rebuilding the order dashboard counters or re-checking all stock against the
+low-stock thresholds, are only run on demand.
+
+Usage:
+    python app/worker.py            Run all jobs forever.
+    python app/worker.py <job>      Run a single job once until it has no more work.
+    python app/worker.py <command>  Run a maintenance command once.
+"""
+
+import logging
+import sys
+import time
+from typing import Callable, Dict, Tuple
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.archive import archive_orders
+from app.services.idempotency import purge_expired_keys
+from app.services.low_stock import check_all_stock, send_low_stock_digests
+from app.services.order_stats import rebuild_order_stats
+from app.services.outbox import dispatch_pending, purge_sent_messages
+from app.services.pickup_sweeper import expire_pickups, send_pickup_reminders
+from app.services.stock_ledger import take_snapshots
+from sqlalchemy.orm import Session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Job name -> (batch function returning the number of processed items, interval in seconds)
+JOBS: Dict[str, Tuple[Callable[[Session], int], float]] = {
+    "outbox": (dispatch_pending, settings.WORKER_POLL_INTERVAL_SECONDS),
+    "outbox_purge": (purge_sent_messages, settings.OUTBOX_PURGE_INTERVAL_SECONDS),
+    "pickup_reminders": (
+        send_pickup_reminders,
+        settings.PICKUP_SWEEP_INTERVAL_SECONDS,
+    ),
+    "pickup_expiry": (expire_pickups, settings.PICKUP_SWEEP_INTERVAL_SECONDS),
+    "archive": (archive_orders, settings.ORDER_ARCHIVE_INTERVAL_SECONDS),
+    "idempotency": (purge_expired_keys, settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS),
+    "stock_snapshots": (take_snapshots, settings.STOCK_SNAPSHOT_INTERVAL_SECONDS),
+    "low_stock_digests": (
+        send_low_stock_digests,
+        settings.LOW_STOCK_DIGEST_INTERVAL_SECONDS,
+    ),
+}
+
+# Command name -> function returning the number of processed items
+COMMANDS: Dict[str, Callable[[Session], int]] = {
+    "rebuild-stats": rebuild_order_stats,
+    "check-low-stock": check_all_stock,
+}
+
+
+def run_job_once(name: str) -> int:
+    """
+    Run a single batch of a job in a fresh database session.
+
+    Args:
+        name: The name of the job in JOBS.
+
+    Returns:
+        int: The number of items processed by the batch (0 if the batch failed).
+    """
+    job, _ = JOBS[name]
+    db = SessionLocal()
+    try:
+        return job(db)
+    except Exception as e:
+        logger.error(f"Job {name} failed: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+def run_forever() -> None:
+    """
+    Schedule all registered jobs until the process is terminated.
+    """
+    next_run = {name: 0.0 for name in JOBS}
+    while True:
+        now = time.monotonic()
+        for name, (_, interval) in JOBS.items():
+            if next_run[name] > now:
+                continue
+            processed = run_job_once(name)
+            # Keep draining while there is work, otherwise wait for the interval
+            next_run[name] = now if processed else now + interval
+        time.sleep(max(0.0, min(next_run.values()) - time.monotonic()))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        job_name = sys.argv[1]
+        if job_name in COMMANDS:
+            logger.info(f"Running command {job_name}...")
+            db = SessionLocal()
+            try:
+                processed = COMMANDS[job_name](db)
+            finally:
+                db.close()
+            logger.info(f"Command {job_name} finished, {processed} rows written.")
+            sys.exit(0)
+        if job_name not in JOBS:
+            logger.error(
+                f"Unknown job '{job_name}', available: {', '.join([*JOBS, *COMMANDS])}"
+            )
+            sys.exit(1)
+        logger.info(f"Running job {job_name}...")
+        while run_job_once(job_name):
+            pass
+        logger.info(f"Job {job_name} finished.")
+    else:
+        logger.info("Starting background worker...")
+        run_forever()
@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+
+import pytest
+from app.api import deps
+from app.core.security import get_password_hash
+from app.db.session import Base
+from app.main import app
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.models.medication import Medication
+from app.models.user import User
+from app.services.fulfilment import stock_matrix
+from app.services.location_index import location_index
+from app.services.medication_search import medication_index
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Setup Test Database (In-memory SQLite)
+SQLALCHEMY_DATABASE_URL = "sqlite://"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def stock_level(medication_id):
+    db = TestingSessionLocal()
+    quantity = (
+        db.query(Inventory.quantity)
+        .filter(Inventory.location_id == 1, Inventory.medication_id == medication_id)
+        .scalar()
+    )
+    db.close()
+    return quantity
+
+
+@pytest.fixture(scope="module")
+def test_client():
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[deps.get_db] = override_get_db
+
+    db = TestingSessionLocal()
+    db.add(
+        User(
+            email="orderadmin@example.com",
+            hashed_password=get_password_hash("testpass"),
+            full_name="Order Admin",
+            is_superuser=True,
+            is_active=True,
+            is_verified=True,
+        )
+    )
+    db.add(
+        Location(
+            id=1,
+            name="Test Machine",
+            address="Teststraße 1",
+            latitude=48.48,
+            longitude=9.18,
+            validation_key="machine-key",
+        )
+    )
+    db.add(Medication(id=1, name="Ibuprofen 400mg", pzn="00000001", price=9.95))
+    db.add(
+        Medication(
+            id=2,
+            name="Amoxicillin 1000mg",
+            pzn="00000002",
+            price=14.5,
+            prescription_required=True,
+        )
+    )
+    db.add(Inventory(location_id=1, medication_id=1, quantity=100))
+    db.add(Inventory(location_id=1, medication_id=2, quantity=100))
+    db.commit()
+    # Every module starts from a fresh database; drop what the in-process
+    # indexes still hold from the previous one
+    location_index.rebuild(db)
+    db.close()
+    stock_matrix.invalidate()
+    medication_index.invalidate()
+
+    with TestClient(app) as client:
+        yield client
+
+    app.dependency_overrides.pop(deps.get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(scope="module")
+def auth_headers(test_client):
+    response = test_client.post(
+        "/api/v1/auth/login",
+        data={"username": "orderadmin@example.com", "password": "testpass"},
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
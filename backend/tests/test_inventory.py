@@ -0,0 +1,182 @@
+from app.core.config import settings
+from app.models.low_stock_alert import LowStockAlert
+from app.models.outbox import OutboxMessage
+from app.services.inventory import reserved_quantities
+from app.services.low_stock import send_low_stock_digests
+from app.services.stock_ledger import take_snapshots
+from conftest import TestingSessionLocal, count_queries, stock_level
+
+
+def test_inventory_stock_report(test_client, auth_headers):
+    test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1]},
+        headers=auth_headers,
+    )
+    db = TestingSessionLocal()
+    reserved = reserved_quantities(db, 1)
+    db.close()
+    before = {1: stock_level(1), 2: stock_level(2)}
+
+    response = test_client.put(
+        "/api/v1/locations/1/inventory",
+        json={"items": [{"medication_id": 1, "quantity": 50}]},
+    )
+    assert response.status_code == 401
+
+    with count_queries() as statements:
+        response = test_client.put(
+            "/api/v1/locations/1/inventory",
+            json={"items": [{"medication_id": 1, "quantity": 50}]},
+            headers={"X-Machine-Token": "machine-key"},
+        )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "medication_id": 1,
+            "old_quantity": before[1],
+            "new_quantity": 50 - reserved[1],
+        },
+        {"medication_id": 2, "old_quantity": before[2], "new_quantity": 0},
+    ]
+    assert len([s for s in statements if s.startswith("INSERT INTO inventory")]) == 1
+
+    response = test_client.get("/api/v1/locations/1/inventory", headers=auth_headers)
+    assert [(row["medication_id"], row["quantity"]) for row in response.json()] == [
+        (1, 50 - reserved[1]),
+        (2, 0),
+    ]
+
+    response = test_client.put(
+        "/api/v1/locations/1/inventory",
+        json={"items": [{"medication_id": 999, "quantity": 1}]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+    response = test_client.put(
+        "/api/v1/locations/1/inventory",
+        json={
+            "items": [
+                {"medication_id": 1, "quantity": before[1] + reserved[1]},
+                {"medication_id": 2, "quantity": before[2] + reserved.get(2, 0)},
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert (stock_level(1), stock_level(2)) == (before[1], before[2])
+
+
+def test_stock_ledger(test_client, auth_headers):
+    def history():
+        response = test_client.get(
+            "/api/v1/locations/1/inventory/history",
+            params={"medication_id": 1},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    start = history()
+    level = start["levels"][0]["quantity"] if start["levels"] else 0
+    order = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1]},
+        headers=auth_headers,
+    ).json()
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "cancelled"},
+        headers=auth_headers,
+    )
+
+    movements = history()["movements"][len(start["movements"]) :]
+    assert [(m["kind"], m["delta"], m["order_id"]) for m in movements] == [
+        ("reserve", -2, order["id"]),
+        ("release", 2, order["id"]),
+    ]
+
+    # Snapshots condense the ledger without changing the levels
+    db = TestingSessionLocal()
+    assert take_snapshots(db) > 0
+    assert take_snapshots(db) == 0
+    db.close()
+    assert history()["levels"] == [{"medication_id": 1, "quantity": level}]
+
+
+def test_low_stock_alerts_are_deduplicated_and_batched(
+    test_client, auth_headers, monkeypatch
+):
+    def set_threshold(medication_id, threshold):
+        return test_client.put(
+            "/api/v1/locations/1/inventory/thresholds",
+            json={"items": [{"medication_id": medication_id, "threshold": threshold}]},
+            headers=auth_headers,
+        )
+
+    def alerts():
+        db = TestingSessionLocal()
+        rows = db.query(LowStockAlert.medication_id, LowStockAlert.notified_at).all()
+        db.close()
+        return rows
+
+    def digests():
+        db = TestingSessionLocal()
+        messages = (
+            db.query(OutboxMessage)
+            .filter(OutboxMessage.kind == "low_stock_digest")
+            .all()
+        )
+        db.close()
+        return messages
+
+    assert set_threshold(99, 5).status_code == 400
+    level = stock_level(1)
+    response = set_threshold(1, level - 1)
+    assert response.status_code == 200
+    assert response.json()[0]["low_stock_threshold"] == level - 1
+    assert alerts() == []
+
+    orders = [
+        test_client.post(
+            "/api/v1/orders/",
+            json={"location_id": 1, "medication_ids": [1, 1]},
+            headers=auth_headers,
+        ).json()
+        for _ in range(2)
+    ]
+    assert [med_id for med_id, _ in alerts()] == [1]
+
+    db = TestingSessionLocal()
+    # Without recipients the alerts stay pending for a later run
+    with monkeypatch.context() as m:
+        m.setattr(settings, "LOW_STOCK_ALERT_EMAILS", " ")
+        assert send_low_stock_digests(db) == 0
+    assert digests() == []
+    assert alerts()[0][1] is None
+
+    assert send_low_stock_digests(db) == 1
+    assert send_low_stock_digests(db) == 0
+    db.close()
+    (digest,) = digests()
+    assert digest.payload["email_to"] == "orderadmin@example.com"
+    assert digest.payload["items"] == [
+        {
+            "name": "Ibuprofen 400mg",
+            "quantity": level - 4,
+            "threshold": level - 1,
+            "new": True,
+        }
+    ]
+    assert alerts()[0][1] is not None
+
+    # Restocking above the threshold closes the alert
+    for order in orders:
+        test_client.patch(
+            f"/api/v1/orders/{order['id']}",
+            json={"status": "cancelled"},
+            headers=auth_headers,
+        )
+    assert alerts() == []
+    set_threshold(1, None)
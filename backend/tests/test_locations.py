@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.models.order import Order, OrderMedication
+from app.models.user import User
+from app.services import forecast
+from app.services.fulfilment import stock_matrix
+from conftest import TestingSessionLocal, count_queries, stock_level
+
+
+def test_location_availability_is_quantity_aware(test_client, auth_headers):
+    stock = stock_level(2)
+    with count_queries() as statements:
+        response = test_client.get(
+            "/api/v1/locations/",
+            params={"medication_ids": f"1:2,2,2:{stock}"},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+    location = next(loc for loc in response.json() if loc["id"] == 1)
+    assert location["is_available"] is False
+    assert location["missing_items"] == [
+        {"medication_id": 2, "requested": stock + 1, "available": stock}
+    ]
+    assert len([s for s in statements if "inventory" in s]) == 1
+
+    response = test_client.get(
+        "/api/v1/locations/", params={"medication_ids": "1:2,2"}, headers=auth_headers
+    )
+    location = next(loc for loc in response.json() if loc["id"] == 1)
+    assert location["is_available"] is True
+    assert location["missing_items"] == []
+
+    response = test_client.get(
+        "/api/v1/locations/", params={"medication_ids": "1:x"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def test_nearby_locations(test_client, auth_headers):
+    created = []
+    for name, lat, lon in [("Nearby", 48.50, 9.20), ("Far away", 52.52, 13.40)]:
+        response = test_client.post(
+            "/api/v1/locations/",
+            json={"name": name, "address": "Weg 1", "latitude": lat, "longitude": lon},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        created.append(response.json()["id"])
+
+    params = {"lat": 48.49, "lon": 9.19, "radius": 10}
+    response = test_client.get(
+        "/api/v1/locations/nearby", params=params, headers=auth_headers
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert {loc["id"] for loc in results} == {1, created[0]}
+    assert created[1] not in [loc["id"] for loc in results]
+    assert results == sorted(results, key=lambda loc: loc["distance_km"])
+    assert 0 < results[0]["distance_km"] < 2
+
+    # Only location 1 stocks the cart
+    response = test_client.get(
+        "/api/v1/locations/nearby",
+        params={**params, "medication_ids": "1:1"},
+        headers=auth_headers,
+    )
+    assert [loc["id"] for loc in response.json()] == [1]
+
+    test_client.delete(f"/api/v1/locations/{created[0]}", headers=auth_headers)
+    test_client.delete(f"/api/v1/locations/{created[1]}", headers=auth_headers)
+    response = test_client.get(
+        "/api/v1/locations/nearby", params=params, headers=auth_headers
+    )
+    assert [loc["id"] for loc in response.json()] == [1]
+
+
+def test_split_fulfilment_plan(test_client, auth_headers):
+    location = test_client.post(
+        "/api/v1/locations/",
+        json={
+            "name": "Second",
+            "address": "Weg 2",
+            "latitude": 48.49,
+            "longitude": 9.19,
+        },
+        headers=auth_headers,
+    ).json()
+    db = TestingSessionLocal()
+    db.add(Inventory(location_id=location["id"], medication_id=2, quantity=1000))
+    db.commit()
+    db.close()
+    stock_matrix.invalidate()
+
+    # Location 1 has medication 1 but not enough of medication 2, the new one the reverse
+    response = test_client.get(
+        "/api/v1/locations/plan",
+        params={
+            "lat": 48.48,
+            "lon": 9.18,
+            "medication_ids": f"1:1,2:{stock_level(2) + 1},999",
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    plan = response.json()
+    assert [stop["location"]["id"] for stop in plan["stops"]] == [1, location["id"]]
+    assert plan["stops"][0]["items"] == [{"medication_id": 1, "quantity": 1}]
+    assert plan["stops"][1]["items"] == [
+        {"medication_id": 2, "quantity": stock_level(2) + 1}
+    ]
+    assert plan["unavailable_items"] == [{"medication_id": 999, "quantity": 1}]
+
+    test_client.delete(f"/api/v1/locations/{location['id']}", headers=auth_headers)
+
+
+def test_location_demand_forecast(test_client, auth_headers, monkeypatch):
+    db = TestingSessionLocal()
+    admin = db.query(User).filter(User.email == "orderadmin@example.com").one()
+    db.add(
+        Location(
+            id=50, name="Forecast Machine", address="Weg 5", latitude=1.0, longitude=1.0
+        )
+    )
+    db.add(Inventory(location_id=50, medication_id=1, quantity=5))
+    today = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    # Two units a day over the last two weeks
+    for days_ago in range(1, 15):
+        order = Order(
+            user_id=admin.id,
+            location_id=50,
+            created_at=today - timedelta(days=days_ago),
+        )
+        order.medication_items.append(OrderMedication(medication_id=1, quantity=2))
+        db.add(order)
+    db.commit()
+    db.close()
+
+    def read_forecast():
+        with count_queries() as statements:
+            response = test_client.get(
+                "/api/v1/locations/50/forecast", headers=auth_headers
+            )
+        assert response.status_code == 200
+        return response.json(), [s for s in statements if "GROUP BY" in s]
+
+    result, aggregates = read_forecast()
+    assert result["items"] == [
+        {
+            "medication_id": 1,
+            "daily_rate": 1.0,
+            "expected_demand": 7.0,
+            "stock": 5,
+            "days_of_cover": 5.0,
+            "restock_quantity": 2,
+        }
+    ]
+    # Cached until a day has passed, then only the new day is loaded
+    assert read_forecast()[1] == []
+    tomorrow = forecast._today() + 1
+    monkeypatch.setattr(forecast, "_today", lambda: tomorrow)
+    result, aggregates = read_forecast()
+    assert len(aggregates) == 2
+    assert result["items"][0]["daily_rate"] == 1.0
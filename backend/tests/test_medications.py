@@ -0,0 +1,48 @@
+def test_medication_search(test_client, auth_headers):
+    for medication in (
+        {"name": "Paracetamol 500mg", "pzn": "10000003", "manufacturer": "ratiopharm"},
+        {"name": "Paracetamol Saft", "pzn": "10000004", "is_active": False},
+    ):
+        response = test_client.post(
+            "/api/v1/medications/", json=medication, headers=auth_headers
+        )
+        assert response.status_code == 200
+
+    def search(**params):
+        response = test_client.get(
+            "/api/v1/medications/search", params=params, headers=auth_headers
+        )
+        assert response.status_code == 200
+        return response
+
+    def names(**params):
+        return [m["name"] for m in search(**params).json()]
+
+    assert names(q="ibupro") == ["Ibuprofen 400mg"]
+    assert names(q="00000002")[0] == "Amoxicillin 1000mg"
+    assert names(q="Ratio") == ["Paracetamol 500mg"]
+    assert names(q="paracetamol 500", is_active=True) == ["Paracetamol 500mg"]
+    # Misspelled queries still find close matches
+    assert names(q="paracetmol", is_active=True) == ["Paracetamol 500mg"]
+    assert names(q="mg", prescription_required=True) == ["Amoxicillin 1000mg"]
+
+    # Keyset pages add up to the unpaged result
+    expected = [m["id"] for m in search(q="mg").json()]
+    seen, after = [], None
+    while True:
+        params = {"q": "mg", "limit": 1}
+        if after:
+            params["after"] = after
+        response = search(**params)
+        seen += [m["id"] for m in response.json()]
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+    assert len(expected) == 3 and seen == expected
+
+    response = test_client.get(
+        "/api/v1/medications/search",
+        params={"q": "mg", "after": "x"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
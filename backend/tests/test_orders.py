@@ -0,0 +1,800 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from app.core.config import settings
+from app.models.location import Location
+from app.models.order import Order, OrderMedication
+from app.models.outbox import OutboxMessage
+from app.models.prescription import Prescription
+from app.models.user import User
+from app.services.order_events import order_events, publish_location_key_change
+from app.services.pickup_tokens import InvalidPickupToken, sign_token, verify_token
+from conftest import TestingSessionLocal, count_queries, stock_level
+
+
+def test_read_orders_keyset_pagination(test_client, auth_headers):
+    db = TestingSessionLocal()
+    admin = db.query(User).filter(User.email == "orderadmin@example.com").one()
+    start = datetime(2025, 1, 1)
+    for i in range(5):
+        order = Order(
+            user_id=admin.id,
+            location_id=1,
+            status="completed",
+            access_token=f"keyset-{i}",
+            # Two orders share a timestamp to exercise the id tie-breaker
+            created_at=start + timedelta(minutes=i // 2),
+        )
+        order.medication_items = [OrderMedication(medication_id=1, quantity=i + 1)]
+        db.add(order)
+    db.commit()
+    db.close()
+
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2}
+        if after:
+            params["after"] = after
+        response = test_client.get(
+            "/api/v1/orders/", params=params, headers=auth_headers
+        )
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(o["access_token"] for o in page)
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+
+    assert seen == [f"keyset-{i}" for i in range(5)]
+
+
+def test_read_orders_invalid_cursor(test_client, auth_headers):
+    response = test_client.get(
+        "/api/v1/orders/", params={"after": "yesterday"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def test_create_order_queues_confirmation_email(test_client, auth_headers):
+    response = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    order = response.json()
+    assert order["total_price"] == pytest.approx(19.9)
+    assert order["medication_items"][0]["quantity"] == 2
+
+    db = TestingSessionLocal()
+    message = (
+        db.query(OutboxMessage)
+        .filter(OutboxMessage.kind == "order_confirmation")
+        .order_by(OutboxMessage.id.desc())
+        .first()
+    )
+    db.close()
+    assert message is not None
+    assert message.payload["order_id"] == order["id"]
+    assert message.status == "pending"
+
+
+def test_read_orders_summary_view(test_client, auth_headers):
+    test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1]},
+        headers=auth_headers,
+    )
+
+    with count_queries() as statements:
+        response = test_client.get(
+            "/api/v1/orders/", params={"view": "summary"}, headers=auth_headers
+        )
+    assert response.status_code == 200
+    order = response.json()[-1]
+    assert set(order) == {
+        "id",
+        "status",
+        "total_price",
+        "location_id",
+        "created_at",
+        "updated_at",
+    }
+    # Only the order columns are selected, no relationships are loaded
+    order_statements = [s for s in statements if "FROM orders" in s]
+    assert len(order_statements) == 1
+    assert "access_token" not in order_statements[0]
+    assert not any("prescriptions" in s or "medications" in s for s in statements)
+
+
+def test_read_order_sparse_fields(test_client, auth_headers):
+    created = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1]},
+        headers=auth_headers,
+    ).json()
+
+    response = test_client.get(
+        f"/api/v1/orders/{created['id']}",
+        params={"fields": "id,status,medication_items"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    order = response.json()
+    assert set(order) == {"id", "status", "medication_items"}
+    assert order["medication_items"][0]["quantity"] == 2
+
+    response = test_client.get(
+        f"/api/v1/orders/{created['id']}",
+        params={"fields": "id,fhir_data"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+
+
+def test_create_order_statement_count(test_client, auth_headers):
+    with count_queries() as statements:
+        response = test_client.post(
+            "/api/v1/orders/",
+            json={"location_id": 1, "medication_ids": [1, 1, 1]},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+    assert response.json()["medication_items"][0]["medication"]["name"].startswith(
+        "Ibuprofen"
+    )
+    # User lookup, medications, location, stock reservation, order, order items,
+    # dashboard counter, stock ledger, low-stock check and the outbox message
+    assert len(statements) <= 10, statements
+
+
+def test_create_order_ignores_client_status(test_client, auth_headers):
+    response = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "status": "available for pickup"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+
+
+def test_create_order_unknown_location(test_client, auth_headers):
+    response = test_client.post(
+        "/api/v1/orders/", json={"location_id": 999}, headers=auth_headers
+    )
+    assert response.status_code == 404
+
+
+def test_read_order_qr_is_cached(test_client, auth_headers, monkeypatch):
+    from app.services import qr
+
+    response = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    )
+    order_id = response.json()["id"]
+
+    calls = []
+    rasterize = qr._rasterize
+    monkeypatch.setattr(
+        qr, "_rasterize", lambda *args: calls.append(args) or rasterize(*args)
+    )
+
+    for _ in range(2):
+        response = test_client.get(
+            f"/api/v1/orders/{order_id}/qr", headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["cache-control"] == "private, no-cache"
+    assert len(calls) == 1
+
+    response = test_client.get(
+        f"/api/v1/orders/{order_id}/qr",
+        headers={**auth_headers, "If-None-Match": response.headers["etag"]},
+    )
+    assert response.status_code == 304
+
+    response = test_client.get(
+        f"/api/v1/orders/{order_id}/qr", params={"format": "svg"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert len(calls) == 2
+
+
+def test_validate_qr_served_from_pickup_index(test_client, auth_headers):
+    response = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    )
+    order = response.json()
+    response = test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    with count_queries() as statements:
+        response = test_client.post(
+            "/api/v1/orders/validate-qr",
+            json={"qr_data": order["access_token"]},
+            headers={"X-Machine-Token": "machine-key"},
+        )
+    assert response.status_code == 200
+    assert response.json()["valid"] is True
+    assert response.json()["order"]["id"] == order["id"]
+    assert statements == []
+
+    # A key rotated by another process is dropped through its location key event
+    db = TestingSessionLocal()
+    db.get(Location, 1).validation_key = "rotated-key"
+    publish_location_key_change(db, 1)
+    db.commit()
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": order["access_token"]},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.status_code == 401
+    db.close()
+    response = test_client.put(
+        "/api/v1/locations/1",
+        json={"validation_key": "machine-key"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    response = test_client.post(
+        f"/api/v1/orders/{order['id']}/complete",
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.status_code == 200
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": order["access_token"]},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.json()["valid"] is False
+
+
+def test_complete_order_is_guarded(test_client, auth_headers):
+    order = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    ).json()
+    response = test_client.post(
+        f"/api/v1/orders/{order['id']}/complete",
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.status_code == 409
+
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    response = test_client.post(
+        f"/api/v1/orders/{order['id']}/complete",
+        headers={"X-Machine-Token": "other-key"},
+    )
+    assert response.status_code == 401
+
+    with count_queries() as statements:
+        response = test_client.post(
+            f"/api/v1/orders/{order['id']}/complete",
+            headers={"X-Machine-Token": "machine-key"},
+        )
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+
+    # A second scan of the same order must not dispense it again
+    response = test_client.post(
+        f"/api/v1/orders/{order['id']}/complete",
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.status_code == 409
+
+
+def test_signed_pickup_tokens(test_client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_SIGNING", True)
+    response = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    )
+    order = response.json()
+    assert order["access_token"].startswith(f"mt1.k0.{order['id']}.1.")
+    response = test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    token = response.json()["access_token"]
+    assert token != order["access_token"]
+
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": token},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.json()["valid"] is True
+
+    # Forged, wrong-location and garbage codes never reach the database
+    forged = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+    other_location = sign_token(order["id"], 2, datetime.utcnow() + timedelta(hours=1))
+    for qr_data in (forged, other_location, "not a pickup code"):
+        with count_queries() as statements:
+            response = test_client.post(
+                "/api/v1/orders/validate-qr",
+                json={"qr_data": qr_data},
+                headers={"X-Machine-Token": "machine-key"},
+            )
+        assert response.json()["valid"] is False
+        assert statements == []
+
+    with pytest.raises(InvalidPickupToken, match="expired"):
+        verify_token(token, now=datetime.utcnow().timestamp() + 73 * 3600)
+
+    # Tokens signed with a retired key stay valid while the key is still listed
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_KEYS", "old:secret-1,new:secret-2")
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_KEY_ID", "old")
+    old_token = sign_token(1, 1, datetime.utcnow() + timedelta(hours=1))
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_KEY_ID", "new")
+    assert sign_token(1, 1, datetime.utcnow() + timedelta(hours=1)).startswith(
+        "mt1.new."
+    )
+    assert verify_token(old_token).key_id == "old"
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_KEYS", "new:secret-2")
+    with pytest.raises(InvalidPickupToken, match="unknown key"):
+        verify_token(old_token)
+
+
+def test_qr_follows_reissued_pickup_token(test_client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "PICKUP_TOKEN_SIGNING", True)
+    order = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    ).json()
+    before = test_client.get(f"/api/v1/orders/{order['id']}/qr", headers=auth_headers)
+
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    # Revalidating the old copy returns the QR code of the new token
+    response = test_client.get(
+        f"/api/v1/orders/{order['id']}/qr",
+        headers={**auth_headers, "If-None-Match": before.headers["etag"]},
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != before.headers["etag"]
+    assert response.content != before.content
+
+
+def test_create_orders_bulk(test_client, auth_headers):
+    response = test_client.post(
+        "/api/v1/orders/bulk",
+        json={
+            "orders": [
+                {"location_id": 1, "medication_ids": [1, 1, 1]},
+                {"location_id": 1, "medication_ids": [2]},
+                {"location_id": 1, "medication_ids": [1], "user_id": 999},
+                {
+                    "location_id": 1,
+                    "medication_ids": [1],
+                    "status": "available for pickup",
+                },
+            ]
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["success"] for r in results] == [True, False, False, True]
+    assert "require a prescription" in results[1]["error"]
+    assert "User 999 not found" == results[2]["error"]
+
+    response = test_client.get(
+        f"/api/v1/orders/{results[0]['order_id']}", headers=auth_headers
+    )
+    order = response.json()
+    assert order["total_price"] == pytest.approx(29.85)
+    assert order["medication_items"][0]["quantity"] == 3
+    # Imported orders cannot skip the status transitions
+    response = test_client.get(
+        f"/api/v1/orders/{results[3]['order_id']}", headers=auth_headers
+    )
+    assert response.json()["status"] == "pending"
+
+
+def test_order_stream_requires_authentication(test_client):
+    response = test_client.get("/api/v1/orders/stream")
+    assert response.status_code == 401
+
+
+def test_status_change_is_published_after_commit(test_client, auth_headers):
+    order = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    ).json()
+
+    async def receive_event():
+        queue = order_events.subscribe(order["user_id"])
+        try:
+            response = await asyncio.to_thread(
+                test_client.patch,
+                f"/api/v1/orders/{order['id']}",
+                json={"status": "available for pickup"},
+                headers=auth_headers,
+            )
+            assert response.status_code == 200
+            return await asyncio.wait_for(queue.get(), timeout=5)
+        finally:
+            order_events.unsubscribe(order["user_id"], queue)
+
+    order_event = asyncio.run(receive_event())
+    assert order_event["order_id"] == order["id"]
+    assert order_event["status"] == "available for pickup"
+
+
+def test_archive_moves_old_completed_orders(test_client, auth_headers):
+    from app.services.archive import archive_orders
+
+    created = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1]},
+        headers=auth_headers,
+    ).json()
+    active = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    ).json()
+
+    db = TestingSessionLocal()
+    order = db.get(Order, created["id"])
+    order.status = "completed"
+    db.commit()
+    # Bypass onupdate to backdate the last modification
+    db.query(Order).filter(Order.id == created["id"]).update(
+        {"updated_at": datetime.utcnow() - timedelta(days=365)},
+        synchronize_session=False,
+    )
+    db.commit()
+    assert archive_orders(db) == 1
+    assert archive_orders(db) == 0
+    db.close()
+
+    ids = [
+        o["id"] for o in test_client.get("/api/v1/orders/", headers=auth_headers).json()
+    ]
+    assert created["id"] not in ids
+    assert active["id"] in ids
+
+    response = test_client.get(
+        "/api/v1/orders/", params={"include_archived": True}, headers=auth_headers
+    )
+    ids = [o["id"] for o in response.json()]
+    assert ids.index(created["id"]) < ids.index(active["id"])
+
+    response = test_client.get(f"/api/v1/orders/{created['id']}", headers=auth_headers)
+    assert response.status_code == 404
+    response = test_client.get(
+        f"/api/v1/orders/{created['id']}",
+        params={"include_archived": True},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["medication_items"][0]["quantity"] == 2
+
+
+def test_archived_prescriptions_cannot_be_redeemed_again(test_client, auth_headers):
+    from app.services.archive import archive_orders
+
+    db = TestingSessionLocal()
+    admin = db.query(User).filter(User.email == "orderadmin@example.com").one()
+    prescription = Prescription(
+        user_id=admin.id, medication_id=2, medication_name="Amoxicillin 1000mg"
+    )
+    db.add(prescription)
+    db.commit()
+    prescription_id = prescription.id
+
+    order = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "prescription_ids": [prescription_id]},
+        headers=auth_headers,
+    ).json()
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "completed"},
+        headers=auth_headers,
+    )
+    db.query(Order).filter(Order.id == order["id"]).update(
+        {"updated_at": datetime.utcnow() - timedelta(days=365)},
+        synchronize_session=False,
+    )
+    db.commit()
+    archive_orders(db)
+    assert db.get(Prescription, prescription_id).archived_order_id == order["id"]
+    db.close()
+
+    response = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "prescription_ids": [prescription_id]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 400
+    response = test_client.post(
+        "/api/v1/orders/bulk",
+        json={"orders": [{"location_id": 1, "prescription_ids": [prescription_id]}]},
+        headers=auth_headers,
+    )
+    assert response.json()[0]["success"] is False
+    assert "already used" in response.json()[0]["error"]
+
+
+def test_create_order_reserves_and_cancel_releases_stock(test_client, auth_headers):
+    before = stock_level(1)
+    order = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1, 1, 1]},
+        headers=auth_headers,
+    ).json()
+    assert stock_level(1) == before - 3
+
+    response = test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "cancelled"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert stock_level(1) == before
+
+    # Releasing is idempotent
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "cancelled"},
+        headers=auth_headers,
+    )
+    test_client.delete(f"/api/v1/orders/{order['id']}", headers=auth_headers)
+    assert stock_level(1) == before
+
+
+def test_completed_order_keeps_its_stock_taken(test_client, auth_headers):
+    before = stock_level(1)
+    order = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1]},
+        headers=auth_headers,
+    ).json()
+    response = test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "completed"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert stock_level(1) == before - 1
+
+    # The units were handed out, deleting the order must not return them
+    test_client.delete(f"/api/v1/orders/{order['id']}", headers=auth_headers)
+    assert stock_level(1) == before - 1
+
+
+def test_bulk_status_update(test_client, auth_headers):
+    before = stock_level(1)
+    order_ids = [
+        test_client.post(
+            "/api/v1/orders/",
+            json={"location_id": 1, "medication_ids": [1]},
+            headers=auth_headers,
+        ).json()["id"]
+        for _ in range(3)
+    ]
+    db = TestingSessionLocal()
+    messages = db.query(OutboxMessage).filter(OutboxMessage.kind == "pickup_ready")
+    ready_emails = messages.count()
+
+    response = test_client.patch(
+        "/api/v1/orders/status",
+        json={"order_ids": order_ids[:2] + [999999], "status": "available for pickup"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {"order_id": order_ids[0], "success": True, "changed": True, "error": None},
+        {"order_id": order_ids[1], "success": True, "changed": True, "error": None},
+        {
+            "order_id": 999999,
+            "success": False,
+            "changed": False,
+            "error": "Order not found",
+        },
+    ]
+    assert messages.count() == ready_emails + 2
+    db.close()
+    token = test_client.get(
+        f"/api/v1/orders/{order_ids[0]}", headers=auth_headers
+    ).json()["access_token"]
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": token},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.json()["valid"] is True
+
+    response = test_client.patch(
+        "/api/v1/orders/status",
+        json={"order_ids": order_ids, "status": "cancelled"},
+        headers=auth_headers,
+    )
+    assert all(result["changed"] for result in response.json())
+    assert stock_level(1) == before
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": token},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.json()["valid"] is False
+
+
+def test_bulk_completion_ends_reservations(test_client, auth_headers):
+    before = stock_level(1)
+    order_ids = [
+        test_client.post(
+            "/api/v1/orders/",
+            json={"location_id": 1, "medication_ids": [1]},
+            headers=auth_headers,
+        ).json()["id"]
+        for _ in range(2)
+    ]
+    response = test_client.patch(
+        "/api/v1/orders/status",
+        json={"order_ids": order_ids, "status": "completed"},
+        headers=auth_headers,
+    )
+    assert all(result["changed"] for result in response.json())
+
+    db = TestingSessionLocal()
+    assert (
+        not db.query(Order)
+        .filter(Order.id.in_(order_ids), Order.stock_reserved)
+        .count()
+    )
+    db.close()
+    for order_id in order_ids:
+        test_client.delete(f"/api/v1/orders/{order_id}", headers=auth_headers)
+    assert stock_level(1) == before - 2
+
+
+def test_create_order_out_of_stock(test_client, auth_headers):
+    before = stock_level(1)
+    response = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1] * (before + 1)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 409
+    assert "Ibuprofen" in response.json()["detail"]
+    assert stock_level(1) == before
+
+
+def test_create_order_idempotency_key(test_client, auth_headers):
+    headers = {**auth_headers, "Idempotency-Key": "retry-me"}
+    payload = {"location_id": 1, "medication_ids": [1, 1]}
+    stock = stock_level(1)
+    db = TestingSessionLocal()
+    messages = db.query(OutboxMessage).count()
+    db.close()
+
+    first = test_client.post("/api/v1/orders/", json=payload, headers=headers)
+    assert first.status_code == 200
+
+    with count_queries() as statements:
+        replay = test_client.post("/api/v1/orders/", json=payload, headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
+    # User lookup and key lookup only
+    assert len(statements) == 2, statements
+    assert stock_level(1) == stock - 2
+
+    db = TestingSessionLocal()
+    assert db.query(OutboxMessage).count() == messages + 1
+    db.close()
+
+    response = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+def test_order_stats_follow_status_changes(test_client, auth_headers):
+    from app.services.order_stats import rebuild_order_stats
+
+    def counts():
+        response = test_client.get(
+            "/api/v1/orders/stats", params={"location_id": 1}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        return {row["status"]: row["count"] for row in response.json()}
+
+    # Reconcile with the changes other tests made directly in the database
+    db = TestingSessionLocal()
+    rebuild_order_stats(db)
+    db.close()
+
+    before = counts()
+    order = test_client.post(
+        "/api/v1/orders/", json={"location_id": 1}, headers=auth_headers
+    ).json()
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    test_client.post(
+        f"/api/v1/orders/{order['id']}/complete",
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    after = counts()
+    assert after.get("completed", 0) == before.get("completed", 0) + 1
+    assert after.get("pending", 0) == before.get("pending", 0)
+    assert after.get("available for pickup", 0) == before.get("available for pickup", 0)
+
+    # The incrementally maintained counters match a full recount
+    db = TestingSessionLocal()
+    rebuild_order_stats(db)
+    db.close()
+    assert counts() == after
+
+
+def test_pickup_sweeper_reminds_then_expires(test_client, auth_headers):
+    from app.services.pickup_sweeper import expire_pickups, send_pickup_reminders
+
+    stock = stock_level(1)
+    order = test_client.post(
+        "/api/v1/orders/",
+        json={"location_id": 1, "medication_ids": [1]},
+        headers=auth_headers,
+    ).json()
+    test_client.patch(
+        f"/api/v1/orders/{order['id']}",
+        json={"status": "available for pickup"},
+        headers=auth_headers,
+    )
+    assert stock_level(1) == stock - 1
+
+    def backdate(hours):
+        db = TestingSessionLocal()
+        db.query(Order).filter(Order.id == order["id"]).update(
+            {"ready_at": datetime.utcnow() - timedelta(hours=hours)},
+            synchronize_session=False,
+        )
+        db.commit()
+        db.close()
+
+    db = TestingSessionLocal()
+    assert send_pickup_reminders(db) == 0
+    backdate(25)
+    assert send_pickup_reminders(db) == 1
+    assert send_pickup_reminders(db) == 0
+    assert expire_pickups(db) == 0
+    backdate(73)
+    assert expire_pickups(db) == 1
+    kinds = [
+        m.kind
+        for m in db.query(OutboxMessage).filter(
+            OutboxMessage.kind.in_(["pickup_reminder", "pickup_expired"])
+        )
+        if m.payload["order_id"] == order["id"]
+    ]
+    assert db.get(Order, order["id"]).status == "cancelled"
+    db.close()
+
+    assert kinds == ["pickup_reminder", "pickup_expired"]
+    assert stock_level(1) == stock
+    response = test_client.post(
+        "/api/v1/orders/validate-qr",
+        json={"qr_data": order["access_token"]},
+        headers={"X-Machine-Token": "machine-key"},
+    )
+    assert response.json()["valid"] is False
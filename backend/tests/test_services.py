@@ -0,0 +1,282 @@
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import pytest
+from app.core.config import settings
+from app.db.session import Base
+from app.models.inventory import Inventory
+from app.models.location import Location
+from app.models.medication import Medication
+from app.models.outbox import OutboxMessage
+from app.services import outbox
+from app.services.inventory import InsufficientStockError, reserve_stock
+from app.services.location_index import LocationIndex
+from app.services.smtp import CircuitBreaker, CircuitOpenError, SMTPConnectionPool
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+engine = create_engine(
+    "sqlite://",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_outbox_delivers_pending_messages(db, monkeypatch):
+    sent = []
+    monkeypatch.setitem(
+        outbox.EMAIL_SENDERS, "verification", lambda **kwargs: sent.append(kwargs)
+    )
+    outbox.enqueue_email(db, "verification", email_to="a@example.com", token="t")
+    db.commit()
+
+    assert outbox.dispatch_pending(db) == 1
+    assert sent == [{"email_to": "a@example.com", "token": "t"}]
+    message = db.query(OutboxMessage).one()
+    assert message.status == "sent"
+    assert outbox.dispatch_pending(db) == 0
+
+
+def test_outbox_retries_with_backoff_then_dead_letters(db, monkeypatch):
+    def failing_sender(**kwargs):
+        raise ConnectionError("relay down")
+
+    monkeypatch.setitem(outbox.EMAIL_SENDERS, "verification", failing_sender)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox.enqueue_email(db, "verification", email_to="a@example.com", token="t")
+    db.commit()
+
+    assert outbox.dispatch_pending(db) == 1
+    message = db.query(OutboxMessage).one()
+    assert message.status == "pending"
+    assert message.attempts == 1
+    assert message.next_attempt_at > datetime.utcnow()
+
+    # Not due yet, so the next poll does not pick it up
+    assert outbox.dispatch_pending(db) == 0
+
+    message.next_attempt_at = datetime.utcnow()
+    db.commit()
+    assert outbox.dispatch_pending(db) == 1
+    db.refresh(message)
+    assert message.status == "dead"
+    assert "relay down" in message.last_error
+
+
+def test_outbox_purges_old_sent_messages(db):
+    old = datetime.utcnow() - timedelta(days=settings.OUTBOX_RETENTION_DAYS + 1)
+    db.add_all(
+        [
+            OutboxMessage(kind="verification", payload={}, status="sent", sent_at=old),
+            OutboxMessage(
+                kind="verification",
+                payload={},
+                status="sent",
+                sent_at=datetime.utcnow(),
+            ),
+            OutboxMessage(kind="verification", payload={}, status="dead"),
+            OutboxMessage(kind="verification", payload={}, status="pending"),
+        ]
+    )
+    db.commit()
+
+    assert outbox.purge_sent_messages(db) == 1
+    assert outbox.purge_sent_messages(db) == 0
+    assert db.query(OutboxMessage).count() == 3
+
+
+def test_enqueue_rejects_unknown_kind(db):
+    with pytest.raises(ValueError):
+        outbox.enqueue_email(db, "newsletter", email_to="a@example.com")
+
+
+class FakeSMTP:
+    """Stand-in for smtplib.SMTP that records connections and sent messages."""
+
+    connections = 0
+    closed = 0
+    fail_connect = False
+    fail_login = False
+
+    def __init__(self, timeout=None):
+        self.sock = None
+        self.sent = []
+
+    def connect(self, host, port):
+        if FakeSMTP.fail_connect:
+            raise ConnectionRefusedError("relay down")
+        FakeSMTP.connections += 1
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        if FakeSMTP.fail_login:
+            raise smtplib.SMTPAuthenticationError(535, b"rejected")
+
+    def send_message(self, message):
+        self.sent.append(message)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        FakeSMTP.closed += 1
+
+
+def test_smtp_pool_reuses_connections():
+    FakeSMTP.connections = 0
+    FakeSMTP.fail_connect = False
+    pool = SMTPConnectionPool(
+        "smtp.test", 587, user="u", password="p", factory=FakeSMTP
+    )
+
+    for _ in range(3):
+        pool.send(EmailMessage())
+
+    assert FakeSMTP.connections == 1
+
+
+def test_smtp_circuit_breaker_fast_fails():
+    FakeSMTP.connections = 0
+    FakeSMTP.fail_connect = True
+    pool = SMTPConnectionPool(
+        "smtp.test", 587, breaker=CircuitBreaker(2, 60.0), factory=FakeSMTP
+    )
+
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            pool.send(EmailMessage())
+    # The relay is not contacted again while the circuit is open
+    FakeSMTP.fail_connect = False
+    with pytest.raises(CircuitOpenError):
+        pool.send(EmailMessage())
+    assert FakeSMTP.connections == 0
+
+    # After the reset timeout a trial send closes the circuit again
+    pool.breaker.reset_timeout = 0
+    pool.send(EmailMessage())
+    assert FakeSMTP.connections == 1
+
+
+def test_smtp_pool_closes_failed_connections():
+    FakeSMTP.connections = FakeSMTP.closed = 0
+    FakeSMTP.fail_connect = False
+    FakeSMTP.fail_login = True
+    pool = SMTPConnectionPool(
+        "smtp.test", 587, user="u", password="p", factory=FakeSMTP
+    )
+
+    try:
+        for _ in range(2):
+            with pytest.raises(smtplib.SMTPAuthenticationError):
+                pool.send(EmailMessage())
+    finally:
+        FakeSMTP.fail_login = False
+    assert FakeSMTP.closed == FakeSMTP.connections == 2
+
+
+def test_nearest_locations_across_the_antimeridian(db):
+    # Enough occupied cells elsewhere that the search does not fall back to a full scan
+    for i in range(20):
+        db.add(
+            Location(
+                name=f"Filler {i}", address="Weg", latitude=48.0 + i, longitude=9.0
+            )
+        )
+    db.add(Location(id=100, name="East", address="Weg", latitude=0.0, longitude=179.99))
+    db.add(
+        Location(id=101, name="West", address="Weg", latitude=0.0, longitude=-179.99)
+    )
+    db.commit()
+
+    index = LocationIndex()
+    for lon in (179.995, -179.995):
+        found = index.nearest(db, 0.0, lon, 5)
+        assert sorted(loc_id for loc_id, _ in found) == [100, 101]
+        assert all(distance < 2 for _, distance in found)
+
+
+def test_concurrent_reservations_never_oversell(tmp_path):
+    # A file database, so that every thread uses its own connection
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'stock.db'}", connect_args={"timeout": 30}
+    )
+    Base.metadata.create_all(bind=file_engine)
+    FileSession = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+
+    db = FileSession()
+    for location_id in (1, 2):
+        db.add(
+            Location(
+                id=location_id, name="M", address="A", latitude=48.0, longitude=9.0
+            )
+        )
+    db.add_all(
+        [
+            Medication(id=1, name="M1", pzn="1"),
+            Medication(id=2, name="M2", pzn="2"),
+        ]
+    )
+    db.add_all(
+        [
+            Inventory(location_id=1, medication_id=1, quantity=5),
+            Inventory(location_id=1, medication_id=2, quantity=5),
+            Inventory(location_id=2, medication_id=1, quantity=8),
+        ]
+    )
+    db.commit()
+    db.close()
+
+    outcomes = []
+    lock = threading.Lock()
+
+    def place_order(location_id, quantities):
+        session = FileSession()
+        try:
+            reserve_stock(session, location_id, quantities)
+            session.commit()
+            result = True
+        except InsufficientStockError:
+            session.rollback()
+            result = False
+        finally:
+            session.close()
+        with lock:
+            outcomes.append((location_id, result))
+
+    threads = []
+    for i in range(20):
+        # Alternate the order of the items to provoke lock ordering problems
+        quantities = {1: 1, 2: 1} if i % 2 else {2: 1, 1: 1}
+        threads.append(threading.Thread(target=place_order, args=(1, quantities)))
+        threads.append(threading.Thread(target=place_order, args=(2, {1: 1})))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    successes = {1: 0, 2: 0}
+    for location_id, result in outcomes:
+        successes[location_id] += result
+    assert len(outcomes) == 40
+    assert successes == {1: 5, 2: 8}
+
+    db = FileSession()
+    stock = {(i.location_id, i.medication_id): i.quantity for i in db.query(Inventory)}
+    db.close()
+    file_engine.dispose()
+    assert stock == {(1, 1): 0, (1, 2): 0, (2, 1): 0}
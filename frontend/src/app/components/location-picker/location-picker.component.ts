@@ -53,8 +53,9 @@ export class LocationPickerComponent implements OnInit, OnDestroy {
         this.cartMedicationIds = items
           .map((item) => item.medication.id)
           .filter((id): id is string => !!id);
-        this.medicationIdsAsNumbers = this.cartMedicationIds
-          .map((id) => parseInt(id))
+        // One entry per unit, so machines are checked for the full quantity
+        this.medicationIdsAsNumbers = items
+          .flatMap((item) => Array(item.quantity).fill(parseInt(item.medication.id || '')))
           .filter((id) => !isNaN(id));
       });
       this.subscriptions.add(cartSub);
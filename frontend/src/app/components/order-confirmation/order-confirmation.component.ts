@@ -1,8 +1,8 @@
 import { Component, OnInit, OnDestroy, inject, signal } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { Router, ActivatedRoute } from '@angular/router';
-import { interval, Subscription } from 'rxjs';
-import { switchMap, startWith } from 'rxjs/operators';
+import { Subscription } from 'rxjs';
+import { filter, switchMap, startWith } from 'rxjs/operators';
 import { TranslocoModule } from '@ngneat/transloco';
 import { MatIconModule } from '@angular/material/icon';
 import { QRCodeComponent } from 'angularx-qrcode';
@@ -45,9 +45,12 @@ export class OrderConfirmationComponent implements OnInit, OnDestroy {
 
   startPolling(id: string): void {
     this.loading.set(true);
-    this.pollingSubscription = interval(500)
+    // Re-fetch the order whenever the server reports a status change
+    this.pollingSubscription = this.orderService
+      .orderStatusChanges()
       .pipe(
-        startWith(0),
+        startWith(null),
+        filter((changedId) => changedId === null || String(changedId) === String(id)),
         switchMap(() => this.orderService.getOrderById(id)),
       )
       .subscribe({
@@ -1,8 +1,8 @@
 import { Component, OnInit, OnDestroy, signal, computed } from '@angular/core';
 import { CommonModule, Location } from '@angular/common';
 import { ActivatedRoute, Router, RouterLink } from '@angular/router';
-import { interval, Subscription } from 'rxjs';
-import { switchMap, startWith } from 'rxjs/operators';
+import { Subscription } from 'rxjs';
+import { filter, switchMap, startWith } from 'rxjs/operators';
 import { TranslocoModule } from '@ngneat/transloco';
 import { MatIconModule } from '@angular/material/icon';
 import { OrderService } from '../../services/order.service';
@@ -76,9 +76,12 @@ export class OrderDetailComponent implements OnInit, OnDestroy {
 
   startPolling(orderId: string | number): void {
     this._loading.set(true);
-    this.pollingSubscription = interval(500)
+    // Re-fetch the order whenever the server reports a status change
+    this.pollingSubscription = this.orderService
+      .orderStatusChanges()
       .pipe(
-        startWith(0),
+        startWith(null),
+        filter((changedId) => changedId === null || String(changedId) === String(orderId)),
         switchMap(() => this.orderService.getOrderById(orderId)),
       )
       .subscribe({
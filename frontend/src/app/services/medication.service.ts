@@ -26,11 +26,11 @@ export class MedicationService {
   }
 
   /**
-   * Searches for medications by name.
+   * Searches the catalog by name, PZN, manufacturer and dosage, best matches first.
    */
-  searchMedications(query: string): Observable<Medication[]> {
-    const params = new HttpParams().set('name', query);
-    return this.http.get<Medication[]>('/api/v1/medications/', { params }).pipe(
+  searchMedications(query: string, limit = 20): Observable<Medication[]> {
+    const params = new HttpParams().set('q', query).set('limit', limit);
+    return this.http.get<Medication[]>('/api/v1/medications/search', { params }).pipe(
       catchError((error) => {
         console.error('Error searching medications:', error);
         return of([]);
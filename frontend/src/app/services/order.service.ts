@@ -4,6 +4,7 @@ import { catchError, map, tap } from 'rxjs/operators';
 import { Order, OrderItem } from '../models/order.model';
 import { HttpClient } from '@angular/common/http';
 import { Location } from 'fhir/r4';
+import { AuthService } from './auth.service';
 
 @Injectable({
   providedIn: 'root',
@@ -12,7 +13,10 @@ export class OrderService {
   private ordersSubject = new BehaviorSubject<Order[]>([]);
   public orders$ = this.ordersSubject.asObservable();
 
-  constructor(private http: HttpClient) {}
+  constructor(
+    private http: HttpClient,
+    private authService: AuthService,
+  ) {}
 
   /**
    * Fetches all orders (ServiceRequests) for the current user.
@@ -53,6 +57,23 @@ export class OrderService {
     );
   }
 
+  /**
+   * Emits the ID of an order of the current user whenever its status changes.
+   * Backed by the server-sent event stream; emits null on every (re)connect since
+   * changes made while disconnected are not replayed.
+   */
+  orderStatusChanges(): Observable<number | null> {
+    return new Observable<number | null>((subscriber) => {
+      const token = encodeURIComponent(this.authService.getToken() ?? '');
+      const source = new EventSource(`/api/v1/orders/stream?token=${token}`);
+      source.onopen = () => subscriber.next(null);
+      source.addEventListener('order_status', (event) => {
+        subscriber.next(JSON.parse((event as MessageEvent).data).order_id);
+      });
+      return () => source.close();
+    });
+  }
+
   /**
    * Fetches available pickup locations.
    */
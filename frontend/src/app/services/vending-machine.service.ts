@@ -20,7 +20,11 @@ export class VendingMachineService {
   getAllMachines(medicationIds?: number[]): Observable<VendingMachine[]> {
     let url = '/api/v1/locations/';
     if (medicationIds && medicationIds.length > 0) {
-      url += `?medication_ids=${medicationIds.join(',')}`;
+      // Repeated IDs are sent as 'id:quantity' so stock is checked per unit
+      const quantities = new Map<number, number>();
+      medicationIds.forEach((id) => quantities.set(id, (quantities.get(id) || 0) + 1));
+      const cart = Array.from(quantities, ([id, quantity]) => `${id}:${quantity}`);
+      url += `?medication_ids=${cart.join(',')}`;
     }
     return this.http.get<any[]>(url).pipe(
       map((items) => items.map((item) => this.mapBackendToVendingMachine(item))),